@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import click
+import httpx
+import uvicorn
+from a2a.types import AgentCard
+from dotenv import load_dotenv
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from inprocess_agents import load_agent_module
+from mock_chat_completion import MockChatCompletion
+from tracing import setup_tracing
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+@dataclass
+class AgentDefinition:
+    """One agent served by the host, as configured in the host's JSON config."""
+    name: str
+    # Directory of the agent implementation (writer or critic), relative to the repository root
+    project: str
+    # Served on its own port, or mounted under ``path`` on the host's port
+    port: int | None = None
+    path: str = ""
+    # Replaces the implementation's default instructions
+    instructions: str | None = None
+    # Agent card fields (name, description, skills, ...) replacing the implementation's defaults
+    card: dict[str, Any] = field(default_factory=dict)
+
+
+class HostedAgent:
+    """An agent definition built on its project's implementation and the host's shared chat service."""
+
+    def __init__(self, definition: AgentDefinition, port: int, chat_service, push_client, collector):
+        self.definition = definition
+        directory = os.path.join(ROOT, definition.project)
+        # Each definition gets its own copy of the project's modules, and so its own metrics
+        module = load_agent_module(definition.name, directory)
+        request_handler, self.task_store, scheduler = module.create_request_handler(
+            os.path.join(directory, f"{definition.name}-tasks.db"),
+            task_retention=float(os.getenv("TASK_RETENTION_SECONDS", str(7 * 24 * 3600))),
+            max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "8")),
+            max_queue=int(os.getenv("MAX_QUEUE_DEPTH", "32")),
+            chat_service=chat_service,
+            instructions=definition.instructions,
+            push_client=push_client,
+        )
+        card = module.get_agent_card("localhost", port)
+        card = AgentCard.model_validate({
+            **card.model_dump(exclude_none=True),
+            **definition.card,
+            "url": f"http://localhost:{port}{definition.path}/",
+        })
+        self.app = module.build_app(card, request_handler, self.task_store, scheduler, collector)
+
+
+def load_definitions(path: str) -> tuple[str, int, list[AgentDefinition]]:
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    definitions = [AgentDefinition(**agent) for agent in config["agents"]]
+    for definition in definitions:
+        if definition.path and not definition.path.startswith("/"):
+            raise ValueError(f"Path of agent {definition.name} must start with '/'")
+    return config.get("host", "0.0.0.0"), config.get("port", 8003), definitions
+
+
+def create_chat_service():
+    """The chat service shared by all hosted agents, and with it one Azure OpenAI connection pool."""
+    if os.getenv("LLM_BACKEND", "azure") == "mock":
+        return MockChatCompletion.from_env("agent_host_service")
+    return AzureChatCompletion(
+        service_id="agent_host_service",
+        deployment_name=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+    )
+
+
+def build_apps(host_port: int, agents: list[HostedAgent]) -> dict[int, Starlette]:
+    """One application per port, with the agents served on it mounted at their paths."""
+    mounts: dict[int, list[Mount]] = {}
+    for agent in agents:
+        port = agent.definition.port or host_port
+        if any(mount.path == agent.definition.path for mount in mounts.get(port, [])):
+            raise ValueError(f"Two agents are served at {agent.definition.path or '/'} on port {port}")
+        mounts.setdefault(port, []).append(Mount(agent.definition.path, app=agent.app))
+    # Mounted applications do not run their lifespans; serve() closes the task stores and push client
+    return {
+        port: Starlette(routes=sorted(routes, key=lambda mount: mount.path == ""))
+        for port, routes in mounts.items()
+    }
+
+
+class _HostedServer(uvicorn.Server):
+    """A uvicorn server that leaves signal handling to the host, which stops all servers together."""
+
+    @contextmanager
+    def capture_signals(self):
+        yield
+
+
+async def serve(
+    host: str,
+    apps: dict[int, Starlette],
+    agents: list[HostedAgent],
+    push_client: httpx.AsyncClient,
+) -> None:
+    servers = [_HostedServer(uvicorn.Config(app, host=host, port=port)) for port, app in apps.items()]
+
+    def stop():
+        for server in servers:
+            server.should_exit = True
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop)
+    try:
+        tasks = [asyncio.create_task(server.serve()) for server in servers]
+        # One server stopping (e.g. on a signal) stops the others
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        stop()
+        await asyncio.gather(*tasks)
+    finally:
+        await asyncio.gather(*(agent.task_store.close() for agent in agents))
+        await push_client.aclose()
+
+
+@click.command()
+@click.option("--config", "config_path", default="agent_host.json", help="JSON file with the agent definitions.")
+def main(config_path):
+    """Serves the configured writer and critic agents from one process and event loop."""
+    host, host_port, definitions = load_definitions(config_path)
+    collector = setup_tracing("agent-host")
+    chat_service = create_chat_service()
+    # One connection pool for the push notifications of all hosted agents
+    push_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(float(os.getenv("PUSH_NOTIFICATION_TIMEOUT", "10"))),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+    agents = [
+        HostedAgent(definition, definition.port or host_port, chat_service, push_client, collector)
+        for definition in definitions
+    ]
+    apps = build_apps(host_port, agents)
+    for agent in agents:
+        port = agent.definition.port or host_port
+        logger.info(f"Serving agent '{agent.definition.name}' at http://{host}:{port}{agent.definition.path}/")
+    asyncio.run(serve(host, apps, agents, push_client))
+
+
+if __name__ == "__main__":
+    main()
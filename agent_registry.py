@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import logging
+import statistics
+import time
+from collections.abc import AsyncIterator, Collection
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+import httpx
+from a2a.client import A2ACardResolver, A2AClient
+from a2a.types import AgentCard
+
+from inprocess_agents import InProcessA2AClient, InProcessAgentConnection
+from resilience import AgentRejectedError
+
+logger = logging.getLogger(__name__)
+
+
+class RemoteAgentConnection:
+    """Pooled HTTP/2 connection and cached agent card for one remote agent replica.
+
+    Also holds the replica's routing state: calls in progress, health check result,
+    passive ejection and a moving average of call durations.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        card_ttl: float,
+        timeout: float,
+        limits: httpx.Limits,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.card_ttl = card_ttl
+        self.httpx_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(timeout),
+            limits=limits,
+        )
+        self._resolver = A2ACardResolver(httpx_client=self.httpx_client, base_url=base_url)
+        self._card: AgentCard | None = None
+        self._client: A2AClient | None = None
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+        self.outstanding = 0
+        self.healthy = True
+        self.ejected_until = 0.0
+        self.consecutive_failures = 0
+        # Exponential moving average of call durations, in seconds
+        self.latency: float | None = None
+        self.calls = 0
+
+    @property
+    def card_is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.card_ttl
+
+    async def refresh_card(self) -> AgentCard:
+        """Fetch the agent card and rebuild the A2A client bound to the pooled connection."""
+        async with self._lock:
+            card = await self._resolver.get_agent_card()
+            self._card = card
+            self._client = A2AClient(httpx_client=self.httpx_client, agent_card=card)
+            self._fetched_at = time.monotonic()
+            logger.info(f"Agent card for '{self.name}' refreshed from {self.base_url}")
+            return card
+
+    async def get_client(self) -> A2AClient:
+        """Return the cached client, fetching the card on first use."""
+        if self._client is None:
+            await self.refresh_card()
+        return self._client
+
+    async def check_health(self, timeout: float) -> bool:
+        """Probe the agent card endpoint, refreshing the card when it is stale."""
+        try:
+            if self.card_is_stale:
+                await self.refresh_card()
+            else:
+                response = await self.httpx_client.get(
+                    f"{self.base_url.rstrip('/')}/.well-known/agent.json", timeout=timeout
+                )
+                response.raise_for_status()
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"Replica {self.base_url} of '{self.name}' failed its health check: {e}")
+            self.healthy = False
+            return False
+        if not self.healthy:
+            logger.info(f"Replica {self.base_url} of '{self.name}' is healthy again")
+        self.healthy = True
+        return True
+
+    def available(self, now: float) -> bool:
+        return self.healthy and now >= self.ejected_until
+
+    def stats(self, now: float) -> dict:
+        return {
+            "url": self.base_url,
+            "outstanding": self.outstanding,
+            "healthy": self.healthy,
+            "ejected_for": round(max(self.ejected_until - now, 0.0), 1),
+            "latency_seconds": round(self.latency, 3) if self.latency is not None else None,
+            "calls": self.calls,
+        }
+
+    async def aclose(self) -> None:
+        await self.httpx_client.aclose()
+
+
+class AgentLease(NamedTuple):
+    """The client a call uses, and the URL of the replica it leads to (None in process)."""
+    replica: str | None
+    client: A2AClient | InProcessA2AClient
+
+
+class ReplicaPool:
+    """The replicas serving one agent role, and the routing of calls among them.
+
+    Calls go to the available replica with the fewest calls outstanding (ties taken in
+    turn), or with ``sticky`` routing to the replica a context id hashes to, so that
+    the turns of one conversation reach the replica holding its session. Rendezvous
+    hashing moves only the contexts of a replica that becomes unavailable.
+
+    A replica is ejected for ``ejection_seconds`` after ``max_failures`` failed calls in
+    a row, or when its average call duration exceeds ``slow_factor`` times the median of
+    the other replicas. Failed health checks take it out until one passes. A replica is
+    never ejected when it is the last one available, and when none is available calls
+    are spread over all of them rather than failing outright.
+    """
+
+    # Weight of the latest call in the moving average of call durations
+    LATENCY_ALPHA = 0.2
+    # Calls a replica must have completed before it can be ejected as slow
+    MIN_CALLS_FOR_LATENCY = 5
+
+    def __init__(
+        self,
+        name: str,
+        replicas: list[RemoteAgentConnection],
+        sticky: bool = False,
+        max_failures: int = 3,
+        ejection_seconds: float = 30.0,
+        slow_factor: float = 3.0,
+    ):
+        self.name = name
+        self.replicas = replicas
+        self.sticky = sticky
+        self.max_failures = max_failures
+        self.ejection_seconds = ejection_seconds
+        self.slow_factor = slow_factor
+        self.ejections = 0
+        self._turn = 0
+
+    def available(self) -> int:
+        now = time.monotonic()
+        return sum(replica.available(now) for replica in self.replicas)
+
+    def pick(self, context_id: str | None = None, exclude: Collection[str] = ()) -> RemoteAgentConnection:
+        """The replica for the next call, avoiding the URLs in ``exclude`` when others are available."""
+        now = time.monotonic()
+        candidates = (
+            [replica for replica in self.replicas if replica.available(now) and replica.base_url not in exclude]
+            or [replica for replica in self.replicas if replica.available(now)]
+            or self.replicas
+        )
+        if self.sticky and context_id:
+            return max(candidates, key=lambda replica: _rendezvous_score(context_id, replica.base_url))
+        self._turn += 1
+        start = self._turn % len(candidates)
+        return min(candidates[start:] + candidates[:start], key=lambda replica: replica.outstanding)
+
+    @asynccontextmanager
+    async def lease(
+        self, context_id: str | None = None, exclude: Collection[str] = ()
+    ) -> AsyncIterator[RemoteAgentConnection]:
+        """Route one call to a replica, counting it as outstanding until the block exits.
+
+        An exception from the block counts as a failure of the replica; cancellation and
+        rejection (a busy replica that did not run the call) do not.
+        """
+        replica = self.pick(context_id, exclude)
+        replica.outstanding += 1
+        started = time.monotonic()
+        try:
+            yield replica
+        except AgentRejectedError:
+            raise
+        except Exception:
+            self._record_failure(replica)
+            raise
+        else:
+            self._record_success(replica, time.monotonic() - started)
+        finally:
+            replica.outstanding -= 1
+
+    def _record_success(self, replica: RemoteAgentConnection, seconds: float) -> None:
+        replica.consecutive_failures = 0
+        replica.calls += 1
+        if replica.latency is None:
+            replica.latency = seconds
+        else:
+            replica.latency += self.LATENCY_ALPHA * (seconds - replica.latency)
+        others = [
+            other.latency for other in self.replicas
+            if other is not replica and other.latency is not None and other.calls >= self.MIN_CALLS_FOR_LATENCY
+        ]
+        if replica.calls >= self.MIN_CALLS_FOR_LATENCY and others:
+            median = statistics.median(others)
+            if replica.latency > self.slow_factor * median:
+                self._eject(replica, f"average call {replica.latency:.1f}s against a median of {median:.1f}s")
+
+    def _record_failure(self, replica: RemoteAgentConnection) -> None:
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.max_failures:
+            self._eject(replica, f"{replica.consecutive_failures} failed calls in a row")
+
+    def _eject(self, replica: RemoteAgentConnection, reason: str) -> None:
+        now = time.monotonic()
+        if not replica.available(now):
+            return
+        if not any(other.available(now) for other in self.replicas if other is not replica):
+            return
+        replica.ejected_until = now + self.ejection_seconds
+        replica.consecutive_failures = 0
+        # Judged afresh when it comes back
+        replica.latency = None
+        replica.calls = 0
+        self.ejections += 1
+        logger.warning(f"Ejected replica {replica.base_url} of '{self.name}' for {self.ejection_seconds:.0f}s: {reason}")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "routing": "sticky" if self.sticky else "least_outstanding",
+            "ejections": self.ejections,
+            "replicas": [replica.stats(now) for replica in self.replicas],
+        }
+
+
+def _rendezvous_score(key: str, replica_url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{key}|{replica_url}".encode(), digest_size=8).digest(), "big")
+
+
+class RemoteAgentRegistry:
+    """Process-wide registry of pooled A2A clients keyed by agent name.
+
+    Each agent is served by one or more replicas (``agent_urls``: name -> list of URLs),
+    routed by a :class:`ReplicaPool`; agents named in ``sticky`` are routed by context id.
+    Agents named in ``shared_task_store`` run replicas that share one task store, from
+    which each restores the sessions other replicas answered.
+    Every ``health_interval`` seconds each replica's agent card endpoint is probed, and
+    cards older than ``card_ttl`` seconds are refreshed on the way, so tool calls never
+    pay for a card round trip once the registry is warm. Agents listed in ``in_process``
+    (name -> project directory) are hosted in this process instead and called without HTTP.
+    """
+
+    def __init__(
+        self,
+        agent_urls: dict[str, list[str]],
+        card_ttl: float = 300.0,
+        timeout: float = 60.0,
+        max_connections: int = 20,
+        keepalive_expiry: float = 120.0,
+        in_process: dict[str, str] | None = None,
+        sticky: Collection[str] = (),
+        shared_task_store: Collection[str] = (),
+        health_interval: float = 10.0,
+        max_failures: int = 3,
+        ejection_seconds: float = 30.0,
+        slow_factor: float = 3.0,
+    ):
+        self.agent_urls = agent_urls
+        self.in_process = in_process or {}
+        self.sticky = frozenset(sticky)
+        self.shared_task_store = frozenset(shared_task_store)
+        self.card_ttl = card_ttl
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.pool_options = {
+            "max_failures": max_failures,
+            "ejection_seconds": ejection_seconds,
+            "slow_factor": slow_factor,
+        }
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._connections: dict[str, ReplicaPool | InProcessAgentConnection] = {}
+        self._health_task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        """Open the pooled clients and warm the agent card cache."""
+        for name, urls in self.agent_urls.items():
+            if name in self.in_process:
+                self._connections[name] = InProcessAgentConnection(name, urls[0], self.in_process[name])
+                continue
+            replicas = [
+                RemoteAgentConnection(name, url, self.card_ttl, self.timeout, self.limits) for url in urls
+            ]
+            self._connections[name] = ReplicaPool(name, replicas, sticky=name in self.sticky, **self.pool_options)
+            logger.info(f"Routing '{name}' over {len(urls)} replica(s): {', '.join(urls)}")
+        await asyncio.gather(*(self._try_refresh(replica) for replica in self._all_replicas()))
+        self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        """Stop the health checks and close all pooled clients."""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        await asyncio.gather(*(replica.aclose() for replica in self._all_replicas()))
+        await asyncio.gather(
+            *(conn.aclose() for conn in self._connections.values() if isinstance(conn, InProcessAgentConnection))
+        )
+        self._connections.clear()
+
+    def connection(self, name: str) -> ReplicaPool | InProcessAgentConnection:
+        try:
+            return self._connections[name]
+        except KeyError:
+            raise RuntimeError(
+                f"Remote agent '{name}' is not registered or the registry has not been started"
+            ) from None
+
+    def keeps_sessions(self, name: str) -> bool:
+        """Whether every call in a context finds the agent's session for it.
+
+        That holds for an agent hosted in process or served by one replica, for sticky
+        routing, and for replicas sharing a task store. A later turn can then rely on the
+        conversation so far instead of repeating it.
+        """
+        return (
+            name in self.in_process
+            or len(self.agent_urls.get(name, ())) <= 1
+            or name in self.sticky
+            or name in self.shared_task_store
+        )
+
+    def replicas(self, name: str) -> list[RemoteAgentConnection]:
+        """The remote replicas of an agent; none for an in-process agent."""
+        conn = self.connection(name)
+        return conn.replicas if isinstance(conn, ReplicaPool) else []
+
+    @asynccontextmanager
+    async def lease(
+        self, name: str, context_id: str | None = None, exclude: Collection[str] = ()
+    ) -> AsyncIterator[AgentLease]:
+        """The A2A client of the replica a call should go to, held for the duration of the call.
+
+        Follow-up requests for the same task (tasks/get, tasks/cancel) should use the same
+        client, since the task lives on that replica. Replicas in ``exclude`` (URLs) are
+        avoided if possible, e.g. the one a hedged call was first sent to.
+        """
+        conn = self.connection(name)
+        if isinstance(conn, InProcessAgentConnection):
+            yield AgentLease(None, await conn.get_client())
+            return
+        async with conn.lease(context_id, exclude) as replica:
+            yield AgentLease(replica.base_url, await replica.get_client())
+
+    def available_replicas(self, name: str) -> int:
+        """Replicas of an agent currently receiving calls; 0 for an in-process agent."""
+        conn = self.connection(name)
+        return conn.available() if isinstance(conn, ReplicaPool) else 0
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            name: conn.stats() if isinstance(conn, ReplicaPool) else {"routing": "in_process"}
+            for name, conn in self._connections.items()
+        }
+
+    def _all_replicas(self) -> list[RemoteAgentConnection]:
+        return [
+            replica for conn in self._connections.values() if isinstance(conn, ReplicaPool)
+            for replica in conn.replicas
+        ]
+
+    async def _try_refresh(self, conn: RemoteAgentConnection) -> None:
+        try:
+            await conn.refresh_card()
+        except Exception as e:
+            # Agents may still be starting; the card is fetched lazily on first use
+            logger.warning(f"Could not fetch agent card for '{conn.name}' from {conn.base_url}: {e}")
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(
+                *(replica.check_health(min(self.health_interval, 5.0)) for replica in self._all_replicas())
+            )
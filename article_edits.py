@@ -0,0 +1,136 @@
+import difflib
+import logging
+from dataclasses import dataclass, field
+from typing import Literal
+
+from pydantic import BaseModel
+
+from sections import HEADER_PATTERN, Section, find_headers
+
+logger = logging.getLogger(__name__)
+
+
+class SectionEdit(BaseModel):
+    """One change to an article, addressed by the title of a section's header."""
+    action: Literal["replace", "insert_after", "delete"] = "replace"
+    # Header text of the section, without the #s; empty for the text before the first header
+    section: str
+    # Markdown of the new section, header line included (unused for delete)
+    text: str = ""
+
+
+class SectionEdits(BaseModel):
+    """The writer's reply to a revise_sections request."""
+    message: str = ""
+    edits: list[SectionEdit] = []
+
+
+@dataclass
+class ArticleRevision:
+    """The result of applying edits to an article, with a unified diff against the previous version."""
+    article: str
+    summary: str = ""
+    applied: list[SectionEdit] = field(default_factory=list)
+    skipped: list[SectionEdit] = field(default_factory=list)
+    diff: str = ""
+
+    @property
+    def changed_lines(self) -> tuple[int, int]:
+        """Lines added and removed."""
+        lines = self.diff.splitlines()
+        added = sum(1 for line in lines if line.startswith("+") and not line.startswith("+++"))
+        removed = sum(1 for line in lines if line.startswith("-") and not line.startswith("---"))
+        return added, removed
+
+    def to_dict(self, include_text: bool = True) -> dict:
+        added, removed = self.changed_lines
+        record = {
+            "summary": self.summary,
+            "applied": [edit.model_dump() for edit in self.applied] if include_text else len(self.applied),
+            "skipped": [edit.model_dump() for edit in self.skipped] if include_text else len(self.skipped),
+            "lines_added": added,
+            "lines_removed": removed,
+        }
+        if include_text:
+            record["diff"] = self.diff
+        return record
+
+
+def split_at_headers(article: str) -> list[Section]:
+    """Split an article at every Markdown header outside code blocks.
+
+    The sections' texts join back into the article.
+    """
+    starts = [match.start() for match in find_headers(article)]
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+    sections = []
+    for start, end in zip(starts, [*starts[1:], len(article)]):
+        text = article[start:end]
+        match = HEADER_PATTERN.match(text)
+        sections.append(Section(match.group(1).strip() if match else "", text))
+    return sections
+
+
+def apply_edits(article: str, edits: SectionEdits, revision: int = 1) -> ArticleRevision:
+    """Apply section edits to ``article``.
+
+    Sections are matched by header text, ignoring case, spacing and leading #s. Edits
+    naming a section that is not in the article are skipped, not guessed at. The diff
+    is labelled with ``revision``, the number of the version produced.
+    """
+    sections = split_at_headers(article)
+    result = ArticleRevision(article, edits.message)
+    for edit in edits.edits:
+        index = _find(sections, edit.section)
+        if index is None:
+            logger.warning(f"Skipping edit of unknown section {edit.section!r}")
+            result.skipped.append(edit)
+            continue
+        if edit.action == "delete":
+            del sections[index]
+        else:
+            # a replaced last section stays last, and a section inserted after it becomes last
+            text = _section_text(edit.text, last=index == len(sections) - 1)
+            new = Section(_title(text), text)
+            if edit.action == "replace":
+                sections[index] = new
+            else:
+                if index == len(sections) - 1:
+                    # the section it follows is no longer the last one
+                    sections[index] = Section(sections[index].title, _section_text(sections[index].text, False))
+                sections.insert(index + 1, new)
+        result.applied.append(edit)
+
+    result.article = "".join(section.text for section in sections)
+    # Lines are compared without their endings, so a last line without one diffs cleanly
+    result.diff = "\n".join(difflib.unified_diff(
+        article.splitlines(),
+        result.article.splitlines(),
+        f"revision {revision - 1}",
+        f"revision {revision}",
+        lineterm="",
+    ))
+    return result
+
+
+def _normalize(title: str) -> str:
+    return " ".join(title.strip().lstrip("#").lower().split())
+
+
+def _find(sections: list[Section], title: str) -> int | None:
+    wanted = _normalize(title)
+    for i, section in enumerate(sections):
+        if _normalize(section.title) == wanted or (not section.title and wanted == "introduction"):
+            return i
+    return None
+
+
+def _title(text: str) -> str:
+    match = HEADER_PATTERN.match(text)
+    return match.group(1).strip() if match else ""
+
+
+def _section_text(text: str, last: bool) -> str:
+    """Section text with the blank line that separates it from the next one (a newline if last)."""
+    return text.strip() + ("\n" if last else "\n\n")
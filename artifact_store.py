@@ -0,0 +1,94 @@
+import logging
+import re
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+HANDLE_PREFIX = "artifact://"
+HANDLE_PATTERN = re.compile(re.escape(HANDLE_PREFIX) + r"([0-9A-Za-z-]+)")
+
+
+def make_handle(artifact_id: str) -> str:
+    return f"{HANDLE_PREFIX}{artifact_id}"
+
+
+class ArtifactStore:
+    """Bounded store of artifact text produced by the remote agents, keyed by artifact id.
+
+    The coordinator model only ever sees ``artifact://<id>`` handles; the text itself is
+    sent to agents as message parts and substituted into replies with :meth:`expand`.
+    Entries are evicted least-recently-used beyond ``max_artifacts`` and after
+    ``ttl_seconds`` without access. An artifact may record the A2A context it was
+    produced in, so later turns about it can continue that agent conversation.
+    """
+
+    def __init__(self, max_artifacts: int = 1000, ttl_seconds: float = 24 * 3600):
+        self.max_artifacts = max_artifacts
+        self.ttl_seconds = ttl_seconds
+        # artifact id -> (text, context id, last access)
+        self._artifacts: OrderedDict[str, tuple[str, str | None, float]] = OrderedDict()
+        # context id -> most recent artifact produced in it
+        self._heads: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._artifacts)
+
+    def put(self, artifact_id: str, text: str, context_id: str | None = None) -> str:
+        """Store an artifact and return its handle."""
+        self._artifacts[artifact_id] = (text, context_id, time.monotonic())
+        self._artifacts.move_to_end(artifact_id)
+        if context_id:
+            self._heads[context_id] = artifact_id
+        while len(self._artifacts) > self.max_artifacts:
+            evicted_id, (_, evicted_context, _) = self._artifacts.popitem(last=False)
+            self._forget(evicted_id, evicted_context)
+            logger.info(f"Evicted least recently used artifact {evicted_id}")
+        return make_handle(artifact_id)
+
+    def get(self, artifact_id: str) -> str | None:
+        self._evict_expired()
+        entry = self._artifacts.get(artifact_id)
+        if entry is None:
+            return None
+        self._artifacts[artifact_id] = (entry[0], entry[1], time.monotonic())
+        self._artifacts.move_to_end(artifact_id)
+        return entry[0]
+
+    def context_of(self, artifact_id: str) -> str | None:
+        """The context an artifact was produced in, if it is still the latest one there."""
+        entry = self._artifacts.get(artifact_id)
+        if entry is None or entry[1] is None or self._heads.get(entry[1]) != artifact_id:
+            return None
+        return entry[1]
+
+    def resolve(self, value: str) -> tuple[str, str | None]:
+        """Return ``(text, artifact_id)`` for a value containing a handle, or ``(value, None)``."""
+        match = HANDLE_PATTERN.search(value)
+        if match:
+            text = self.get(match.group(1))
+            if text is not None:
+                return text, match.group(1)
+            logger.warning(f"Unknown artifact handle {match.group(0)}")
+        return value, None
+
+    def expand(self, text: str) -> str:
+        """Replace every known handle in text with the artifact it points to."""
+        def substitute(match: re.Match) -> str:
+            artifact = self.get(match.group(1))
+            return artifact if artifact is not None else match.group(0)
+
+        return HANDLE_PATTERN.sub(substitute, text)
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._artifacts:
+            artifact_id, (_, context_id, last_access) = next(iter(self._artifacts.items()))
+            if last_access >= deadline:
+                break
+            del self._artifacts[artifact_id]
+            self._forget(artifact_id, context_id)
+
+    def _forget(self, artifact_id: str, context_id: str | None) -> None:
+        if context_id and self._heads.get(context_id) == artifact_id:
+            del self._heads[context_id]
@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+from uuid import uuid4
+
+from a2a.types import TaskState
+
+from article_edits import ArticleRevision
+from blog_workflow import AgentCall, feedback_prompt, review_prompt, revise_article, rewrite_prompt, write_prompt
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    index: int
+    topic: str
+    requirements: str = ""
+    # queued, writing, reviewing, revising, done or failed
+    status: str = "queued"
+    article: str = ""
+    review: str = ""
+    approved: bool = False
+    iterations: int = 0
+    question: str | None = None
+    error: str | None = None
+    context_id: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    # Section edits applied by each revision
+    revisions: list[ArticleRevision] = field(default_factory=list)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self, include_text: bool = True) -> dict[str, Any]:
+        item = asdict(self)
+        del item["context_id"]
+        item["revisions"] = [revision.to_dict(include_text) for revision in self.revisions]
+        if not include_text:
+            del item["article"], item["review"]
+        return item
+
+
+@dataclass
+class BatchJob:
+    id: str
+    items: list[BatchItem]
+    max_iterations: int
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    canceled: bool = False
+    # Notified whenever an item finishes
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+    @property
+    def done(self) -> bool:
+        return all(item.finished for item in self.items)
+
+    def to_dict(self, include_text: bool = False) -> dict[str, Any]:
+        counts: dict[str, int] = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return {
+            "job_id": self.id,
+            "status": "canceled" if self.canceled else "completed" if self.done else "running",
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "total": len(self.items),
+            "counts": counts,
+            "items": [item.to_dict(include_text) for item in self.items],
+        }
+
+    async def results(self) -> AsyncIterator[BatchItem]:
+        """Yield items as they finish (already finished ones first) until the job is done."""
+        sent: set[int] = set()
+        while True:
+            async with self.changed:
+                ready = [item for item in self.items if item.finished and item.index not in sent]
+                if not ready:
+                    if self.done:
+                        return
+                    await self.changed.wait()
+                    continue
+            for item in ready:
+                sent.add(item.index)
+                yield item
+
+
+class BatchPipeline:
+    """Runs batches of topics through separate writer and critic stages.
+
+    Each stage is a fixed pool of workers reading from its own queue, so the number of
+    concurrent writer and critic calls is bounded independently, and a draft moves on
+    to review as soon as it is ready instead of waiting for the rest of its batch.
+    Items follow the same draft -> review -> revise loop as :class:`BlogWorkflow`,
+    each in its own agent context, and are revised with section edits unless
+    ``revision`` is "rewrite". A rewrite sends only the feedback when
+    ``writer_keeps_session`` is set, as in :class:`BlogWorkflow`. Finished jobs beyond
+    ``max_jobs`` are forgotten, oldest first.
+    """
+
+    def __init__(
+        self,
+        call_agent: AgentCall,
+        writer_concurrency: int = 4,
+        critic_concurrency: int = 4,
+        max_iterations: int = 2,
+        max_jobs: int = 100,
+        revision: str = "edits",
+        writer_keeps_session: bool = False,
+    ):
+        self.call_agent = call_agent
+        self.revision = revision
+        self.writer_keeps_session = writer_keeps_session
+        self.writer_concurrency = writer_concurrency
+        self.critic_concurrency = critic_concurrency
+        self.max_iterations = max_iterations
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, BatchJob] = OrderedDict()
+        self._write_queue: asyncio.Queue[tuple[BatchJob, BatchItem]] = asyncio.Queue()
+        self._review_queue: asyncio.Queue[tuple[BatchJob, BatchItem]] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._workers = [
+            *(asyncio.create_task(self._stage_worker(self._write_queue, self._write))
+              for _ in range(self.writer_concurrency)),
+            *(asyncio.create_task(self._stage_worker(self._review_queue, self._review))
+              for _ in range(self.critic_concurrency)),
+        ]
+
+    async def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(
+        self,
+        topics: list[str],
+        requirements: str = "",
+        max_iterations: int | None = None,
+    ) -> BatchJob:
+        job = BatchJob(
+            id=str(uuid4()),
+            items=[BatchItem(index=i, topic=topic, requirements=requirements) for i, topic in enumerate(topics)],
+            max_iterations=self.max_iterations if max_iterations is None else max_iterations,
+        )
+        self._jobs[job.id] = job
+        self._evict_finished()
+        for item in job.items:
+            self._write_queue.put_nowait((job, item))
+        logger.info(f"Batch job {job.id} queued with {len(topics)} topics")
+        return job
+
+    def get(self, job_id: str) -> BatchJob | None:
+        return self._jobs.get(job_id)
+
+    async def cancel(self, job_id: str) -> BatchJob | None:
+        """Stop a job: items in progress finish their current call, and queued items stop.
+
+        A queued item that already has a draft, waiting between stages, is done with it;
+        one that was never started fails as canceled.
+        """
+        job = self._jobs.get(job_id)
+        if job and not job.done:
+            job.canceled = True
+            for item in job.items:
+                if item.status != "queued":
+                    continue
+                if item.article:
+                    await self._finish(job, item, "done")
+                else:
+                    await self._finish(job, item, "failed", error="Canceled")
+        return job
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "jobs": len(self._jobs),
+            "running_jobs": sum(not job.done for job in self._jobs.values()),
+            "writer_queue": self._write_queue.qsize(),
+            "critic_queue": self._review_queue.qsize(),
+            "writer_concurrency": self.writer_concurrency,
+            "critic_concurrency": self.critic_concurrency,
+        }
+
+    async def _stage_worker(
+        self,
+        queue: asyncio.Queue,
+        handle: Callable[[BatchJob, BatchItem], Awaitable[None]],
+    ) -> None:
+        while True:
+            job, item = await queue.get()
+            try:
+                if not item.finished:
+                    await handle(job, item)
+            except Exception as e:
+                logger.exception(f"Batch job {job.id} item {item.index} failed")
+                await self._finish(job, item, "failed", error=str(e))
+            finally:
+                queue.task_done()
+
+    async def _write(self, job: BatchJob, item: BatchItem) -> None:
+        if item.started_at is None:
+            item.started_at = time.time()
+        if item.article and self.revision == "edits":
+            item.status = "revising"
+            text, state, item.context_id, revised = await revise_article(
+                self.call_agent, item.article, item.review, item.context_id, item.iterations
+            )
+            if revised:
+                item.revisions.append(revised)
+        else:
+            if item.article:
+                item.status = "revising"
+                if self.writer_keeps_session:
+                    prompt = feedback_prompt(item.review)
+                else:
+                    prompt = rewrite_prompt(item.article, item.review)
+            else:
+                item.status = "writing"
+                prompt = write_prompt(item.topic, item.requirements)
+            text, state, item.context_id = await self.call_agent("writer", prompt, item.context_id)
+
+        if state != TaskState.completed:
+            # The writer needs more information; report its question instead of an article
+            item.question = text
+            await self._finish(job, item, "done")
+        elif item.iterations < job.max_iterations and not job.canceled:
+            item.article = text
+            item.status = "queued"
+            self._review_queue.put_nowait((job, item))
+        else:
+            item.article = text
+            await self._finish(job, item, "done")
+
+    async def _review(self, job: BatchJob, item: BatchItem) -> None:
+        item.status = "reviewing"
+        item.iterations += 1
+        item.review, state, item.context_id = await self.call_agent(
+            "critic", review_prompt(item.article), item.context_id
+        )
+        item.approved = state == TaskState.completed
+        if state == TaskState.input_required and not job.canceled:
+            item.status = "queued"
+            self._write_queue.put_nowait((job, item))
+        else:
+            await self._finish(job, item, "done")
+
+    async def _finish(self, job: BatchJob, item: BatchItem, status: str, error: str | None = None) -> None:
+        item.status = status
+        item.error = error
+        item.finished_at = time.time()
+        if job.done:
+            job.finished_at = item.finished_at
+            logger.info(f"Batch job {job.id} finished")
+        async with job.changed:
+            job.changed.notify_all()
+
+    def _evict_finished(self) -> None:
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done]:
+            if len(self._jobs) <= self.max_jobs:
+                break
+            del self._jobs[job_id]
@@ -0,0 +1,357 @@
+"""Load-test harness for the coordinator, writer and critic services.
+
+Drives one endpoint at a fixed concurrency and reports throughput, latency and
+time-to-first-token percentiles and the RSS of the service processes. Results are
+written to ``benchmarks/results`` as JSON; pass ``--compare`` with an earlier result
+to print the change per metric.
+
+    # start the services on the offline mock backend and benchmark /chat
+    uv run python benchmarks/run_benchmark.py --launch --scenario chat --concurrency 8 --requests 64
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from a2a.client import A2AClient
+from a2a.types import (
+    JSONRPCErrorResponse,
+    MessageSendParams,
+    SendStreamingMessageRequest,
+    TaskArtifactUpdateEvent,
+)
+from httpx_sse import aconnect_sse
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+SERVICES = {
+    "coordinator": {"cwd": ROOT, "args": ["blogging_agent.py"], "url": "http://localhost:8000", "ready": "/history/stats"},
+    "critic": {"cwd": ROOT / "critic", "args": ["__main__.py"], "url": "http://localhost:8001", "ready": "/.well-known/agent.json"},
+    "writer": {"cwd": ROOT / "writer", "args": ["__main__.py"], "url": "http://localhost:8002", "ready": "/.well-known/agent.json"},
+}
+
+TOPICS = ["remote work", "urban gardening", "quantum computing", "sourdough baking", "trail running"]
+
+
+def percentiles(values: list[float]) -> dict[str, float] | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    return {
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+        "mean": sum(ordered) / len(ordered),
+        "max": ordered[-1],
+    }
+
+
+def prompt_for(scenario: str, i: int, repeat: bool) -> str:
+    topic = TOPICS[0] if repeat else f"{TOPICS[i % len(TOPICS)]} (variant {i})"
+    if scenario == "critic":
+        return f"Please review this blog article and provide feedback:\n\n# {topic}\n\nA short draft about {topic}."
+    return f"Write a blog article about: {topic}"
+
+
+async def run_chat(client: httpx.AsyncClient, prompt: str) -> float | None:
+    response = await client.post(
+        f"{SERVICES['coordinator']['url']}/chat",
+        data={"user_input": prompt, "context_id": uuid4().hex},
+    )
+    response.raise_for_status()
+    # /chat only answers once the whole reply is ready
+    return None
+
+
+async def run_chat_stream(client: httpx.AsyncClient, prompt: str) -> float | None:
+    start = time.perf_counter()
+    first_token = None
+    async with aconnect_sse(
+        client,
+        "POST",
+        f"{SERVICES['coordinator']['url']}/chat/stream",
+        data={"user_input": prompt, "context_id": uuid4().hex},
+    ) as source:
+        async for sse in source.aiter_sse():
+            if sse.event in ("artifact", "token") and first_token is None:
+                first_token = time.perf_counter() - start
+            elif sse.event == "error":
+                raise RuntimeError(json.loads(sse.data)["message"])
+            elif sse.event == "done":
+                break
+    return first_token
+
+
+async def run_agent(client: httpx.AsyncClient, agent: str, prompt: str) -> float | None:
+    a2a_client = A2AClient(httpx_client=client, url=SERVICES[agent]["url"])
+    request = SendStreamingMessageRequest(
+        id=str(uuid4()),
+        params=MessageSendParams(
+            message={
+                "messageId": uuid4().hex,
+                "role": "user",
+                "parts": [{"text": prompt}],
+                "contextId": uuid4().hex,
+            }
+        ),
+    )
+    start = time.perf_counter()
+    first_token = None
+    async for response in a2a_client.send_message_streaming(request):
+        if isinstance(response.root, JSONRPCErrorResponse):
+            raise RuntimeError(response.root.error.message)
+        if isinstance(response.root.result, TaskArtifactUpdateEvent) and first_token is None:
+            first_token = time.perf_counter() - start
+    return first_token
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    latencies: list[float] = []
+    ttfts: list[float] = []
+    errors: list[str] = []
+    counter = iter(range(args.requests))
+
+    async def one(client: httpx.AsyncClient, i: int) -> None:
+        prompt = prompt_for(args.scenario, i, args.repeat_prompts)
+        start = time.perf_counter()
+        try:
+            if args.scenario == "chat":
+                ttft = await run_chat(client, prompt)
+            elif args.scenario == "chat-stream":
+                ttft = await run_chat_stream(client, prompt)
+            else:
+                ttft = await run_agent(client, args.scenario, prompt)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            return
+        latencies.append(time.perf_counter() - start)
+        if ttft is not None:
+            ttfts.append(ttft)
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for i in counter:
+            await one(client, i)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(timeout=args.timeout, limits=limits) as client:
+        for i in range(args.warmup):
+            await one(client, args.requests + i)
+        latencies.clear()
+        ttfts.clear()
+        errors.clear()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    to_ms = lambda stats: {k: round(v * 1000, 1) for k, v in stats.items()} if stats else None
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "completed": len(latencies),
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": to_ms(percentiles(latencies)),
+        "ttft_ms": to_ms(percentiles(ttfts)),
+    }
+
+
+def process_tree_rss_mb(pid: int) -> float | None:
+    """Resident set size of a process and its descendants (Linux /proc only)."""
+    total_kb = 0
+    pending = [pid]
+    try:
+        while pending:
+            current = pending.pop()
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        if total_kb == 0:
+            return None
+    return round(total_kb / 1024, 1)
+
+
+async def sample_rss(pids: dict[str, int], peaks: dict[str, float], interval: float = 0.5) -> None:
+    while True:
+        for name, pid in pids.items():
+            rss = process_tree_rss_mb(pid)
+            if rss is not None:
+                peaks[name] = max(peaks.get(name, 0.0), rss)
+        await asyncio.sleep(interval)
+
+
+def launch_services(args: argparse.Namespace, workdir: str) -> dict[str, subprocess.Popen]:
+    env = {
+        **os.environ,
+        "LLM_BACKEND": "mock",
+        "MOCK_LLM_TTFT_MS": str(args.ttft_ms),
+        "MOCK_LLM_TOKENS_PER_SEC": str(args.tokens_per_sec),
+        "MOCK_LLM_RESPONSE_TOKENS": str(args.response_tokens),
+        "PYTHONUNBUFFERED": "1",
+    }
+    processes = {}
+    for name, service in SERVICES.items():
+        service_env = dict(env)
+        if name != "coordinator":
+            # keep benchmark tasks out of the agents' regular task databases
+            service_env["TASK_DB_PATH"] = os.path.join(workdir, f"{name}-tasks.db")
+        log = open(os.path.join(workdir, f"{name}.log"), "w")
+        processes[name] = subprocess.Popen(
+            [*args.python_cmd.split(), *service["args"]],
+            cwd=service["cwd"],
+            env=service_env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    return processes
+
+
+async def wait_until_ready(timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2) as client:
+        for name, service in SERVICES.items():
+            while True:
+                try:
+                    response = await client.get(service["url"] + service["ready"])
+                    if response.status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{name} did not become ready within {timeout}s")
+                await asyncio.sleep(0.5)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous: dict, current: dict) -> None:
+    """Print the relative change of the headline metrics between two results."""
+    rows = [("throughput_rps", None)]
+    rows += [("latency_ms", p) for p in ("p50", "p95", "p99")]
+    rows += [("ttft_ms", p) for p in ("p50", "p95", "p99")]
+    print(f"\nCompared with {previous.get('timestamp')} ({previous.get('git_commit')}):")
+    for setting in ("scenario", "concurrency", "mock_backend"):
+        if previous.get(setting) != current.get(setting):
+            print(f"  note: {setting} differs ({previous.get(setting)} vs {current.get(setting)})")
+    for metric, key in rows:
+        old, new = previous.get(metric), current.get(metric)
+        if key:
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if old is None or new is None:
+            continue
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+        print(f"  {metric + ('.' + key if key else ''):<18} {old:>10} -> {new:>10}  {change}")
+    for name, rss in current.get("rss_mb", {}).items():
+        old = previous.get("rss_mb", {}).get(name)
+        if old:
+            print(f"  rss_mb.{name:<11} {old:>10} -> {rss:>10}  {(rss - old) / old * 100:+.1f}%")
+
+
+async def main(args: argparse.Namespace) -> None:
+    processes: dict[str, subprocess.Popen] = {}
+    workdir = tempfile.mkdtemp(prefix="a2a-bench-")
+    try:
+        if args.launch:
+            processes = launch_services(args, workdir)
+            await wait_until_ready(args.startup_timeout)
+
+        pids = {name: proc.pid for name, proc in processes.items()}
+        for item in args.pid:
+            name, pid = item.split("=", 1)
+            pids[name] = int(pid)
+        peaks: dict[str, float] = {}
+        sampler = asyncio.create_task(sample_rss(pids, peaks))
+        try:
+            stats = await run_load(args)
+        finally:
+            sampler.cancel()
+    finally:
+        for proc in processes.values():
+            proc.terminate()
+        for proc in processes.values():
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "scenario": args.scenario,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "repeat_prompts": args.repeat_prompts,
+        "mock_backend": {
+            "ttft_ms": args.ttft_ms,
+            "tokens_per_sec": args.tokens_per_sec,
+            "response_tokens": args.response_tokens,
+        } if args.launch else None,
+        **stats,
+        "rss_mb": peaks,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{args.scenario}-c{args.concurrency}.json"
+    path.write_text(json.dumps(result, indent=2))
+    print(json.dumps(result, indent=2))
+    print(f"\nSaved to {path}")
+    if args.launch:
+        print(f"Service logs in {workdir}")
+
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), result)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", choices=["chat", "chat-stream", "writer", "critic"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=1, help="Requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-request timeout in seconds")
+    parser.add_argument("--repeat-prompts", action="store_true",
+                        help="Send the same prompt every time (exercises caching and coalescing)")
+    parser.add_argument("--launch", action="store_true",
+                        help="Start all three services on the mock backend for the run")
+    parser.add_argument("--python-cmd", default="uv run python", help="Command used to start the services")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Mock time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0, help="Mock generation speed")
+    parser.add_argument("--response-tokens", type=int, default=400, help="Mock reply length")
+    parser.add_argument("--pid", action="append", default=[], metavar="NAME=PID",
+                        help="Sample RSS of an already running service")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.concurrency < 1 or args.requests < 1:
+        sys.exit("--concurrency and --requests must be positive")
+    asyncio.run(main(args))
@@ -0,0 +1,335 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Protocol
+
+from a2a.types import TaskState
+
+from article_edits import ArticleRevision, SectionEdits, apply_edits
+from sections import Section, SectionStream, article_title
+
+logger = logging.getLogger(__name__)
+
+
+class AgentCall(Protocol):
+    """Sends a message to a remote agent in the given context (a new one when None) and
+    returns its reply text, final task state and context id.
+
+    ``metadata`` is sent with the message, and ``on_text`` receives the reply text as it streams in.
+    """
+
+    def __call__(
+        self,
+        agent_name: str,
+        text: str,
+        context_id: str | None = None,
+        metadata: dict[str, Any] | None = None,
+        on_text: Callable[[str], None] | None = None,
+    ) -> Awaitable[tuple[str, TaskState | None, str]]: ...
+
+
+ProgressCallback = Callable[[dict[str, Any]], None]
+
+
+def write_prompt(topic: str, requirements: str = "") -> str:
+    prompt = f"Write a blog article about: {topic}"
+    if requirements:
+        prompt += f"\n\nRequirements: {requirements}"
+    return prompt
+
+
+def review_prompt(article: str) -> str:
+    return f"Please review this blog article and provide feedback:\n\n{article}"
+
+
+REVISE_INSTRUCTION = (
+    "Revise your article based on the editor's feedback. Return the complete revised article."
+)
+
+
+REWRITE_INSTRUCTION = (
+    "Revise the article below based on the editor's feedback. Return the complete revised article."
+)
+
+
+EDIT_INSTRUCTION = (
+    "Revise the article below based on the editor's feedback. Return the changes as section edits."
+)
+
+
+def feedback_prompt(feedback: str, flagged: list[dict[str, Any]] | None = None) -> str:
+    # Sent in the writer's own context, which already holds the article being revised
+    return f"{REVISE_INSTRUCTION}\n\n{_feedback(feedback, flagged)}"
+
+
+def edit_prompt(article: str, feedback: str, flagged: list[dict[str, Any]] | None = None) -> str:
+    return f"{EDIT_INSTRUCTION}\n\n{_feedback(feedback, flagged)}\n\nArticle:\n{article}"
+
+
+def rewrite_prompt(article: str, feedback: str, flagged: list[dict[str, Any]] | None = None) -> str:
+    return f"{REWRITE_INSTRUCTION}\n\n{_feedback(feedback, flagged)}\n\nArticle:\n{article}"
+
+
+def _feedback(feedback: str, flagged: list[dict[str, Any]] | None) -> str:
+    text = f"Feedback:\n{feedback}"
+    if flagged:
+        notes = "\n\n".join(f"### {review['title']}\n{review['review']}" for review in flagged)
+        text += f"\n\nOnly the sections below need changes; keep the other sections as they are.\n\n{notes}"
+    return text
+
+
+async def revise_article(
+    call_agent: AgentCall,
+    article: str,
+    feedback: str,
+    context_id: str | None,
+    revision: int,
+    flagged: list[dict[str, Any]] | None = None,
+) -> tuple[str, TaskState | None, str, ArticleRevision | None]:
+    """Revise ``article`` with section edits from the writer, applied here.
+
+    Generation then scales with the size of the change rather than of the article.
+    Returns the revised article (or the writer's question), the writer's final state,
+    the context id and the applied edits with their diff. ``revision`` numbers the
+    version produced, the draft being 0. A reply that is not a set of edits falls back
+    to rewriting the whole article.
+    """
+    text, state, context_id = await call_agent(
+        "writer", edit_prompt(article, feedback, flagged), context_id, metadata={"skill": "revise_sections"}
+    )
+    if state != TaskState.completed:
+        return text, state, context_id, None
+    try:
+        edits = SectionEdits.model_validate_json(text)
+    except ValueError as e:
+        logger.warning(f"The writer did not return section edits ({e}); rewriting the article")
+        text, state, context_id = await call_agent("writer", rewrite_prompt(article, feedback, flagged), context_id)
+        return text, state, context_id, None
+    revised = apply_edits(article, edits, revision)
+    return revised.article, state, context_id, revised
+
+
+class SectionReviews:
+    """Critic reviews of an article's sections, requested while the writer streams it.
+
+    Feed the writer's reply text to :meth:`feed`; every section it completes is sent to
+    the critic's review_section skill right away, so the critic works while later
+    sections are written. :meth:`finish` reviews the last section and collects them all.
+    """
+
+    def __init__(self, call_agent: AgentCall, min_words: int = 150):
+        self.call_agent = call_agent
+        self.title = ""
+        self._stream = SectionStream(min_words)
+        self._chunks: list[str] = []
+        self._sections: list[Section] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def feed(self, text: str) -> None:
+        self._chunks.append(text)
+        for section in self._stream.feed(text):
+            self._review(section)
+
+    async def finish(self, article: str) -> list[dict[str, Any]] | None:
+        """The review of each section of ``article`` (title, words, review and whether it
+        needs changes), or None when the streamed text is not the final article."""
+        if "".join(self._chunks) != article:
+            # The writer replaced its streamed reply (or sent it whole); review it as usual
+            self.cancel()
+            return None
+        for section in self._stream.finish():
+            self._review(section)
+        replies = await asyncio.gather(*self._tasks, return_exceptions=True)
+        failed = [reply for reply in replies if isinstance(reply, BaseException)]
+        if failed:
+            logger.warning(f"{len(failed)} of {len(replies)} section reviews failed; reviewing the whole article")
+            return None
+        return [
+            {"title": section.title, "words": section.words, "review": text, "flagged": state != TaskState.completed}
+            for section, (text, state, _) in zip(self._sections, replies)
+        ]
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+    def _review(self, section: Section) -> None:
+        self.title = self.title or article_title(section.text)
+        self._sections.append(section)
+        metadata = {
+            "skill": "review_section",
+            "article": self.title,
+            "section": section.title,
+            "index": len(self._sections),
+        }
+        self._tasks.append(asyncio.create_task(self.call_agent("critic", section.text, metadata=metadata)))
+
+
+class Step(str, Enum):
+    DRAFT = "draft"
+    REVIEW = "review"
+    REVISE = "revise"
+    DONE = "done"
+
+
+@dataclass
+class WorkflowResult:
+    article: str = ""
+    review: str = ""
+    approved: bool = False
+    iterations: int = 0
+    # Set when the writer asked a question instead of producing an article
+    question: str | None = None
+    steps: list[str] = field(default_factory=list)
+    # Section edits applied by each revision, with their diffs
+    revisions: list[dict[str, Any]] = field(default_factory=list)
+
+
+class BlogWorkflow:
+    """Draft, critique and revise an article as an explicit state machine.
+
+    The writer and critic are called directly, so no coordinator completion is needed
+    between steps and the article never passes through the coordinator's prompt. Both
+    agents are addressed in one context for the whole run. With ``writer_keeps_session``
+    set, every writer call in that context reaches the writer's session for it, which
+    holds the draft, so a revision only sends the feedback; otherwise it sends the
+    article along with it. At most
+    ``max_iterations`` critiques are requested; the loop stops early once the critic
+    returns ``completed`` (approved).
+
+    With ``pipelined`` set, the critic reviews each section of a draft as soon as the
+    writer has streamed it (see :class:`SectionReviews`), and the review only merges
+    those section reviews once the draft is done. Writing and reviewing then overlap,
+    and a revision is asked to change only the sections the critic flagged.
+
+    With ``revision`` set to "edits", the writer revises by returning section edits,
+    which are applied here (see :func:`revise_article`); "rewrite" has it return the
+    whole article.
+    """
+
+    def __init__(
+        self,
+        call_agent: AgentCall,
+        max_iterations: int = 2,
+        pipelined: bool = False,
+        section_min_words: int = 150,
+        revision: str = "edits",
+        writer_keeps_session: bool = False,
+    ):
+        self.call_agent = call_agent
+        self.max_iterations = max_iterations
+        self.pipelined = pipelined
+        self.section_min_words = section_min_words
+        self.revision = revision
+        self.writer_keeps_session = writer_keeps_session
+
+    async def run(
+        self,
+        topic: str,
+        requirements: str = "",
+        on_progress: ProgressCallback | None = None,
+    ) -> WorkflowResult:
+        result = WorkflowResult()
+        step = Step.DRAFT
+        context_id = None
+        # Reviews of the current draft's sections, in pipelined mode
+        section_reviews = None
+
+        def progress(text: str) -> None:
+            logger.info(f"Workflow: {text}")
+            if on_progress:
+                on_progress({"type": "status", "agent": "workflow", "state": step.value, "text": text})
+
+        while step != Step.DONE:
+            result.steps.append(step.value)
+
+            if step == Step.DRAFT:
+                progress("Drafting the article...")
+                text, state, context_id, section_reviews = await self._write(
+                    write_prompt(topic, requirements), context_id, self.max_iterations > 0
+                )
+                step = self._after_writer(result, text, state)
+
+            elif step == Step.REVIEW:
+                result.iterations += 1
+                progress(f"Review {result.iterations} of {self.max_iterations}...")
+                metadata = None
+                if section_reviews:
+                    metadata = {"section_reviews": [
+                        {key: review[key] for key in ("title", "words", "review")} for review in section_reviews
+                    ]}
+                result.review, state, context_id = await self.call_agent(
+                    "critic", review_prompt(result.article), context_id, metadata=metadata
+                )
+                result.approved = state == TaskState.completed
+                if result.approved:
+                    progress("The critic approved the article")
+                    step = Step.DONE
+                elif state == TaskState.input_required:
+                    step = Step.REVISE
+                else:
+                    logger.warning(f"Critic finished in state {state}; keeping the current article")
+                    step = Step.DONE
+
+            elif step == Step.REVISE:
+                progress(f"Revising the article (round {result.iterations})...")
+                flagged = [review for review in section_reviews or [] if review["flagged"]]
+                reviewed = result.iterations < self.max_iterations
+                if self.revision == "edits":
+                    text, state, context_id, revised = await revise_article(
+                        self.call_agent, result.article, result.review, context_id, result.iterations, flagged
+                    )
+                    section_reviews = None
+                    if revised:
+                        result.revisions.append(revised.to_dict())
+                        added, removed = revised.changed_lines
+                        progress(f"Applied {len(revised.applied)} section edits (+{added} -{removed} lines)")
+                    if state == TaskState.completed and self.pipelined and reviewed:
+                        section_reviews = await self._review_sections(text)
+                else:
+                    if self.writer_keeps_session:
+                        prompt = feedback_prompt(result.review, flagged)
+                    else:
+                        prompt = rewrite_prompt(result.article, result.review, flagged)
+                    text, state, context_id, section_reviews = await self._write(prompt, context_id, reviewed)
+                step = self._after_writer(result, text, state)
+
+        return result
+
+    async def _write(
+        self, prompt: str, context_id: str | None, reviewed: bool
+    ) -> tuple[str, TaskState | None, str, list[dict[str, Any]] | None]:
+        """Call the writer. In pipelined mode, when the reply is going to be ``reviewed``,
+        also review its sections as they stream in."""
+        if not (self.pipelined and reviewed):
+            return (*await self.call_agent("writer", prompt, context_id), None)
+        sections = SectionReviews(self.call_agent, self.section_min_words)
+        try:
+            text, state, context_id = await self.call_agent("writer", prompt, context_id, on_text=sections.feed)
+            if state != TaskState.completed:
+                sections.cancel()
+                return text, state, context_id, None
+            return text, state, context_id, await sections.finish(text)
+        except BaseException:
+            sections.cancel()
+            raise
+
+    async def _review_sections(self, article: str) -> list[dict[str, Any]] | None:
+        """Section reviews of an article that is already complete, all requested at once."""
+        sections = SectionReviews(self.call_agent, self.section_min_words)
+        try:
+            sections.feed(article)
+            return await sections.finish(article)
+        except BaseException:
+            sections.cancel()
+            raise
+
+    def _after_writer(self, result: WorkflowResult, text: str, state: TaskState | None) -> Step:
+        if state != TaskState.completed:
+            # The writer needs more information from the user; stop and pass the question on
+            result.question = text
+            return Step.DONE
+        result.article = text
+        return Step.REVIEW if result.iterations < self.max_iterations else Step.DONE
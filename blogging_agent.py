@@ -1,20 +1,59 @@
 import os
+import json
 import logging
-import httpx
 import asyncio
-from typing import Dict, Any
+import time
+import httpx
+from contextlib import aclosing, asynccontextmanager
+from contextvars import ContextVar
+from collections.abc import AsyncIterator, Callable
+from typing import Any, Awaitable, Dict, Literal, NamedTuple
 from uuid import uuid4
 from dotenv import load_dotenv
 
 from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 from semantic_kernel.agents.chat_completion.chat_completion_agent import ChatCompletionAgent, ChatHistoryAgentThread
-from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion
+from semantic_kernel.connectors.ai.open_ai import AzureChatCompletion, OpenAIChatPromptExecutionSettings
+from semantic_kernel.contents import ChatHistory
 from semantic_kernel.contents.chat_message_content import ChatMessageContent
-from semantic_kernel.contents.chat_history import ChatHistory
+from semantic_kernel.functions import KernelArguments
 from semantic_kernel.functions.kernel_function_decorator import kernel_function
-from a2a.client import A2ACardResolver, A2AClient
-from a2a.types import MessageSendParams, SendMessageRequest
+from a2a.client import A2AClient
+from a2a.types import (
+    CancelTaskRequest,
+    JSONRPCErrorResponse,
+    Message,
+    MessageSendConfiguration,
+    MessageSendParams,
+    Part,
+    PushNotificationConfig,
+    SendMessageRequest,
+    SendStreamingMessageRequest,
+    Task,
+    TaskArtifactUpdateEvent,
+    TaskIdParams,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+from agent_registry import RemoteAgentConnection, RemoteAgentRegistry
+from artifact_store import ArtifactStore, make_handle
+from batch_pipeline import BatchPipeline
+from blog_workflow import REVISE_INSTRUCTION, BlogWorkflow, write_prompt
+from history_store import ChatHistoryStore
+from metrics import CONTENT_TYPE, REGISTRY, SIZE_BUCKETS, Callback, Histogram
+from mock_chat_completion import MockChatCompletion
+from push_tasks import PendingTasks
+from resilience import AgentCallPolicy, AgentRejectedError, CircuitOpenError, hedged
+from single_flight import SingleFlight
+from tracing import inject_context, setup_tracing, trace_id_of, tracer, waterfall_text
 
 # Load environment variables
 load_dotenv()
@@ -22,87 +61,649 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Spans of every request, kept in memory for GET /traces (None when TRACING=off)
+trace_collector = setup_tracing("coordinator")
+
+# Remote agent replicas; WRITER_URLS / CRITIC_URLS take comma-separated lists of URLs
+agent_urls = {
+    "writer": [url.strip() for url in os.getenv("WRITER_URLS", "http://localhost:8002").split(",") if url.strip()],
+    "critic": [url.strip() for url in os.getenv("CRITIC_URLS", "http://localhost:8001").split(",") if url.strip()],
+}
+
+# WRITER_TRANSPORT / CRITIC_TRANSPORT=inprocess hosts that agent in this process instead of calling it over HTTP
+agent_dirs = {
+    "writer": os.path.join(os.path.dirname(os.path.abspath(__file__)), "writer"),
+    "critic": os.path.join(os.path.dirname(os.path.abspath(__file__)), "critic"),
+}
+in_process_agents = {
+    name: directory for name, directory in agent_dirs.items()
+    if os.getenv(f"{name.upper()}_TRANSPORT", "http") == "inprocess"
+}
+
+# Pooled A2A clients shared by every tool call in this process. Calls go to the replica with the
+# fewest calls outstanding, or with WRITER_ROUTING / CRITIC_ROUTING=sticky to the one a context maps to.
+# WRITER_SHARED_TASK_STORE / CRITIC_SHARED_TASK_STORE=1 says the replicas share one task store
+agent_registry = RemoteAgentRegistry(
+    agent_urls,
+    card_ttl=float(os.getenv('AGENT_CARD_TTL_SECONDS', '300')),
+    in_process=in_process_agents,
+    sticky=[name for name in agent_urls if os.getenv(f"{name.upper()}_ROUTING", "least_outstanding") == "sticky"],
+    shared_task_store=[name for name in agent_urls if os.getenv(f"{name.upper()}_SHARED_TASK_STORE", "0") == "1"],
+    health_interval=float(os.getenv('AGENT_HEALTH_INTERVAL_SECONDS', '10')),
+    max_failures=int(os.getenv('AGENT_EJECT_AFTER_FAILURES', '3')),
+    ejection_seconds=float(os.getenv('AGENT_EJECTION_SECONDS', '30')),
+    slow_factor=float(os.getenv('AGENT_EJECT_SLOW_FACTOR', '3')),
+)
+
+# AGENT_CALL_MODE=push submits tasks to remote agents without waiting and resumes on their
+# push notification to PUSH_CALLBACK_URL (this server); "stream" holds a streaming request open
+agent_call_mode = os.getenv("AGENT_CALL_MODE", "stream")
+pending_tasks = PendingTasks(
+    os.getenv("PUSH_CALLBACK_URL", "http://localhost:8000"),
+    poll_interval=float(os.getenv("PUSH_POLL_INTERVAL_SECONDS", "30")),
+    timeout=float(os.getenv("PUSH_TASK_TIMEOUT_SECONDS", "3600")),
+) if agent_call_mode == "push" else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await agent_registry.start()
+    await batch_pipeline.start()
+    try:
+        yield
+    finally:
+        await batch_pipeline.close()
+        await agent_registry.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# "agent" lets the coordinator model drive every step; "workflow" runs the fixed
+# write -> review -> revise loop (can be overridden per request with the mode form field)
+coordinator_mode = os.getenv('COORDINATOR_MODE', 'agent')
+
+# Maintain chat history per context, bounded by LRU/TTL eviction and a per-context token budget
+chat_history_store = ChatHistoryStore(
+    system_message="You are a blog writing coordinator assistant. Help users create high-quality blog articles by coordinating between writer and critic agents.",
+    max_contexts=int(os.getenv('CHAT_HISTORY_MAX_CONTEXTS', '1000')),
+    ttl_seconds=float(os.getenv('CHAT_HISTORY_TTL_SECONDS', '86400')),
+    max_tokens=int(os.getenv('CHAT_HISTORY_MAX_TOKENS', '8000')),
+)
+
+# Characters of an article shown to the coordinator model next to its handle
+ARTICLE_PREVIEW_CHARS = 300
+
+TOOL_SECONDS = Histogram("coordinator_tool_duration_seconds", "Duration of coordinator tool calls.", ["tool"])
+WRITE_BLOG_SECONDS = TOOL_SECONDS.labels("write_blog")
+REVIEW_BLOG_SECONDS = TOOL_SECONDS.labels("review_blog")
+REVISE_BLOG_SECONDS = TOOL_SECONDS.labels("revise_blog")
+A2A_CALL_SECONDS = Histogram("a2a_call_duration_seconds", "Duration of streamed calls to remote agents.", ["agent"])
+A2A_REQUEST_BYTES = Histogram(
+    "a2a_request_bytes", "Text sent to remote agents per call.", ["agent"], buckets=SIZE_BUCKETS
+)
+A2A_RESPONSE_BYTES = Histogram(
+    "a2a_response_bytes", "Text received from remote agents per call.", ["agent"], buckets=SIZE_BUCKETS
+)
+CHAT_SECONDS = Histogram("coordinator_chat_duration_seconds", "Duration of chat turns.", ["endpoint"])
+CHAT_TURN_SECONDS = CHAT_SECONDS.labels("chat")
+CHAT_STREAM_TURN_SECONDS = CHAT_SECONDS.labels("chat_stream")
+
+# Per-request sink for progress events emitted while tools run (set by /chat/stream)
+progress_sink: ContextVar[asyncio.Queue | None] = ContextVar("progress_sink", default=None)
+
+
+def emit_progress(event: dict[str, Any]) -> None:
+    """Forward a progress event to the streaming client of the current request, if any."""
+    sink = progress_sink.get()
+    if sink is not None:
+        sink.put_nowait(event)
 
-# Remote agent URLs
-writer_url = 'http://localhost:8002'
-critic_url = 'http://localhost:8001'
 
-# Maintain chat history per context
-chat_history_store: dict[str, ChatHistory] = {}
+def _parts_text(parts: list[Part]) -> str:
+    return "".join(part.root.text for part in parts if isinstance(part.root, TextPart))
+
+
+def _event_text(event: Task | TaskStatusUpdateEvent | Message) -> str:
+    if isinstance(event, Message):
+        return _parts_text(event.parts)
+    return _parts_text(event.status.message.parts) if event.status.message else ""
+
+
+def _is_progress(event: Any) -> bool:
+    """Whether an agent event shows the call is being worked on (not only submitted or queued).
+
+    Skills that answer in one piece (section edits, section-by-section reviews) only
+    report working status messages until they finish, so those count too.
+    """
+    if isinstance(event, TaskStatusUpdateEvent):
+        queued = bool((event.metadata or {}).get("queued"))
+        return event.final or (event.status.message is not None and not queued)
+    return not isinstance(event, Task) or event.status.state != TaskState.submitted
+
+
+def _is_rejection(event: Any) -> bool:
+    return isinstance(event, (Task, TaskStatusUpdateEvent)) and event.status.state == TaskState.rejected
+
+
+async def _single(result: Awaitable[Any]) -> AsyncIterator[Any]:
+    yield await result
+
+
+class AgentReply(NamedTuple):
+    text: str
+    state: TaskState | None
+    artifact_id: str | None
+    context_id: str
+
 
 class BlogWritingTools:
+    def __init__(
+        self,
+        registry: RemoteAgentRegistry,
+        artifacts: ArtifactStore,
+        pending_tasks: PendingTasks | None = None,
+        policies: dict[str, AgentCallPolicy] | None = None,
+    ):
+        self.registry = registry
+        self.artifacts = artifacts
+        # Set in push mode: remote agents are called without holding a request open
+        self.pending_tasks = pending_tasks
+        # Retry, hedging and circuit breaker state per agent
+        self.policies = policies or {name: AgentCallPolicy(name) for name in registry.agent_urls}
+        # Keeps fire-and-forget cancel requests alive until they complete
+        self._pending_cancels: set[asyncio.Task] = set()
+        # In-flight remote calls keyed by agent, context and message content
+        self._flights = SingleFlight()
+
+    async def send_message_streaming(self, agent_name: str, text: str) -> str:
+        """Stream a message to a remote agent, forwarding updates as they arrive.
+
+        Returns the text of the first artifact produced by the agent, or the last status
+        message when the agent finished without an artifact (e.g. input required).
+        """
+        reply, _, _ = await self.call_agent(agent_name, text)
+        return reply
+
+    async def call_agent(
+        self,
+        agent_name: str,
+        text: str,
+        context_id: str | None = None,
+        metadata: dict[str, Any] | None = None,
+        on_text: Callable[[str], None] | None = None,
+    ) -> tuple[str, TaskState | None, str]:
+        """Like send_message_streaming, but continues the given A2A context (a new one
+        when None) and also returns the final state of the remote task and its context id.
+
+        ``metadata`` is sent with the message; ``on_text`` receives the reply as it streams in.
+        """
+        reply = await self._call(agent_name, text, context_id=context_id, metadata=metadata, on_text=on_text)
+        return reply.text, reply.state, reply.context_id
+
+    async def _call(
+        self,
+        agent_name: str,
+        text: str,
+        attachments: list[Part] | None = None,
+        context_id: str | None = None,
+        track_context: bool = False,
+        metadata: dict[str, Any] | None = None,
+        on_text: Callable[[str], None] | None = None,
+    ) -> AgentReply:
+        """Send a prompt plus attached parts to a remote agent and collect its reply.
+
+        The first artifact of the reply is kept in the artifact store under its artifact id,
+        together with the reply's context id when ``track_context`` is set. ``on_text`` is
+        passed the first artifact's text as it arrives.
+        """
+        # A call continuing an existing context is not repeated, since the agent may
+        # have recorded the turn in its history before failing
+        idempotent = context_id is None
+        # Every call without a context starts its own conversation, so only identical calls
+        # within one context are coalesced here; the agents share identical first turns'
+        # generations across contexts themselves
+        context_id = context_id or str(uuid4())
+        parts = [Part(root=TextPart(text=text)), *(attachments or [])]
+        part_texts = [_parts_text([part]) for part in parts]
+        request_bytes = sum(len(t.encode()) for t in part_texts)
+        A2A_REQUEST_BYTES.labels(agent_name).observe(request_bytes)
+        artifacts: dict[str, list[str]] = {}
+        status_text = ""
+        state = None
+        fed = 0
+        started = time.perf_counter()
+        with tracer.start_as_current_span(
+            f"a2a.call {agent_name}",
+            attributes={"a2a.agent": agent_name, "a2a.context_id": context_id, "a2a.request_bytes": request_bytes},
+        ) as span:
+            events = self._flights.stream(
+                (agent_name, context_id, *part_texts, json.dumps(metadata, sort_keys=True) if metadata else ""),
+                lambda: self._remote_events(agent_name, parts, context_id, idempotent=idempotent, metadata=metadata),
+            )
+            try:
+                async for event in events:
+                    self._forward_event(agent_name, event, artifacts)
+                    if on_text is not None and artifacts:
+                        # A chunk replacing the streamed text restarts the list; nothing more is passed on
+                        chunks = next(iter(artifacts.values()))
+                        for chunk in chunks[fed:]:
+                            on_text(chunk)
+                        fed = max(fed, len(chunks))
+                    if isinstance(event, (TaskStatusUpdateEvent, Message)):
+                        status_text = _event_text(event) or status_text
+                    if isinstance(event, TaskStatusUpdateEvent):
+                        state = event.status.state
+                    elif isinstance(event, Task):
+                        state = event.status.state
+                        status_text = _event_text(event) or status_text
+            except CircuitOpenError as e:
+                # Nothing was sent; answer at once like a failed task, so tools and workflows
+                # report the agent as unavailable instead of raising
+                logger.warning(str(e))
+                state, status_text = TaskState.failed, str(e)
+                emit_progress({"type": "status", "agent": agent_name, "state": state.value, "text": status_text})
+            span.set_attribute("a2a.state", state.value if state else "")
+
+        logger.info(f"{agent_name.capitalize()} agent response received")
+        A2A_CALL_SECONDS.labels(agent_name).observe(time.perf_counter() - started)
+        if not artifacts:
+            A2A_RESPONSE_BYTES.labels(agent_name).observe(len(status_text.encode()))
+            return AgentReply(status_text, state, None, context_id)
+        artifact_id, chunks = next(iter(artifacts.items()))
+        reply_text = "".join(chunks)
+        A2A_RESPONSE_BYTES.labels(agent_name).observe(len(reply_text.encode()))
+        self.artifacts.put(artifact_id, reply_text, context_id if track_context else None)
+        return AgentReply(reply_text, state, artifact_id, context_id)
+
+    async def _remote_events(
+        self,
+        agent_name: str,
+        parts: list[Part],
+        context_id: str,
+        idempotent: bool = False,
+        metadata: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Any]:
+        """Send a message to a remote agent and yield its task events, within the agent's policy.
+
+        The call fails at once while the agent's circuit breaker is open. A call that is
+        slower to make progress than most recent ones is hedged on another replica, and one
+        that makes no progress within its budget is abandoned. Failed calls are retried
+        with jittered backoff when nothing was forwarded yet and repeating them is safe:
+        for a new context, a rejection (honouring its ``retry_after``) or a failed connect.
+        """
+        policy = self.policies[agent_name]
+        policy.breaker.before_call()
+        policy.calls += 1
+        push = self.pending_tasks is not None and agent_name not in self.registry.in_process
+        max_budget = self.pending_tasks.timeout if push else self.registry.timeout
+
+        def on_hedge() -> None:
+            policy.hedges += 1
+            logger.info(f"Hedging slow {agent_name} call on another replica")
+
+        def on_win(index: int) -> None:
+            policy.hedge_wins += index
+
+        for attempt in range(1, policy.attempts + 1):
+            last = attempt == policy.attempts
+            leased: list[str | None] = []
+            forwarded = False
+            started = time.monotonic()
+            can_hedge = self.registry.available_replicas(agent_name) > 1 and idempotent
+            try:
+                async for event in hedged(
+                    lambda index: self._attempt_events(agent_name, parts, context_id, metadata, leased, not last),
+                    _is_progress,
+                    policy.hedge_delay() if can_hedge else None,
+                    policy.budget(max_budget),
+                    on_hedge,
+                    on_win,
+                ):
+                    if not forwarded:
+                        policy.latency.observe(time.monotonic() - started)
+                        forwarded = True
+                    yield event
+            except asyncio.CancelledError:
+                policy.breaker.record_abandoned()
+                raise
+            except AgentRejectedError as e:
+                # The agent did not run the call; not a failure, but back off before retrying
+                policy.breaker.record_abandoned()
+                delay = policy.backoff(attempt, e.retry_after)
+                logger.warning(f"{agent_name} agent rejected the call; retrying in {delay:.1f}s")
+            except Exception as e:
+                policy.breaker.record_failure()
+                if last or forwarded or not (idempotent or isinstance(e, httpx.ConnectError)):
+                    raise
+                delay = policy.backoff(attempt)
+                logger.warning(f"{agent_name} agent call failed ({e!r}); retrying in {delay:.1f}s")
+            else:
+                policy.breaker.record_success()
+                return
+            policy.retries += 1
+            await asyncio.sleep(delay)
+            policy.breaker.before_call()
+
+    async def _attempt_events(
+        self,
+        agent_name: str,
+        parts: list[Part],
+        context_id: str,
+        metadata: dict[str, Any] | None,
+        leased: list[str | None],
+        raise_rejected: bool,
+    ) -> AsyncIterator[Any]:
+        """One attempt at a call, on a replica not yet used by the call (whose URL is added to ``leased``).
+
+        In push mode this yields the final task only; in-process agents are always streamed,
+        since calling them holds no connection.
+        """
+        # The replica is held until the reply is complete, so it counts as outstanding there
+        async with self.registry.lease(agent_name, context_id, exclude=leased) as lease:
+            leased.append(lease.replica)
+            if self.pending_tasks is not None and agent_name not in self.registry.in_process:
+                events = _single(self._push_call(agent_name, lease.client, parts, context_id, metadata))
+            else:
+                events = self._stream_events(agent_name, lease.client, parts, context_id, metadata)
+            async with aclosing(events):
+                async for event in events:
+                    if raise_rejected and _is_rejection(event):
+                        retry_after = (event.metadata or {}).get("retry_after") if isinstance(
+                            event, TaskStatusUpdateEvent
+                        ) else None
+                        raise AgentRejectedError(agent_name, retry_after)
+                    yield event
+
+    async def _push_call(
+        self,
+        agent_name: str,
+        client: A2AClient,
+        parts: list[Part],
+        context_id: str,
+        metadata: dict[str, Any] | None = None,
+    ) -> Task:
+        """Submit a task to a remote agent without blocking and wait for its push notification."""
+        span = tracer.start_span(f"a2a.send_message {agent_name}", kind=SpanKind.CLIENT)
+        request = SendMessageRequest(
+            id=str(uuid4()),
+            params=MessageSendParams(
+                message={
+                    "messageId": uuid4().hex,
+                    "role": "user",
+                    "parts": parts,
+                    "contextId": context_id,
+                    "metadata": inject_context(metadata, span),
+                },
+                configuration=MessageSendConfiguration(
+                    acceptedOutputModes=["text"],
+                    blocking=False,
+                    pushNotificationConfig=PushNotificationConfig(url=self.pending_tasks.url),
+                ),
+            ),
+        )
+
+        task = None
+        try:
+            response = await client.send_message(request)
+            if isinstance(response.root, JSONRPCErrorResponse):
+                raise RuntimeError(f"{agent_name} agent error: {response.root.error.message}")
+            task = response.root.result
+            if not isinstance(task, Task):
+                # The agent answered with a message right away
+                return Task(
+                    id=task.taskId or str(uuid4()),
+                    contextId=context_id,
+                    status=TaskStatus(state=TaskState.completed, message=task),
+                )
+            span.add_event("submitted", {"a2a.task_id": task.id})
+            task = await self.pending_tasks.wait(client, task)
+            span.set_attribute("a2a.state", task.status.state.value)
+            return task
+        except asyncio.CancelledError:
+            if task is not None:
+                self._cancel_remote_task(agent_name, client, task.id)
+            raise
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            span.end()
+
+    async def _stream_events(
+        self,
+        agent_name: str,
+        client: A2AClient,
+        parts: list[Part],
+        context_id: str,
+        metadata: dict[str, Any] | None = None,
+    ) -> AsyncIterator[Any]:
+        """Send a streaming message to a remote agent and yield its task events."""
+        # Not made current, since this generator may be closed from another context; the
+        # remote agent continues the trace from the message metadata
+        span = tracer.start_span(f"a2a.send_message_streaming {agent_name}", kind=SpanKind.CLIENT)
+
+        request = SendStreamingMessageRequest(
+            id=str(uuid4()),
+            params=MessageSendParams(
+                message={
+                    "messageId": uuid4().hex,
+                    "role": "user",
+                    "parts": parts,
+                    "contextId": context_id,
+                    "metadata": inject_context(metadata, span),
+                }
+            )
+        )
+
+        task_id = None
+        events = 0
+        try:
+            # Streaming disables the client timeout by default; keep a read timeout between events
+            async for response in client.send_message_streaming(
+                request, http_kwargs={"timeout": self.registry.timeout}
+            ):
+                if isinstance(response.root, JSONRPCErrorResponse):
+                    raise RuntimeError(f"{agent_name} agent error: {response.root.error.message}")
+                event = response.root.result
+                task_id = task_id or (event.id if isinstance(event, Task) else event.taskId)
+                events += 1
+                if events == 1:
+                    span.add_event("first_event")
+                yield event
+        except asyncio.CancelledError:
+            # Every caller went away; stop the remote generation as well
+            if task_id:
+                self._cancel_remote_task(agent_name, client, task_id)
+            raise
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            span.set_attribute("a2a.events", events)
+            span.end()
+
+    def _forward_event(self, agent_name: str, event: Any, artifacts: dict[str, list[str]]) -> None:
+        """Collect artifact text and forward the event to the streaming client."""
+        if isinstance(event, Task):
+            # A finished task from push mode carries the whole reply at once
+            for artifact in event.artifacts or []:
+                artifacts[artifact.artifactId] = [_parts_text(artifact.parts)]
+                emit_progress({
+                    "type": "artifact",
+                    "agent": agent_name,
+                    "artifactId": artifact.artifactId,
+                    "append": False,
+                    "text": artifacts[artifact.artifactId][0],
+                })
+            emit_progress({
+                "type": "status",
+                "agent": agent_name,
+                "state": event.status.state.value,
+                "text": _parts_text(event.status.message.parts) if event.status.message else "",
+            })
+        elif isinstance(event, TaskStatusUpdateEvent):
+            emit_progress({
+                "type": "status",
+                "agent": agent_name,
+                "state": event.status.state.value,
+                "text": _event_text(event),
+            })
+        elif isinstance(event, TaskArtifactUpdateEvent):
+            chunk = _parts_text(event.artifact.parts)
+            if event.append and event.artifact.artifactId in artifacts:
+                artifacts[event.artifact.artifactId].append(chunk)
+            else:
+                artifacts[event.artifact.artifactId] = [chunk]
+            emit_progress({
+                "type": "artifact",
+                "agent": agent_name,
+                "artifactId": event.artifact.artifactId,
+                "append": bool(event.append),
+                "text": chunk,
+            })
+
+    def _cancel_remote_task(self, agent_name: str, client: A2AClient, task_id: str) -> None:
+        """Send tasks/cancel in the background so the caller's cancellation is not delayed."""
+        async def cancel():
+            try:
+                await client.cancel_task(
+                    CancelTaskRequest(id=str(uuid4()), params=TaskIdParams(id=task_id))
+                )
+                logger.info(f"Canceled {agent_name} task {task_id}")
+            except Exception as e:
+                logger.warning(f"Failed to cancel {agent_name} task {task_id}: {e}")
+
+        cancel_task = asyncio.create_task(cancel())
+        self._pending_cancels.add(cancel_task)
+        cancel_task.add_done_callback(self._pending_cancels.discard)
+
+    def _attachment(self, label: str, value: str) -> Part:
+        """Message part carrying an artifact (given by handle) or plain text to an agent."""
+        text, artifact_id = self.artifacts.resolve(value)
+        metadata = {"artifactId": artifact_id} if artifact_id else None
+        return Part(root=TextPart(text=f"{label}:\n{text}", metadata=metadata))
+
+    def _article_context(self, article: str) -> str | None:
+        """The writer context an article (given by handle) is the latest draft of, if any."""
+        _, artifact_id = self.artifacts.resolve(article)
+        return self.artifacts.context_of(artifact_id) if artifact_id else None
+
+    def _article_result(self, reply: AgentReply) -> str:
+        """Tool result for an article: its handle and a short preview instead of the full text."""
+        if reply.artifact_id is None or reply.state != TaskState.completed:
+            return reply.text
+        preview = reply.text[:ARTICLE_PREVIEW_CHARS].rstrip()
+        return (
+            f"{make_handle(reply.artifact_id)}\n"
+            f"({len(reply.text.split())} words) {preview}..."
+        )
+
+    def _review_result(self, reply: AgentReply) -> str:
+        """Tool result for a review: its handle (for revise_blog) followed by the review text."""
+        if reply.artifact_id is None:
+            return reply.text
+        return f"{make_handle(reply.artifact_id)}\n{reply.text}"
+
     @kernel_function(
-        description="Use the writer agent to create a blog article on a given topic",
+        description=(
+            "Use the writer agent to create a blog article on a given topic. "
+            "Returns an artifact handle (artifact://...) for the article and a short preview."
+        ),
         name="write_blog"
     )
     async def write_blog(self, topic: str, requirements: str = "") -> str:
         """Ask the writer agent to create a blog article"""
-        async with httpx.AsyncClient(http2=True, timeout=httpx.Timeout(60.0)) as httpx_client:
-            resolver = A2ACardResolver(httpx_client=httpx_client, base_url=writer_url)
-            agent_card = await resolver.get_agent_card()
-
-            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
-
-            prompt = f"Write a blog article about: {topic}"
-            if requirements:
-                prompt += f"\n\nRequirements: {requirements}"
-
-            request = SendMessageRequest(
-                id=str(uuid4()),
-                params=MessageSendParams(
-                    message={
-                        "messageId": uuid4().hex,
-                        "role": "user",
-                        "parts": [{"text": prompt}],
-                        "contextId": str(uuid4()),
-                    }
-                )
-            )
-            response = await client.send_message(request)
-            result = response.model_dump(mode='json', exclude_none=True)
-            print(result)
-            logger.info(f"Writer agent response received")
-
-            return result["result"]["artifacts"][0]["parts"][0]["text"]
+        with WRITE_BLOG_SECONDS.time(), tracer.start_as_current_span("tool.write_blog"):
+            reply = await self._call("writer", write_prompt(topic, requirements), track_context=True)
+        return self._article_result(reply)
 
     @kernel_function(
-        description="Use the critic agent to review and provide feedback on a blog article",
+        description=(
+            "Use the critic agent to review and provide feedback on a blog article. "
+            "Pass the article's artifact handle. Returns a handle for the review and the review text."
+        ),
         name="review_blog"
     )
     async def review_blog(self, article: str) -> str:
         """Ask the critic agent to review a blog article"""
-        async with httpx.AsyncClient(http2=True, timeout=httpx.Timeout(60.0)) as httpx_client:
-            resolver = A2ACardResolver(httpx_client=httpx_client, base_url=critic_url)
-            agent_card = await resolver.get_agent_card()
-
-            client = A2AClient(httpx_client=httpx_client, agent_card=agent_card)
-
-            request = SendMessageRequest(
-                id=str(uuid4()),
-                params=MessageSendParams(
-                    message={
-                        "messageId": uuid4().hex,
-                        "role": "user",
-                        "parts": [{"text": f"Please review this blog article and provide feedback:\n\n{article}"}],
-                        "contextId": str(uuid4()),
-                    }
-                )
+        # Reviews of one article's revisions share a critic conversation
+        with REVIEW_BLOG_SECONDS.time(), tracer.start_as_current_span("tool.review_blog"):
+            reply = await self._call(
+                "critic",
+                "Please review the attached blog article and provide feedback.",
+                [self._attachment("Article", article)],
+                context_id=self._article_context(article),
             )
-            response = await client.send_message(request)
-            result = response.model_dump(mode='json', exclude_none=True)
-            logger.info(f"Critic agent response received")
+        return self._review_result(reply)
+
+    @kernel_function(
+        description=(
+            "Use the writer agent to revise a blog article based on the critic's review. "
+            "Pass the artifact handles of the article and of the review. "
+            "Returns an artifact handle for the revised article and a short preview."
+        ),
+        name="revise_blog"
+    )
+    async def revise_blog(self, article: str, review: str) -> str:
+        """Ask the writer agent to revise an article"""
+        context_id = self._article_context(article)
+        if context_id and self.registry.keeps_sessions("writer"):
+            # The writer still has the article in this conversation; only the feedback is new
+            prompt = REVISE_INSTRUCTION
+            attachments = [self._attachment("Feedback", review)]
+        else:
+            prompt = (
+                "Revise the attached blog article based on the editor's feedback. "
+                "Return the complete revised article."
+            )
+            attachments = [self._attachment("Article", article), self._attachment("Feedback", review)]
+        with REVISE_BLOG_SECONDS.time(), tracer.start_as_current_span("tool.revise_blog"):
+            reply = await self._call("writer", prompt, attachments, context_id=context_id, track_context=True)
+        return self._article_result(reply)
 
-            return result["result"]["artifacts"][0]["parts"][0]["text"]
+# The offline mock backend drafts and reviews once per turn unless MOCK_LLM_TOOL_SCRIPT says otherwise
+MOCK_COORDINATOR_SCRIPT = [
+    {"name": "BlogWritingTools-write_blog", "arguments": {"topic": "{user}"}},
+    {"name": "BlogWritingTools-review_blog", "arguments": {"article": "{last_result}"}},
+]
 
-# Create the blog coordination agent
-blog_coordinator_agent = ChatCompletionAgent(
-    service=AzureChatCompletion(
+if os.getenv('LLM_BACKEND', 'azure') == 'mock':
+    coordinator_service = MockChatCompletion.from_env("coordinator", MOCK_COORDINATOR_SCRIPT)
+else:
+    coordinator_service = AzureChatCompletion(
         api_key=os.getenv('AZURE_OPENAI_API_KEY'),
         endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
         deployment_name=os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME'),
         api_version="2024-12-01-preview",
-    ),
+    )
+
+# Articles and reviews exchanged between the agents, referenced by handle in the coordinator's prompt
+artifact_store = ArtifactStore(
+    max_artifacts=int(os.getenv('ARTIFACT_STORE_MAX_ARTIFACTS', '1000')),
+    ttl_seconds=float(os.getenv('ARTIFACT_STORE_TTL_SECONDS', '86400')),
+)
+
+# Retries, hedging and circuit breaking of agent calls; hedge delays and time budgets adapt to
+# the time each agent has recently taken to start answering
+call_policies = {
+    name: AgentCallPolicy(
+        name,
+        attempts=int(os.getenv("AGENT_CALL_ATTEMPTS", "3")),
+        hedge_quantile=float(os.getenv("AGENT_HEDGE_QUANTILE", "0.95")),
+        max_hedge_ratio=float(os.getenv("AGENT_MAX_HEDGE_RATIO", "0.1")),
+        budget_factor=float(os.getenv("AGENT_BUDGET_FACTOR", "3")),
+        failure_threshold=int(os.getenv("AGENT_BREAKER_FAILURES", "5")),
+        reset_seconds=float(os.getenv("AGENT_BREAKER_RESET_SECONDS", "30")),
+    )
+    for name in agent_urls
+}
+blog_writing_tools = BlogWritingTools(agent_registry, artifact_store, pending_tasks, call_policies)
+
+# Create the blog coordination agent
+blog_coordinator_agent = ChatCompletionAgent(
+    service=coordinator_service,
     name="BlogCoordinator",
     instructions="""You are a blog writing coordinator. Your role is to help users create high-quality blog articles by:
     1. Using the writer agent to create initial drafts
@@ -110,39 +711,480 @@ blog_coordinator_agent = ChatCompletionAgent(
     3. Iterating with the writer to improve the article based on feedback
     4. Delivering a polished final article
     
-    Always start by asking the writer to create a draft, then get feedback from the critic, and iterate as needed.""",
-    plugins=[BlogWritingTools()]
+    Always start by asking the writer to create a draft, then get feedback from the critic, and iterate as needed.
+
+    The tools return artifact handles such as artifact://1234 instead of full articles. Pass these handles
+    to review_blog and revise_blog rather than copying text. When the article is final, put its handle on
+    a line of its own in your answer; it is replaced with the article before the user sees it.""",
+    plugins=[blog_writing_tools]
 )
 
+
+class BlogRequest(BaseModel):
+    """Intent extracted from a user message in workflow mode."""
+    action: Literal["write", "chat"]
+    topic: str = ""
+    requirements: str = ""
+
+
+# Workflow mode: the coordinator model only parses the request and summarises the result
+blog_intent_agent = ChatCompletionAgent(
+    service=coordinator_service,
+    name="BlogIntentParser",
+    instructions="""Decide whether the user's message asks for a new blog article. If it does, set action to "write",
+    put the subject in topic and any wishes about audience, tone, length or structure in requirements.
+    Otherwise set action to "chat".""",
+    arguments=KernelArguments(
+        settings=OpenAIChatPromptExecutionSettings(response_format=BlogRequest)
+    ),
+)
+
+blog_summary_agent = ChatCompletionAgent(
+    service=coordinator_service,
+    name="BlogSummarizer",
+    instructions="""You present finished blog articles to the user. Given the topic and the editor's final review,
+    write two or three sentences about how the article was developed and its main strengths.
+    Do not repeat the article itself.""",
+)
+
+# WORKFLOW_PIPELINE=sections has the critic review each section of a draft while the rest is written;
+# WORKFLOW_REVISION=edits (default) revises with section edits applied here, "rewrite" regenerates the article
+blog_workflow = BlogWorkflow(
+    blog_writing_tools.call_agent,
+    max_iterations=int(os.getenv('WORKFLOW_MAX_ITERATIONS', '2')),
+    pipelined=os.getenv('WORKFLOW_PIPELINE', 'off') == 'sections',
+    section_min_words=int(os.getenv('WORKFLOW_SECTION_MIN_WORDS', '150')),
+    revision=os.getenv('WORKFLOW_REVISION', 'edits'),
+    writer_keeps_session=agent_registry.keeps_sessions("writer"),
+)
+
+# Bulk generation: topics flow through bounded writer and critic stages
+batch_pipeline = BatchPipeline(
+    blog_writing_tools.call_agent,
+    writer_concurrency=int(os.getenv('BATCH_WRITER_CONCURRENCY', '4')),
+    critic_concurrency=int(os.getenv('BATCH_CRITIC_CONCURRENCY', '4')),
+    max_iterations=int(os.getenv('WORKFLOW_MAX_ITERATIONS', '2')),
+    max_jobs=int(os.getenv('BATCH_MAX_JOBS', '100')),
+    revision=os.getenv('WORKFLOW_REVISION', 'edits'),
+    writer_keeps_session=agent_registry.keeps_sessions("writer"),
+)
+BATCH_MAX_TOPICS = int(os.getenv('BATCH_MAX_TOPICS', '100'))
+
+
+class BatchRequest(BaseModel):
+    topics: list[str]
+    requirements: str = ""
+    max_iterations: int | None = None
+
+
+async def coordinator_reply(thread: ChatHistoryAgentThread) -> AsyncIterator[str]:
+    """Stream the coordinator agent's reply; the thread records it in the chat history."""
+    async for chunk in blog_coordinator_agent.invoke_stream(thread=thread):
+        if chunk.content.content:
+            yield chunk.content.content
+
+
+async def workflow_reply(user_input: str, chat_history: ChatHistory) -> AsyncIterator[str]:
+    """Answer one turn in workflow mode.
+
+    Article requests run the write/review/revise state machine and are answered with a
+    short summary followed by the article; anything else goes to the coordinator agent.
+    """
+    intent = await blog_intent_agent.get_response(messages=user_input)
+    try:
+        blog_request = BlogRequest.model_validate_json(intent.message.content)
+    except ValueError:
+        logger.warning(f"Could not parse intent: {intent.message.content}")
+        blog_request = None
+
+    if blog_request is None or blog_request.action != "write":
+        thread = ChatHistoryAgentThread(chat_history=chat_history, thread_id=str(uuid4()))
+        async for text in coordinator_reply(thread):
+            yield text
+        return
+
+    result = await blog_workflow.run(
+        blog_request.topic, blog_request.requirements, on_progress=emit_progress
+    )
+    reply: list[str] = []
+    if not result.article:
+        reply.append(result.question or "The writer did not produce an article.")
+        yield reply[-1]
+    else:
+        revisions = "".join(
+            f"Revision {i}: {revision['summary']} (+{revision['lines_added']} -{revision['lines_removed']} lines)\n"
+            for i, revision in enumerate(result.revisions, 1)
+        )
+        summary_prompt = (
+            f"Topic: {blog_request.topic}\n"
+            f"Review rounds: {result.iterations}\n"
+            f"Approved by the editor: {'yes' if result.approved else 'no'}\n"
+            f"{revisions}\n"
+            f"Final review:\n{result.review}"
+        )
+        async for chunk in blog_summary_agent.invoke_stream(messages=summary_prompt):
+            if chunk.content.content:
+                reply.append(chunk.content.content)
+                yield reply[-1]
+        # The article goes to the user as-is, without passing through the coordinator model
+        reply.append(f"\n\n---\n\n{result.article}")
+        yield reply[-1]
+        if result.question:
+            reply.append(f"\n\n**The writer needs more information:** {result.question}")
+            yield reply[-1]
+
+    chat_history.messages.append(ChatMessageContent(role="assistant", content="".join(reply)))
+
+async def _join(chunks: AsyncIterator[str]) -> str:
+    return "".join([chunk async for chunk in chunks])
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    # The form body has been read already, so the next ASGI message is the disconnect
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def run_until_disconnect(request: Request, coro: Awaitable[Any]) -> Any | None:
+    """Await coro, cancelling it (and the remote agent tasks it started) if the client disconnects.
+
+    Returns None when the client went away before the result was ready.
+    """
+    work = asyncio.ensure_future(coro)
+    disconnect = asyncio.create_task(_wait_for_disconnect(request))
+    await asyncio.wait({work, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+    disconnect.cancel()
+    if work.done():
+        return work.result()
+
+    logger.info("Client disconnected, cancelling chat request")
+    work.cancel()
+    try:
+        await work
+    except asyncio.CancelledError:
+        pass
+    return None
+
+
 @app.post("/chat")
-async def chat(user_input: str = Form(...), context_id: str = Form("default")):
+async def chat(
+    request: Request,
+    http_response: Response,
+    user_input: str = Form(...),
+    context_id: str = Form("default"),
+    mode: str = Form(None),
+):
     logger.info(f"Received chat request: {user_input} with context ID: {context_id}")
+    started = time.perf_counter()
+
+    with tracer.start_as_current_span(
+        "POST /chat", kind=SpanKind.SERVER, attributes={"chat.context_id": context_id}
+    ) as span:
+        # The waterfall of this turn is at GET /traces/{id}
+        trace_id = trace_id_of(span)
+        if trace_id:
+            http_response.headers["X-Trace-Id"] = trace_id
+
+        chat_history = chat_history_store.get(context_id)
+
+        # Add user input to chat history
+        chat_history.messages.append(ChatMessageContent(role="user", content=user_input))
+
+        if (mode or coordinator_mode) == "workflow":
+            with tracer.start_as_current_span("coordinator.workflow"):
+                response_text = await run_until_disconnect(
+                    request, _join(workflow_reply(user_input, chat_history))
+                )
+            if response_text is None:
+                return Response(status_code=499)
+            chat_history_store.compact(chat_history)
+            logger.info(f"Blog workflow response: {response_text}")
+            CHAT_TURN_SECONDS.observe(time.perf_counter() - started)
+            return {"response": response_text}
+
+        # Create a new thread from the chat history
+        thread = ChatHistoryAgentThread(chat_history=chat_history, thread_id=str(uuid4()))
+
+        # Get response from the agent; the thread records the reply and tool messages in the chat history
+        with tracer.start_as_current_span("coordinator.get_response"):
+            response = await run_until_disconnect(
+                request, blog_coordinator_agent.get_response(message=user_input, thread=thread)
+            )
+        if response is None:
+            # Nobody is listening any more; 499 is the conventional "client closed request"
+            return Response(status_code=499)
+
+        # Keep the stored history (and the next prompt) within the token budget
+        chat_history_store.compact(chat_history)
+
+        logger.info(f"Blog coordinator response: {response.content.content}")
+        CHAT_TURN_SECONDS.observe(time.perf_counter() - started)
+
+        return {"response": artifact_store.expand(response.content.content)}
+
+
+@app.post("/chat/stream")
+async def chat_stream(
+    user_input: str = Form(...),
+    context_id: str = Form("default"),
+    mode: str = Form(None),
+):
+    """Server-sent events variant of /chat.
+
+    Emits ``status`` and ``artifact`` events while the remote agents work, ``token`` events
+    for the coordinator's own reply, and a final ``done`` (or ``error``) event.
+    """
+    logger.info(f"Received streaming chat request: {user_input} with context ID: {context_id}")
 
-    # Get or create ChatHistory for the context
     chat_history = chat_history_store.get(context_id)
-    if chat_history is None:
-        chat_history = ChatHistory(
-            messages=[],
-            system_message="You are a blog writing coordinator assistant. Help users create high-quality blog articles by coordinating between writer and critic agents."
+    chat_history.messages.append(ChatMessageContent(role="user", content=user_input))
+    thread = ChatHistoryAgentThread(chat_history=chat_history, thread_id=str(uuid4()))
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run_agent():
+        progress_sink.set(queue)
+        started = time.perf_counter()
+        span = tracer.start_span(
+            "POST /chat/stream", kind=SpanKind.SERVER, attributes={"chat.context_id": context_id}
         )
-        chat_history_store[context_id] = chat_history
-        logger.info(f"Created new ChatHistory for context ID: {context_id}")
+        try:
+            with trace.use_span(span, end_on_exit=False):
+                tokens: list[str] = []
+                if (mode or coordinator_mode) == "workflow":
+                    chunks = workflow_reply(user_input, chat_history)
+                else:
+                    chunks = coordinator_reply(thread)
+                async for text in chunks:
+                    tokens.append(text)
+                    queue.put_nowait({"type": "token", "text": text})
+            response_text = "".join(tokens)
+            chat_history_store.compact(chat_history)
+            logger.info(f"Blog coordinator response: {response_text}")
+            CHAT_STREAM_TURN_SECONDS.observe(time.perf_counter() - started)
+            queue.put_nowait({
+                "type": "done",
+                "response": artifact_store.expand(response_text),
+                "trace_id": trace_id_of(span),
+            })
+        except Exception as e:
+            logger.exception("Streaming chat request failed")
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            queue.put_nowait({"type": "error", "message": str(e)})
+        finally:
+            span.end()
+            queue.put_nowait(None)
 
-    # Add user input to chat history
-    chat_history.messages.append(ChatMessageContent(role="user", content=user_input))
+    async def event_stream():
+        agent_task = asyncio.create_task(run_agent())
+        try:
+            while (event := await queue.get()) is not None:
+                yield {"event": event["type"], "data": json.dumps(event)}
+        finally:
+            if not agent_task.done():
+                agent_task.cancel()
 
-    # Create a new thread from the chat history
-    thread = ChatHistoryAgentThread(chat_history=chat_history, thread_id=str(uuid4()))
+    return EventSourceResponse(event_stream())
+
+
+@app.post("/batch")
+async def create_batch(batch: BatchRequest):
+    """Queue a batch of topics for drafting and review; returns the job id to poll."""
+    topics = [topic.strip() for topic in batch.topics if topic.strip()]
+    if not topics:
+        return JSONResponse({"error": "No topics given"}, status_code=400)
+    if len(topics) > BATCH_MAX_TOPICS:
+        return JSONResponse(
+            {"error": f"At most {BATCH_MAX_TOPICS} topics per batch"}, status_code=400
+        )
+    job = batch_pipeline.submit(topics, batch.requirements, batch.max_iterations)
+    return JSONResponse(job.to_dict(), status_code=202)
+
+
+@app.get("/batch/stats")
+async def batch_stats():
+    return batch_pipeline.stats()
+
+
+@app.get("/batch/{job_id}")
+async def get_batch(job_id: str, include_text: bool = False):
+    """Job status with per-item progress; articles and reviews only with include_text=true."""
+    job = batch_pipeline.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown batch job {job_id}"}, status_code=404)
+    return job.to_dict(include_text)
+
+
+@app.delete("/batch/{job_id}")
+async def cancel_batch(job_id: str):
+    job = await batch_pipeline.cancel(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown batch job {job_id}"}, status_code=404)
+    return job.to_dict()
+
+
+@app.get("/batch/{job_id}/stream")
+async def stream_batch(job_id: str):
+    """Server-sent ``item`` events as items finish, then a ``done`` event with the job status."""
+    job = batch_pipeline.get(job_id)
+    if job is None:
+        return JSONResponse({"error": f"Unknown batch job {job_id}"}, status_code=404)
+
+    async def event_stream():
+        async for item in job.results():
+            yield {"event": "item", "data": json.dumps(item.to_dict())}
+        yield {"event": "done", "data": json.dumps(job.to_dict())}
+
+    return EventSourceResponse(event_stream())
+
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str):
+    """Return the text of an article or review by artifact id."""
+    text = artifact_store.get(artifact_id)
+    if text is None:
+        return JSONResponse({"error": f"Unknown artifact {artifact_id}"}, status_code=404)
+    return {"artifactId": artifact_id, "text": text}
+
+
+Callback(
+    "chat_history_contexts", "Conversations held by the coordinator chat history store.",
+    lambda: len(chat_history_store),
+)
+Callback("artifact_store_artifacts", "Articles and reviews held by the artifact store.", lambda: len(artifact_store))
+Callback(
+    "batch_stage_queue_depth",
+    "Batch items waiting for a pipeline stage.",
+    lambda: {"writer": batch_pipeline.stats()["writer_queue"], "critic": batch_pipeline.stats()["critic_queue"]},
+    ["stage"],
+)
+Callback("a2a_calls_in_flight", "Distinct remote agent calls in progress.", lambda: len(blog_writing_tools._flights))
+Callback(
+    "a2a_replica_outstanding_calls",
+    "Calls in progress per remote agent replica.",
+    lambda: {
+        (name, replica.base_url): replica.outstanding
+        for name in agent_urls for replica in agent_registry.replicas(name)
+    },
+    ["agent", "replica"],
+)
+Callback(
+    "a2a_replica_available",
+    "Whether a remote agent replica receives calls (healthy and not ejected).",
+    lambda: {
+        (name, replica.base_url): float(replica.available(time.monotonic()))
+        for name in agent_urls for replica in agent_registry.replicas(name)
+    },
+    ["agent", "replica"],
+)
+Callback(
+    "a2a_call_retries_total",
+    "Remote agent calls retried after a failure or rejection.",
+    lambda: {name: policy.retries for name, policy in call_policies.items()},
+    ["agent"],
+    type="counter",
+)
+Callback(
+    "a2a_call_hedges_total",
+    "Remote agent calls hedged on a second replica.",
+    lambda: {name: policy.hedges for name, policy in call_policies.items()},
+    ["agent"],
+    type="counter",
+)
+Callback(
+    "a2a_circuit_open",
+    "Whether calls to a remote agent fail fast after repeated failures.",
+    lambda: {name: float(policy.breaker.state == "open") for name, policy in call_policies.items()},
+    ["agent"],
+)
+if pending_tasks is not None:
+    Callback("a2a_push_tasks_pending", "Remote tasks waiting for their push notification.", lambda: len(pending_tasks))
+    Callback(
+        "a2a_push_tasks_resumed_total",
+        "Remote tasks resumed, by how their result arrived.",
+        lambda: {"notified": pending_tasks.notified, "polled": pending_tasks.polled},
+        ["via"],
+        type="counter",
+    )
+
+
+@app.post("/a2a/notifications", status_code=204)
+async def push_notification(request: Request, token: str = ""):
+    """Webhook for the push notifications of remote agents: the finished task, as JSON."""
+    if pending_tasks is None or not pending_tasks.check_token(token):
+        return JSONResponse({"error": "Unknown notification token"}, status_code=403)
+    try:
+        task = Task.model_validate(await request.json())
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid task: {e}"}, status_code=400)
+    pending_tasks.notify(task)
+    return Response(status_code=204)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/agents/stats")
+async def agent_stats():
+    """Routing state of each agent's replicas (calls outstanding, health and ejections) and
+    the agent's call policy (circuit breaker, retries and hedges)."""
+    stats = agent_registry.stats()
+    for name, policy in call_policies.items():
+        stats[name] = {**stats.get(name, {}), "policy": policy.stats()}
+    return stats
+
+
+@app.get("/agents/{agent_name}/metrics")
+async def agent_metrics(agent_name: str):
+    """Metrics of an agent hosted in this process (its own /metrics is not served)."""
+    if agent_name not in in_process_agents:
+        return JSONResponse({"error": f"Agent {agent_name} is not hosted in process"}, status_code=404)
+    registry = agent_registry.connection(agent_name).metrics_registry
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/traces")
+async def list_traces(limit: int = 50):
+    """The most recent traces recorded by the coordinator, newest first."""
+    return {"traces": trace_collector.recent(limit) if trace_collector else []}
+
+
+async def _agent_spans(conn: RemoteAgentConnection, trace_id: str) -> list[dict[str, Any]]:
+    try:
+        response = await conn.httpx_client.get(f"{conn.base_url}/traces/{trace_id}", timeout=5.0)
+        response.raise_for_status()
+        return response.json()["spans"]
+    except (httpx.HTTPError, ValueError, KeyError) as e:
+        logger.warning(f"Could not fetch spans of trace {trace_id} from {conn.name} at {conn.base_url}: {e}")
+        return []
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = "json"):
+    """All spans of one request across the coordinator, writer and critic.
 
-    # Get response from the agent
-    response = await blog_coordinator_agent.get_response(message=user_input, thread=thread)
+    ``format=text`` renders them as a waterfall instead of JSON.
+    """
+    spans = trace_collector.get(trace_id) if trace_collector else []
+    # In-process agents record their spans in this process already
+    replicas = [replica for name in agent_registry.agent_urls for replica in agent_registry.replicas(name)]
+    for agent_spans in await asyncio.gather(*(_agent_spans(replica, trace_id) for replica in replicas)):
+        spans.extend(agent_spans)
+    if not spans:
+        return JSONResponse({"error": f"Unknown trace {trace_id}"}, status_code=404)
+    spans.sort(key=lambda span: span["start"])
+    if format == "text":
+        return PlainTextResponse(waterfall_text(spans))
+    return {"trace_id": trace_id, "spans": spans}
 
-    # Add assistant response to chat history
-    chat_history.messages.append(ChatMessageContent(role="assistant", content=response.content.content))
 
-    logger.info(f"Blog coordinator response: {response.content.content}")
+@app.get("/history/stats")
+async def history_stats():
+    """Report the size of the coordinator's chat history store."""
+    return chat_history_store.memory_footprint()
 
-    return {"response": response.content.content}
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
@@ -1,23 +1,33 @@
+import asyncio
+import io
 import logging
 import os
-from typing import TYPE_CHECKING, Any, Literal
+import time
+from contextlib import aclosing
+from typing import Any, Literal
 from collections.abc import AsyncIterable
 
 from dotenv import load_dotenv
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
 from pydantic import BaseModel
-from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from semantic_kernel.connectors.ai.open_ai import (
     AzureChatCompletion,
     OpenAIChatPromptExecutionSettings,
 )
-from semantic_kernel.contents import (
-    StreamingChatMessageContent,
-    StreamingTextContent,
-)
+from semantic_kernel.contents import StreamingTextContent
 from semantic_kernel.functions import KernelArguments
 
-if TYPE_CHECKING:
-    from semantic_kernel.contents import ChatMessageContent
+from metrics import Histogram
+from mock_chat_completion import MockChatCompletion
+from response_cache import ResponseCache, cache_key
+from sections import Section, article_title, split_sections
+from session_store import Session, SessionStore
+from single_flight import SingleFlight
+from structured_stream import StructuredStreamParser
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +38,45 @@ load_dotenv("../.env")
 deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
 endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
 api_key = os.getenv('AZURE_OPENAI_API_KEY')
+llm_backend = os.getenv('LLM_BACKEND', 'azure')
 service_id = "critic_service"
 
+# Response cache limits; set CRITIC_CACHE_DIR to keep responses across restarts
+cache_max_entries = int(os.getenv('CRITIC_CACHE_MAX_ENTRIES', '256'))
+cache_ttl_seconds = float(os.getenv('CRITIC_CACHE_TTL_SECONDS', '3600'))
+cache_dir = os.getenv('CRITIC_CACHE_DIR') or None
+
+# Per-context conversation limits
+session_max = int(os.getenv('CRITIC_SESSION_MAX', '500'))
+session_ttl_seconds = float(os.getenv('CRITIC_SESSION_TTL_SECONDS', '3600'))
+session_max_messages = int(os.getenv('CRITIC_SESSION_MAX_MESSAGES', '20'))
+
+# Long-document mode: articles above this many words are reviewed section by section
+long_article_words = int(os.getenv('CRITIC_LONG_ARTICLE_WORDS', '2000'))
+section_max_words = int(os.getenv('CRITIC_SECTION_MAX_WORDS', '1200'))
+section_concurrency = int(os.getenv('CRITIC_SECTION_CONCURRENCY', '4'))
+
+# Size of the chunks a cached response is replayed in
+REPLAY_CHUNK_CHARS = 256
+
+# Returned when the model's reply is not a valid review; never cached
+UNPARSED_RESPONSE = {
+    'is_task_complete': False,
+    'require_user_input': True,
+    'content': 'Unable to process the review request. Please try again.',
+}
+
+FIRST_TOKEN_SECONDS = Histogram(
+    'agent_time_to_first_token_seconds', 'Time from sending a turn to the model until its first text delta.'
+)
+GENERATION_SECONDS = Histogram('agent_generation_seconds', 'Duration of streamed model turns.')
+# Streamed chunks are counted as tokens; the OpenAI stream sends about one token per chunk
+TOKENS_PER_SECOND = Histogram(
+    'agent_tokens_per_second',
+    'Streaming rate of model turns after the first token.',
+    buckets=(5, 10, 20, 40, 60, 80, 120, 160, 240, 320),
+)
+
 
 class ResponseFormat(BaseModel):
     """Response format for the critic agent."""
@@ -37,34 +84,74 @@ class ResponseFormat(BaseModel):
     message: str
 
 
+class SectionReview(BaseModel):
+    """A review of one section, made while the article was written, for the merged review."""
+    title: str
+    words: int
+    review: str
+
+
+# Default instructions; an agent host may give an agent definition its own
+INSTRUCTIONS = (
+    'You are a professional blog editor and critic. Your role is to review blog articles '
+    'and provide constructive feedback. Focus on: structure, clarity, engagement, accuracy, '
+    'grammar, and overall quality. If an article is well-written, acknowledge its strengths. '
+    'Always provide specific, actionable suggestions for improvement.\n\n'
+    'When reviewing, structure your feedback as follows:\n'
+    '1. Overall impression\n'
+    '2. Strengths of the article\n'
+    '3. Areas for improvement\n'
+    '4. Specific suggestions\n'
+    '5. Summary recommendation\n\n'
+    'Always respond in a constructive and encouraging tone.\n\n'
+    'Set status to "completed" when the article is ready to publish as it is, and to '
+    '"input_required" when it should be revised before publishing.'
+)
+
+
 class SemanticKernelCriticAgent:
     """Semantic Kernel-based agent for reviewing blog articles."""
     
-    def __init__(self):
-        # Configure Azure OpenAI service
-        chat_service = AzureChatCompletion(
-            service_id=service_id,
-            deployment_name=deployment_name,
-            endpoint=endpoint,
-            api_key=api_key,
-        )
+    def __init__(
+        self,
+        chat_service: ChatCompletionClientBase | None = None,
+        instructions: str | None = None,
+    ):
+        # Configure Azure OpenAI service, or the offline mock for local runs and benchmarks;
+        # an agent host passes one service shared by all of its agents
+        if chat_service is None and llm_backend == 'mock':
+            chat_service = MockChatCompletion.from_env(service_id)
+        elif chat_service is None:
+            chat_service = AzureChatCompletion(
+                service_id=service_id,
+                deployment_name=deployment_name,
+                endpoint=endpoint,
+                api_key=api_key,
+            )
         
         # Create the critic agent
         self.agent = ChatCompletionAgent(
             service=chat_service,
             name='BlogCriticAgent',
+            instructions=instructions or INSTRUCTIONS,
+            arguments=KernelArguments(
+                settings=OpenAIChatPromptExecutionSettings(
+                    response_format=ResponseFormat,
+                )
+            ),
+        )
+        
+        # Reviews single sections of long articles; its findings are merged by self.agent
+        self.section_agent = ChatCompletionAgent(
+            service=chat_service,
+            name='BlogSectionCriticAgent',
             instructions=(
-                'You are a professional blog editor and critic. Your role is to review blog articles '
-                'and provide constructive feedback. Focus on: structure, clarity, engagement, accuracy, '
-                'grammar, and overall quality. If an article is well-written, acknowledge its strengths. '
-                'Always provide specific, actionable suggestions for improvement.\n\n'
-                'When reviewing, structure your feedback as follows:\n'
-                '1. Overall impression\n'
-                '2. Strengths of the article\n'
-                '3. Areas for improvement\n'
-                '4. Specific suggestions\n'
-                '5. Summary recommendation\n\n'
-                'Always respond in a constructive and encouraging tone.'
+                'You are a professional blog editor reviewing one section of a longer blog article. '
+                'List the strengths of the section, its problems with structure, clarity, engagement, '
+                'accuracy or grammar, and specific suggestions for improving it. Be concise: use short '
+                'bullet points, at most 150 words, and do not rewrite the section.\n\n'
+                'Set status to "completed" when the section needs no changes, and to "input_required" '
+                'when it should be revised.'
             ),
             arguments=KernelArguments(
                 settings=OpenAIChatPromptExecutionSettings(
@@ -73,44 +160,391 @@ class SemanticKernelCriticAgent:
             ),
         )
         
-        # Store session data
-        self.sessions: dict[str, Any] = {}
+        # Conversation history per A2A context, so follow-ups only send what is new
+        self.sessions = SessionStore(
+            max_sessions=session_max,
+            ttl_seconds=session_ttl_seconds,
+            max_messages=session_max_messages,
+        )
+        
+        # Completed responses keyed by prompt, instructions and deployment
+        self.cache = ResponseCache(
+            max_entries=cache_max_entries,
+            ttl_seconds=cache_ttl_seconds,
+            disk_dir=cache_dir,
+        )
+        
+        # Identical concurrent first turns attach to one generation
+        self.flights = SingleFlight()
     
     async def invoke(self, user_input: str, session_id: str) -> dict[str, Any]:
         """Handle synchronous review requests."""
-        # Get agent response
-        response = await self.agent.get_response(messages=user_input)
-        return self._get_agent_response(response.message)
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            # Only a first turn is content-addressable; later turns depend on the history
+            key = self.fingerprint(user_input) if session.is_empty else None
+            cached = await self.cache.get(key) if key else None
+            if cached:
+                self._remember(session, user_input, cached)
+                return cached
+            
+            sections = self._long_sections(user_input)
+            if sections:
+                result = None
+                async with aclosing(self._review_long(user_input, sections, session, key)) as items:
+                    async for item in items:
+                        result = item
+                self.sessions.trim(session)
+                return result
+            
+            # Get agent response; the thread records the exchange in the session
+            mark = len(session.history.messages)
+            try:
+                response = await self.agent.get_response(messages=user_input, thread=self._thread(session))
+            except BaseException:
+                del session.history.messages[mark:]
+                raise
+            result = self._get_agent_response(response.message.content)
+            if key:
+                await self._cache_result(key, result)
+            self.sessions.trim(session)
+            return result
     
     async def stream(
         self,
         user_input: str,
         session_id: str,
+        section_reviews: list[SectionReview] | None = None,
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Handle streaming review requests.
+        
+        Yields a working notice, then every text delta as it arrives (marked with
+        ``'delta': True``), and finally the structured response. Turns in one context
+        share a conversation history. First turns are served from the response cache
+        when possible, and identical concurrent ones share a single generation. Long
+        articles are reviewed section by section (see :meth:`_review_long`), and an
+        article whose ``section_reviews`` were made while it was written only has
+        them merged.
+        """
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            if section_reviews:
+                outline = [(review.title, review.words) for review in section_reviews]
+                prompt = self._merge_prompt(
+                    article_title(user_input), outline, [review.review for review in section_reviews]
+                )
+                async with aclosing(self._generate(prompt, session)) as items:
+                    async for item in items:
+                        yield item
+                self.sessions.trim(session)
+                return
+            
+            if not session.is_empty:
+                # closed explicitly so an abandoned turn is rolled back before the lock is released
+                async with aclosing(self._review(user_input, session)) as items:
+                    async for item in items:
+                        yield item
+                self.sessions.trim(session)
+                return
+            
+            key = self.fingerprint(user_input)
+            cached = await self.cache.get(key)
+            if cached:
+                logger.info(f'Replaying cached response for {session_id}')
+                trace.get_current_span().add_event('response_cache_hit')
+                self._remember(session, user_input, cached)
+                async for item in self._replay(cached):
+                    yield item
+                return
+            
+            result = None
+            async for item in self.flights.stream(key, lambda: self._review(user_input, session, key)):
+                result = item
+                yield item
+            if result and not result.get('delta') and session.is_empty:
+                # another context's generation answered this turn; keep this history in step
+                self._remember(session, user_input, result)
+    
+    def _review(
+        self,
+        user_input: str,
+        session: Session,
+        key: str | None = None,
+    ) -> AsyncIterable[dict[str, Any]]:
+        sections = self._long_sections(user_input)
+        if sections:
+            return self._review_long(user_input, sections, session, key)
+        return self._generate(user_input, session, key)
+    
+    def _long_sections(self, user_input: str) -> list[Section] | None:
+        """The sections to review separately, or None when the article fits one review."""
+        if len(user_input.split()) <= long_article_words:
+            return None
+        sections = split_sections(user_input, max_words=section_max_words)
+        return sections if len(sections) > 1 else None
+    
+    async def _review_long(
+        self,
+        user_input: str,
+        sections: list[Section],
+        session: Session,
+        key: str | None = None,
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Map-reduce review of a long article.
+        
+        Sections are critiqued concurrently (at most ``section_concurrency`` at a time),
+        then one short turn on the session's history merges the findings into the usual
+        five-part review, so the wall-clock time follows the slowest section rather than
+        the article length.
+        """
+        title = article_title(user_input)
+        logger.info(f'Reviewing "{title}" in {len(sections)} sections')
+        yield {
+            'is_task_complete': False,
+            'require_user_input': False,
+            'content': f'Reviewing the article in {len(sections)} sections...',
+        }
+        
+        limit = asyncio.Semaphore(section_concurrency)
+        tasks = [
+            asyncio.create_task(self._review_section(title, section, i, len(sections), limit))
+            for i, section in enumerate(sections, 1)
+        ]
+        try:
+            for done, review in enumerate(asyncio.as_completed(tasks), 1):
+                await review
+                yield {
+                    'is_task_complete': False,
+                    'require_user_input': False,
+                    'content': f'Reviewed {done} of {len(sections)} sections...',
+                }
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        findings = [task.result() for task in tasks]
+        outline = [(section.title, section.words) for section in sections]
+        async for item in self._generate(self._merge_prompt(title, outline, findings), session, key):
+            yield item
+    
+    async def _review_section(
+        self,
+        title: str,
+        section: Section,
+        index: int,
+        count: int,
+        limit: asyncio.Semaphore,
+    ) -> str:
+        async with limit:
+            result = await self._section_result(self._section_prompt(title, section, index, count), index, section)
+        return result['content']
+    
+    async def review_section(self, section_text: str, metadata: dict[str, Any]) -> AsyncIterable[dict[str, Any]]:
+        """Review one section of an article that is still being written (the review_section skill).
+        
+        ``metadata`` names the article, the section and its index. The section is
+        reviewed without a session; its review is complete when the section needs no
+        changes, and requires input otherwise. Reviews are cached by prompt, so a section
+        left unchanged in a revised draft is not reviewed again.
+        """
+        title = str(metadata.get('article') or 'Untitled')
+        index = int(metadata.get('index') or 1)
+        section = Section(str(metadata.get('section') or f'Section {index}'), section_text)
+        prompt = self._section_prompt(title, section, index)
+        key = cache_key(prompt, self.section_agent.instructions, f'{llm_backend}:{deployment_name}')
+        cached = await self.cache.get(key)
+        if cached:
+            trace.get_current_span().add_event('response_cache_hit')
+            yield cached
+            return
+        yield {
+            'is_task_complete': False,
+            'require_user_input': False,
+            'content': f'Reviewing section {index}: {section.title}...',
+        }
+        result = await self._section_result(prompt, index, section)
+        await self._cache_result(key, result)
+        yield result
+    
+    def _section_prompt(self, title: str, section: Section, index: int, count: int | None = None) -> str:
+        position = f'{index} of {count}' if count else str(index)
+        return f'Article: {title}\nSection {position}: {section.title}\n\n{section.text}'
+    
+    async def _section_result(self, prompt: str, index: int, section: Section) -> dict[str, Any]:
+        with tracer.start_as_current_span(
+            'critic.review_section', attributes={'section.index': index, 'section.words': section.words}
+        ):
+            response = await self.section_agent.get_response(messages=prompt)
+        return self._get_agent_response(str(response.message.content))
+    
+    def _merge_prompt(self, title: str, outline: list[tuple[str, int]], findings: list[str]) -> str:
+        """The turn merging section findings into one review; ``outline`` lists section titles and word counts."""
+        contents = '\n'.join(f'{i}. {name} ({words} words)' for i, (name, words) in enumerate(outline, 1))
+        notes = '\n\n'.join(
+            f'### Section {i}: {name}\n{text}'
+            for i, ((name, _), text) in enumerate(zip(outline, findings), 1)
+        )
+        return (
+            f'Review the blog article "{title}" ({sum(words for _, words in outline)} words). Each of its '
+            'sections was reviewed separately. Combine the section findings below into your review of the '
+            'whole article, using your usual five-part structure, and decide whether it is ready to publish.'
+            f'\n\nOutline:\n{contents}\n\nSection findings:\n\n{notes}'
+        )
+    
+    async def _generate(
+        self,
+        user_input: str,
+        session: Session,
+        key: str | None = None,
     ) -> AsyncIterable[dict[str, Any]]:
-        """Handle streaming review requests."""
-        chunks: list[StreamingChatMessageContent] = []
+        """Stream one model turn on the session's history.
+
+        The model streams a ResponseFormat JSON object; the deltas yielded are the decoded
+        text of its ``message`` as it grows, not the raw JSON.
+        """
+        # The raw text is kept for the fallback parse of a reply that is not a JSON object
+        buffer = io.StringIO()
+        parser = StructuredStreamParser('message')
         text_started = False
+        mark = len(session.history.messages)
+        started = time.perf_counter()
+        first_token_at = started
+        tokens = 0
+        # not made current: the generator may be closed from another context
+        span = tracer.start_span('agent.generate', attributes={'agent.history_messages': mark})
         
-        async for chunk in self.agent.invoke_stream(messages=user_input):
-            if any(isinstance(i, StreamingTextContent) for i in chunk.items):
+        try:
+            async for chunk in self.agent.invoke_stream(messages=user_input, thread=self._thread(session)):
+                if not any(isinstance(i, StreamingTextContent) for i in chunk.items):
+                    continue
+                text = chunk.message.content
+                if not text:
+                    continue
+                tokens += 1
                 if not text_started:
+                    first_token_at = time.perf_counter()
+                    FIRST_TOKEN_SECONDS.observe(first_token_at - started)
+                    span.add_event('first_token')
                     yield {
                         'is_task_complete': False,
                         'require_user_input': False,
                         'content': 'Analyzing the blog article...',
                     }
                     text_started = True
-                chunks.append(chunk.message)
+                buffer.write(text)
+                status_known = 'status' in parser.values
+                message_text = parser.feed(text)
+                if not status_known and 'status' in parser.values:
+                    span.add_event('status', {'agent.status': str(parser.values['status'])})
+                if message_text:
+                    yield {
+                        'is_task_complete': False,
+                        'require_user_input': False,
+                        'content': message_text,
+                        'delta': True,
+                    }
+        except BaseException as e:
+            # an abandoned or failed turn must not leave a dangling user message
+            del session.history.messages[mark:]
+            span.set_attribute('agent.tokens', tokens)
+            span.set_status(Status(StatusCode.ERROR, repr(e)))
+            span.end()
+            raise
+        
+        span.set_attribute('agent.tokens', tokens)
+        if not text_started:
+            span.end()
+            return
+        finished = time.perf_counter()
+        GENERATION_SECONDS.observe(finished - started)
+        if finished > first_token_at:
+            TOKENS_PER_SECOND.observe(tokens / (finished - first_token_at))
+        with tracer.start_as_current_span('agent.parse_response', context=trace.set_span_in_context(span)):
+            result = self._get_agent_response(buffer.getvalue(), parser.values if parser.complete else None)
+        span.end()
+        if key:
+            await self._cache_result(key, result)
+        yield result
+    
+    def known_tasks(self, session_id: str) -> set[str]:
+        """Ids of the context's tasks the session here already accounts for."""
+        session = self.sessions.peek(session_id)
+        return set(session.task_ids) if session else set()
+    
+    async def restore_session(
+        self,
+        session_id: str,
+        task_id: str,
+        turns: list[tuple[str, str, dict[str, Any]]],
+        other_tasks: set[str] = frozenset(),
+    ) -> None:
+        """Bring a session up to date before the turn of task ``task_id``.
         
-        if chunks:
-            yield self._get_agent_response(sum(chunks[1:], chunks[0]))
+        ``turns`` are the context's turns missing from the session, oldest first, as
+        (task id, user input, result), read from the task store the worker processes
+        share: another worker answered them, or the session expired here. They are
+        appended to the history. ``other_tasks`` are finished tasks of the context that
+        are not turns of the conversation, remembered so they are not read again.
+        """
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            missing = [turn for turn in turns if turn[0] not in session.task_ids]
+            if missing:
+                logger.info(f'Restoring {len(missing)} turns of session {session_id} from the task store')
+                for _, user_input, result in missing:
+                    self._remember(session, user_input, result)
+                self.sessions.trim(session)
+            session.task_ids |= {turn_id for turn_id, _, _ in missing} | other_tasks | {task_id}
+    
+    def fingerprint(self, user_input: str) -> str:
+        """Content address of a first-turn request, shared by the response cache and request coalescing."""
+        return cache_key(user_input, self.agent.instructions, f'{llm_backend}:{deployment_name}')
+    
+    def _thread(self, session: Session) -> ChatHistoryAgentThread:
+        return ChatHistoryAgentThread(chat_history=session.history)
     
-    def _get_agent_response(self, message: 'ChatMessageContent') -> dict[str, Any]:
-        """Extract structured response from agent's message."""
+    def _remember(self, session: Session, user_input: str, result: dict[str, Any]) -> None:
+        """Record an exchange that was answered without running the model on this session."""
+        status = 'completed' if result['is_task_complete'] else 'input_required'
+        session.history.add_user_message(user_input)
+        session.history.add_assistant_message(
+            ResponseFormat(status=status, message=result['content']).model_dump_json()
+        )
+    
+    async def _cache_result(self, key: str, result: dict[str, Any]) -> None:
+        # A review is the same for the same content whether it approves or asks for a
+        # revision; only a reply that could not be parsed is not reused
+        if result != UNPARSED_RESPONSE:
+            await self.cache.put(key, result)
+    
+    async def _replay(self, cached: dict[str, Any]) -> AsyncIterable[dict[str, Any]]:
+        """Replay a cached response as working notice, deltas and final response."""
+        yield {
+            'is_task_complete': False,
+            'require_user_input': False,
+            'content': 'Analyzing the blog article...',
+        }
+        content = cached['content']
+        for start in range(0, len(content), REPLAY_CHUNK_CHARS):
+            yield {
+                'is_task_complete': False,
+                'require_user_input': False,
+                'content': content[start:start + REPLAY_CHUNK_CHARS],
+                'delta': True,
+            }
+        yield cached
+    
+    def _get_agent_response(self, content: str, parsed: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Extract structured response from agent's message content.
+
+        ``parsed`` is the object already decoded while streaming, validated without parsing ``content`` again.
+        """
         try:
-            structured_response = ResponseFormat.model_validate_json(
-                message.content
-            )
+            if parsed is not None:
+                structured_response = ResponseFormat.model_validate(parsed)
+            else:
+                structured_response = ResponseFormat.model_validate_json(content)
             
             response_map = {
                 'input_required': {
@@ -133,8 +567,4 @@ class SemanticKernelCriticAgent:
         except Exception as e:
             logger.error(f"Error parsing response: {e}")
         
-        return {
-            'is_task_complete': False,
-            'require_user_input': True,
-            'content': 'Unable to process the review request. Please try again.',
-        }
+        return dict(UNPARSED_RESPONSE)
@@ -1,30 +1,73 @@
+import asyncio
 import logging
+from uuid import uuid4
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events.event_queue import EventQueue
+from a2a.server.tasks import TaskStore
 from a2a.types import (
+    Artifact,
+    Part,
+    Task,
     TaskArtifactUpdateEvent,
+    TaskNotCancelableError,
     TaskState,
     TaskStatus,
     TaskStatusUpdateEvent,
+    TextPart,
 )
 from a2a.utils import (
+    get_message_text,
+    get_text_parts,
     new_agent_text_message,
     new_task,
-    new_text_artifact,
 )
-from agent import SemanticKernelCriticAgent
+from a2a.utils.errors import ServerError
+from pydantic import ValidationError
+from agent import SectionReview, SemanticKernelCriticAgent
+from metrics import Counter, Histogram
 
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EVENTS = Counter('executor_events_total', 'Task events published by the executor.', ['type'])
+ARTIFACT_EVENTS = EVENTS.labels('artifact')
+STATUS_EVENTS = EVENTS.labels('status')
+EVENTS_PER_TASK = Histogram(
+    'executor_events_per_task',
+    'Events published for one task.',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+
+
+class _CountingQueue:
+    """Passes events on to a task's event queue, counting them."""
+    __slots__ = ('queue', 'events')
+
+    def __init__(self, queue: EventQueue):
+        self.queue = queue
+        self.events = 0
+
+    async def enqueue_event(self, event) -> None:
+        await self.queue.enqueue_event(event)
+        self.events += 1
+        if isinstance(event, TaskArtifactUpdateEvent):
+            ARTIFACT_EVENTS.inc()
+        else:
+            STATUS_EVENTS.inc()
+
 
 class SemanticKernelCriticAgentExecutor(AgentExecutor):
     """SemanticKernelCriticAgent Executor"""
 
-    def __init__(self):
-        self.agent = SemanticKernelCriticAgent()
+    def __init__(self, agent: SemanticKernelCriticAgent | None = None, task_store: TaskStore | None = None):
+        self.agent = agent or SemanticKernelCriticAgent()
+        # Earlier turns of a conversation are read back from here when this worker lacks them
+        self.task_store = task_store
+        # asyncio tasks running execute(), keyed by A2A task id
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancel_requested: set[str] = set()
 
     async def execute(
         self,
@@ -42,12 +85,73 @@ class SemanticKernelCriticAgentExecutor(AgentExecutor):
                 logger.error("No task and no message in context")
                 return
 
-        async for partial in self.agent.stream(query, task.contextId):
+        self._running[task.id] = asyncio.current_task()
+        counted = _CountingQueue(event_queue)
+        metadata = (context.message.metadata if context.message else None) or {}
+        try:
+            await self._stream_to_queue(query, task, counted, metadata)
+        except asyncio.CancelledError:
+            if task.id not in self._cancel_requested:
+                raise
+            # cancel() stopped the agent stream; finish the task cooperatively
+            logger.info(f"Task {task.id} canceled")
+            await counted.enqueue_event(self._canceled_event(task.id, task.contextId))
+        finally:
+            EVENTS_PER_TASK.observe(counted.events)
+            self._running.pop(task.id, None)
+            self._cancel_requested.discard(task.id)
+
+    async def _stream_to_queue(
+        self,
+        query: str,
+        task: Task,
+        event_queue: EventQueue | _CountingQueue,
+        metadata: dict | None = None,
+    ) -> None:
+        """Publish the agent's streamed response as task events.
+
+        A message with ``skill: review_section`` in its metadata reviews one section of an
+        article still being written; ``section_reviews`` carries such reviews to a review
+        of the finished article, which then merges them.
+        """
+        # Artifact deltas share one artifactId; the first chunk creates the artifact
+        artifact_id = str(uuid4())
+        artifact_started = False
+        streamed: list[str] = []
+
+        metadata = metadata or {}
+        if metadata.get('skill') == 'review_section':
+            partials = self.agent.review_section(query, metadata)
+        else:
+            # Turns in one context share the agent's conversation history
+            await self._restore_session(task)
+            partials = self.agent.stream(query, task.contextId, self._section_reviews(metadata))
+        async for partial in partials:
+            if partial.get('delta'):
+                # stream the text delta as it arrives
+                await event_queue.enqueue_event(  # type: ignore
+                    TaskArtifactUpdateEvent(
+                        append=artifact_started,
+                        contextId=task.contextId,
+                        taskId=task.id,
+                        lastChunk=False,
+                        artifact=self._artifact_chunk(artifact_id, partial['content']),
+                    )
+                )
+                artifact_started = True
+                streamed.append(partial['content'])
+                continue
+
             require_input = partial['require_user_input']
             is_done = partial['is_task_complete']
             text_content = partial['content']
 
             if require_input:
+                if artifact_started:
+                    # close the streamed artifact with the parsed message
+                    await event_queue.enqueue_event(  # type: ignore
+                        self._last_chunk(task, artifact_id, text_content, streamed)
+                    )
                 # notify that input is required
                 await event_queue.enqueue_event(  # type: ignore
                     TaskStatusUpdateEvent(
@@ -67,17 +171,7 @@ class SemanticKernelCriticAgentExecutor(AgentExecutor):
             elif is_done:
                 # send artifact update
                 await event_queue.enqueue_event(  # type: ignore
-                    TaskArtifactUpdateEvent(
-                        append=False,
-                        contextId=task.contextId,
-                        taskId=task.id,
-                        lastChunk=True,
-                        artifact=new_text_artifact(
-                            name='current_result',
-                            description='Result of request to agent.',
-                            text=text_content,
-                        ),
-                    )
+                    self._last_chunk(task, artifact_id, text_content, streamed)
                 )
                 # notify completion status
                 await event_queue.enqueue_event(  # type: ignore
@@ -106,7 +200,118 @@ class SemanticKernelCriticAgentExecutor(AgentExecutor):
                     )
                 )
 
+    def _section_reviews(self, metadata: dict) -> list[SectionReview] | None:
+        reviews = metadata.get('section_reviews')
+        if not reviews:
+            return None
+        try:
+            return [SectionReview.model_validate(review) for review in reviews]
+        except (TypeError, ValidationError) as e:
+            logger.warning(f'Ignoring invalid section reviews: {e}')
+            return None
+
+    async def _restore_session(self, task: Task) -> None:
+        """Give the agent the conversation's earlier turns from the shared task store.
+
+        With several worker processes, another worker may have answered some of them.
+        """
+        if self.task_store is None:
+            return
+        # Only tasks the session does not account for yet are read and decoded
+        known = self.agent.known_tasks(task.contextId) | {task.id}
+        stored = await self.task_store.list_by_context(task.contextId, skip=known)
+        turns = [
+            (earlier.id, get_message_text(earlier.history[0]), _stored_result(earlier))
+            for earlier in stored
+            if _is_session_turn(earlier)
+        ]
+        other_tasks = {
+            earlier.id
+            for earlier in stored
+            if earlier.status.state not in (TaskState.submitted, TaskState.working) and not _is_session_turn(earlier)
+        }
+        await self.agent.restore_session(task.contextId, task.id, turns, other_tasks)
+
+    def _artifact_chunk(self, artifact_id: str, text: str) -> Artifact:
+        """Build one chunk of the streamed result artifact."""
+        return Artifact(
+            artifactId=artifact_id,
+            name='current_result',
+            description='Result of request to agent.',
+            parts=[Part(root=TextPart(text=text))],
+        )
+
+    def _last_chunk(
+        self, task: Task, artifact_id: str, text: str, streamed: list[str]
+    ) -> TaskArtifactUpdateEvent:
+        """The chunk closing the result artifact with the parsed message.
+
+        When the streamed deltas already spell out the message, the closing chunk appends
+        nothing; otherwise (a reply that was not valid structured output) it replaces them.
+        """
+        complete = bool(streamed) and ''.join(streamed) == text
+        return TaskArtifactUpdateEvent(
+            append=complete,
+            contextId=task.contextId,
+            taskId=task.id,
+            lastChunk=True,
+            artifact=self._artifact_chunk(artifact_id, '' if complete else text),
+        )
+
+    def _canceled_event(self, task_id: str, context_id: str) -> TaskStatusUpdateEvent:
+        return TaskStatusUpdateEvent(
+            status=TaskStatus(state=TaskState.canceled),
+            final=True,
+            contextId=context_id,
+            taskId=task_id,
+        )
+
     async def cancel(
         self, context: RequestContext, event_queue: EventQueue
     ) -> None:
-        raise Exception('cancel not supported')
\ No newline at end of file
+        task = context.current_task
+        if task and task.status.state in (
+            TaskState.completed,
+            TaskState.canceled,
+            TaskState.failed,
+            TaskState.rejected,
+        ):
+            raise ServerError(error=TaskNotCancelableError())
+
+        running = self._running.get(context.task_id)
+        if running is None:
+            if task and task.status.state in (TaskState.submitted, TaskState.working):
+                # execute() runs in another worker process; tasks can only be canceled where they run
+                raise ServerError(
+                    error=TaskNotCancelableError(
+                        message='The task is running in another worker process and cannot be canceled from this one.'
+                    )
+                )
+            # waiting for input, nothing in flight; just record the cancellation
+            await event_queue.enqueue_event(  # type: ignore
+                self._canceled_event(context.task_id, context.context_id)
+            )
+            return
+
+        # execute() publishes the canceled status on the task's own queue,
+        # which also reaches the queue the cancel request is consuming
+        self._cancel_requested.add(context.task_id)
+        running.cancel()
+
+
+def _is_session_turn(task: Task) -> bool:
+    """Whether a stored task is an answered turn of its context's conversation."""
+    if task.status.state not in (TaskState.completed, TaskState.input_required) or not task.history:
+        return False
+    # the review_section skill is answered without the session
+    return (task.history[0].metadata or {}).get('skill') != 'review_section'
+
+
+def _stored_result(task: Task) -> dict:
+    """A stored turn's reply, in the form the agent streams its final result."""
+    complete = task.status.state == TaskState.completed
+    if complete:
+        content = ''.join(get_text_parts([part for artifact in task.artifacts or [] for part in artifact.parts]))
+    else:
+        content = get_message_text(task.status.message) if task.status.message else ''
+    return {'is_task_complete': complete, 'require_user_input': not complete, 'content': content}
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator
+
+from a2a.server.context import ServerCallContext
+from a2a.server.events import Event
+from a2a.server.request_handlers import DefaultRequestHandler
+from a2a.types import InternalError, Message, MessageSendParams, Task
+from a2a.utils.errors import ServerError
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+from tracing import extract_context, inject_context, tracer
+
+logger = logging.getLogger(__name__)
+
+
+class AgentRequestHandler(DefaultRequestHandler):
+    """DefaultRequestHandler that joins the caller's trace and supports non-blocking sends.
+
+    The span around each message/send or message/stream request continues the trace
+    context found in the message metadata, and replaces it there so the executor's
+    spans nest below the request. The span is not made current: the streaming
+    handler is an async generator that may be closed from another context.
+
+    A message/send with ``blocking: false`` and a push notification config returns the
+    submitted task right away; the finished task is posted to the config's URL once,
+    when it completes, fails or needs input.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Non-blocking requests running in the background
+        self._background: set[asyncio.Task] = set()
+
+    async def on_message_send(
+        self,
+        params: MessageSendParams,
+        context: ServerCallContext | None = None,
+    ) -> Message | Task:
+        config = params.configuration
+        if config and config.blocking is False and config.pushNotificationConfig and self._push_notifier:
+            return await self._send_in_background(params, context)
+
+        span = self._start_span('a2a.message_send', params)
+        try:
+            return await super().on_message_send(params, context)
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            span.end()
+
+    async def on_message_send_stream(
+        self,
+        params: MessageSendParams,
+        context: ServerCallContext | None = None,
+    ) -> AsyncGenerator[Event]:
+        span = self._start_span('a2a.message_stream', params)
+        events = 0
+        try:
+            async for event in super().on_message_send_stream(params, context):
+                events += 1
+                yield event
+        except Exception as e:
+            span.record_exception(e)
+            span.set_status(Status(StatusCode.ERROR, str(e)))
+            raise
+        finally:
+            span.set_attribute('a2a.events', events)
+            span.end()
+
+    async def _send_in_background(
+        self,
+        params: MessageSendParams,
+        context: ServerCallContext | None,
+    ) -> Message | Task:
+        """Run the request as a stream in the background and return its first event, the submitted task."""
+        push_config = params.configuration.pushNotificationConfig
+        # The streaming handler would notify on every event, deltas included; notify once at the end instead
+        params.configuration.pushNotificationConfig = None
+        first: asyncio.Future[Message | Task] = asyncio.get_running_loop().create_future()
+
+        async def run() -> None:
+            task_id = None
+            try:
+                async for event in self.on_message_send_stream(params, context):
+                    if isinstance(event, Task):
+                        task_id = event.id
+                    if not first.done():
+                        first.set_result(event)
+            except Exception as e:
+                logger.exception('Non-blocking request failed')
+                if not first.done():
+                    first.set_exception(e)
+            if not first.done():
+                first.set_exception(ServerError(error=InternalError(message='Agent produced no events')))
+            task = await self.task_store.get(task_id) if task_id else None
+            if task:
+                await self._push_notifier.set_info(task.id, push_config)
+                await self._push_notifier.send_notification(task)
+                await self._push_notifier.delete_info(task.id)
+
+        background = asyncio.create_task(run())
+        self._background.add(background)
+        background.add_done_callback(self._background.discard)
+        return await first
+
+    def _start_span(self, name: str, params: MessageSendParams):
+        message = params.message
+        span = tracer.start_span(
+            name,
+            context=extract_context(message.metadata),
+            kind=SpanKind.SERVER,
+            attributes={'a2a.context_id': message.contextId or '', 'a2a.message_id': message.messageId},
+        )
+        message.metadata = inject_context(message.metadata, span)
+        return span
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+from semantic_kernel.contents import AuthorRole, ChatHistory
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """Conversation state of one A2A context."""
+
+    def __init__(self):
+        self.history = ChatHistory()
+        # Serializes turns so concurrent requests in a context do not interleave messages
+        self.lock = asyncio.Lock()
+        self.last_access = time.monotonic()
+        # Ids of the context's A2A tasks already accounted for: turns the history holds, the
+        # turn running on it and finished tasks that are not part of the conversation
+        self.task_ids: set[str] = set()
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.history.messages
+
+
+class SessionStore:
+    """Bounded per-context sessions keyed by A2A context id.
+
+    Sessions are evicted least-recently-used beyond ``max_sessions`` and after
+    ``ttl_seconds`` without access. :meth:`trim` keeps each history within
+    ``max_messages`` by dropping the oldest exchanges.
+    """
+
+    def __init__(self, max_sessions: int = 500, ttl_seconds: float = 3600.0, max_messages: int = 20):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        """Get or create the session of a context, marking it as recently used."""
+        self._evict_expired()
+        session = self._sessions.pop(session_id, None) or Session()
+        session.last_access = time.monotonic()
+        self._sessions[session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            logger.info(f'Evicted least recently used session {evicted_id}')
+        return session
+
+    def peek(self, session_id: str) -> Session | None:
+        """The session of a context if it exists, without touching its recency."""
+        return self._sessions.get(session_id)
+
+    def trim(self, session: Session) -> None:
+        messages = session.history.messages
+        if len(messages) > self.max_messages:
+            del messages[:len(messages) - self.max_messages]
+            # drop the rest of a cut exchange so the history still starts with a user message
+            while messages and messages[0].role != AuthorRole.USER:
+                del messages[0]
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_access >= deadline or session.lock.locked():
+                break
+            del self._sessions[session_id]
+            logger.info(f'Evicted expired session {session_id}')
@@ -0,0 +1,212 @@
+import json
+import re
+from typing import Any
+
+# Characters that end a run of plain string content
+_STRING_SPECIAL = re.compile(r'["\\]')
+_WHITESPACE = ' \t\n\r'
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# Parser states
+_START, _KEY, _COLON, _VALUE, _STRING, _RAW, _NEXT, _DONE, _FAILED = range(9)
+
+
+class StructuredStreamParser:
+    """Incremental parser for a JSON object streamed by the model as structured output.
+
+    :meth:`feed` takes the chunks as they arrive and returns the text they add to the
+    ``stream_field`` string value, already decoded. Every other field is in ``values`` as
+    soon as its value is complete, so a short field such as ``status`` is known before a
+    long one after it. Once the object is closed (``complete``), ``values`` holds the
+    whole object and needs no second parse. Text that is not a JSON object stops the
+    parser and sets ``error``; the caller then falls back to parsing the full text.
+    """
+
+    def __init__(self, stream_field: str = 'message'):
+        self.stream_field = stream_field
+        self.values: dict[str, Any] = {}
+        self.error: str | None = None
+        self._state = _START
+        # Key of the value being parsed, or None while a key is parsed
+        self._key: str | None = None
+        self._parts: list[str] = []
+        # Escape sequence split across chunks, and a high surrogate awaiting its pair
+        self._escape = ''
+        self._surrogate: int | None = None
+        # Raw text of a number, literal or nested value, with its nesting state
+        self._raw: list[str] = []
+        self._depth = 0
+        self._raw_in_string = False
+        self._raw_escaped = False
+
+    @property
+    def complete(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk; returns the decoded text it adds to the streamed field."""
+        delta: list[str] = []
+        i, n = 0, len(chunk)
+        while i < n and self._state != _FAILED:
+            state = self._state
+            if state == _STRING:
+                i = self._string(chunk, i, delta)
+                continue
+            if state == _RAW:
+                i = self._raw_value(chunk, i)
+                continue
+            char = chunk[i]
+            i += 1
+            if char in _WHITESPACE:
+                continue
+            if state == _START:
+                self._expect(char, '{', _KEY)
+            elif state == _KEY:
+                if char == '"':
+                    self._key = None
+                    self._state = _STRING
+                elif char == '}' and not self.values:
+                    self._state = _DONE
+                else:
+                    self._fail(f'expected a key, got {char!r}')
+            elif state == _COLON:
+                self._expect(char, ':', _VALUE)
+            elif state == _VALUE:
+                if char == '"':
+                    self._state = _STRING
+                else:
+                    self._raw = [char]
+                    self._depth = 1 if char in '{[' else 0
+                    self._raw_in_string = self._raw_escaped = False
+                    self._state = _RAW
+            elif state == _NEXT:
+                if char == ',':
+                    self._state = _KEY
+                    self._key = None
+                elif char == '}':
+                    self._state = _DONE
+                else:
+                    self._fail(f'expected "," or "}}", got {char!r}')
+            else:
+                self._fail(f'unexpected {char!r} after the object')
+        return ''.join(delta)
+
+    def _expect(self, char: str, expected: str, state: int) -> None:
+        if char == expected:
+            self._state = state
+        else:
+            self._fail(f'expected {expected!r}, got {char!r}')
+
+    def _fail(self, reason: str) -> None:
+        self.error = reason
+        self._state = _FAILED
+
+    def _string(self, chunk: str, i: int, delta: list[str]) -> int:
+        """Consume string content up to its closing quote or the end of the chunk."""
+        streamed = self._key == self.stream_field
+        n = len(chunk)
+        while i < n:
+            if self._escape:
+                self._escape += chunk[i]
+                i += 1
+                if self._escape[1] == 'u' and len(self._escape) < 6:
+                    continue
+                text = self._decode_escape(self._escape)
+                self._escape = ''
+                if self._state == _FAILED:
+                    return n
+                if text is not None:
+                    self._append(text, streamed, delta)
+                continue
+            match = _STRING_SPECIAL.search(chunk, i)
+            end = match.start() if match else n
+            if end > i:
+                self._append(chunk[i:end], streamed, delta)
+            if not match:
+                return n
+            if chunk[end] == '\\':
+                self._escape = '\\'
+                i = end + 1
+                continue
+            self._end_string()
+            return end + 1
+        return i
+
+    def _decode_escape(self, escape: str) -> str | None:
+        if escape[1] != 'u':
+            text = _ESCAPES.get(escape[1])
+            if text is None:
+                self._fail(f'invalid escape {escape!r}')
+            return text
+        try:
+            code = int(escape[2:], 16)
+        except ValueError:
+            self._fail(f'invalid escape {escape!r}')
+            return None
+        if 0xD800 <= code < 0xDC00:
+            self._surrogate = code
+            return None
+        if 0xDC00 <= code < 0xE000 and self._surrogate is not None:
+            code = 0x10000 + ((self._surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._surrogate = None
+        return chr(code)
+
+    def _append(self, text: str, streamed: bool, delta: list[str]) -> None:
+        if self._surrogate is not None:
+            # a high surrogate without its pair, kept as json.loads would
+            text = chr(self._surrogate) + text
+            self._surrogate = None
+        self._parts.append(text)
+        if streamed:
+            delta.append(text)
+
+    def _end_string(self) -> None:
+        if self._surrogate is not None:
+            self._parts.append(chr(self._surrogate))
+            self._surrogate = None
+        text = ''.join(self._parts)
+        self._parts = []
+        if self._key is None:
+            self._key = text
+            self._state = _COLON
+        else:
+            self.values[self._key] = text
+            self._state = _NEXT
+
+    def _raw_value(self, chunk: str, i: int) -> int:
+        """Consume a number, literal or nested value, which is decoded once complete."""
+        n = len(chunk)
+        start = i
+        while i < n:
+            char = chunk[i]
+            if self._raw_in_string:
+                if self._raw_escaped:
+                    self._raw_escaped = False
+                elif char == '\\':
+                    self._raw_escaped = True
+                elif char == '"':
+                    self._raw_in_string = False
+            elif char == '"':
+                self._raw_in_string = True
+            elif char in '{[':
+                self._depth += 1
+            elif char in '}]' and self._depth:
+                self._depth -= 1
+            elif self._depth == 0 and char in ',}':
+                # the value ended; the separator is consumed by the next state
+                self._raw.append(chunk[start:i])
+                self._end_raw()
+                return i
+            i += 1
+        self._raw.append(chunk[start:i])
+        return i
+
+    def _end_raw(self) -> None:
+        text = ''.join(self._raw)
+        self._raw = []
+        try:
+            self.values[self._key] = json.loads(text)
+        except ValueError:
+            self._fail(f'invalid value for {self._key!r}')
+            return
+        self._state = _NEXT
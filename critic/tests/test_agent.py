@@ -0,0 +1,54 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault('LLM_BACKEND', 'mock')
+
+from agent import SemanticKernelCriticAgent  # noqa: E402
+
+
+class ScriptedAgent:
+    """Stands in for a chat completion agent, answering every prompt with ``reply``."""
+
+    def __init__(self, reply: str):
+        self.instructions = 'Review the section.'
+        self.reply = reply
+        self.calls = 0
+
+    async def get_response(self, messages):
+        self.calls += 1
+        return SimpleNamespace(message=SimpleNamespace(content=self.reply))
+
+
+async def review(agent: SemanticKernelCriticAgent, text: str) -> dict:
+    result = None
+    async for result in agent.review_section(text, {'article': 'Tea', 'index': 1, 'section': 'Intro'}):
+        pass
+    return result
+
+
+def test_revise_verdicts_are_cached():
+    agent = SemanticKernelCriticAgent()
+    agent.section_agent = ScriptedAgent(json.dumps({'status': 'input_required', 'message': 'Add an example.'}))
+
+    async def main():
+        return await review(agent, 'Tea is a drink.'), await review(agent, 'Tea is a drink.')
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert first['require_user_input'] and first['content'] == 'Add an example.'
+    assert agent.section_agent.calls == 1
+    assert agent.cache.hits == 1
+
+
+def test_unparsed_replies_are_not_cached():
+    agent = SemanticKernelCriticAgent()
+    agent.section_agent = ScriptedAgent('not a review')
+
+    async def main():
+        await review(agent, 'Tea is a drink.')
+        await review(agent, 'Tea is a drink.')
+
+    asyncio.run(main())
+    assert agent.section_agent.calls == 2
@@ -0,0 +1,147 @@
+import logging
+import time
+from collections import OrderedDict
+
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistory,
+    ChatMessageContent,
+    FunctionCallContent,
+    FunctionResultContent,
+)
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for budgeting; avoids pulling in a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+def _message_chars(message: ChatMessageContent) -> int:
+    """Number of characters a message contributes to the prompt."""
+    chars = 0
+    for item in message.items:
+        if isinstance(item, FunctionResultContent):
+            chars += len(str(item.result))
+        elif isinstance(item, FunctionCallContent):
+            chars += len(str(item.arguments or ""))
+        else:
+            chars += len(str(item))
+    return chars
+
+
+def _is_tool_message(message: ChatMessageContent) -> bool:
+    return message.role == AuthorRole.TOOL or any(
+        isinstance(item, (FunctionCallContent, FunctionResultContent)) for item in message.items
+    )
+
+
+class ChatHistoryStore:
+    """Bounded store of coordinator chat histories keyed by context id.
+
+    Contexts are evicted least-recently-used once ``max_contexts`` is exceeded and after
+    ``ttl_seconds`` without access. Each history is kept within ``max_tokens`` by
+    :meth:`compact`: the last ``keep_recent_turns`` turns stay verbatim, older turns lose
+    their tool call/result messages and have their text truncated, and the oldest
+    compacted messages are dropped if the budget is still exceeded.
+    """
+
+    def __init__(
+        self,
+        system_message: str,
+        max_contexts: int = 1000,
+        ttl_seconds: float = 24 * 3600,
+        max_tokens: int = 8000,
+        keep_recent_turns: int = 2,
+        compacted_message_chars: int = 500,
+    ):
+        self.system_message = system_message
+        self.max_contexts = max_contexts
+        self.ttl_seconds = ttl_seconds
+        self.max_tokens = max_tokens
+        self.keep_recent_turns = keep_recent_turns
+        self.compacted_message_chars = compacted_message_chars
+        self._histories: OrderedDict[str, tuple[ChatHistory, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._histories)
+
+    def __contains__(self, context_id: str) -> bool:
+        return context_id in self._histories
+
+    def get(self, context_id: str) -> ChatHistory:
+        """Get or create the ChatHistory for a context, marking it as recently used."""
+        self._evict_expired()
+        entry = self._histories.pop(context_id, None)
+        if entry is None:
+            chat_history = ChatHistory(messages=[], system_message=self.system_message)
+            logger.info(f"Created new ChatHistory for context ID: {context_id}")
+        else:
+            chat_history = entry[0]
+        self._histories[context_id] = (chat_history, time.monotonic())
+
+        while len(self._histories) > self.max_contexts:
+            evicted_id, _ = self._histories.popitem(last=False)
+            logger.info(f"Evicted least recently used ChatHistory for context ID: {evicted_id}")
+        return chat_history
+
+    def delete(self, context_id: str) -> None:
+        self._histories.pop(context_id, None)
+
+    def compact(self, chat_history: ChatHistory) -> None:
+        """Bring a chat history within the per-context token budget, in place."""
+        messages = chat_history.messages
+        system = [m for m in messages if m.role in (AuthorRole.SYSTEM, AuthorRole.DEVELOPER)]
+        conversation = [m for m in messages if m.role not in (AuthorRole.SYSTEM, AuthorRole.DEVELOPER)]
+
+        # Turns start at user messages; never split a turn so tool calls stay paired
+        turn_starts = [i for i, m in enumerate(conversation) if m.role == AuthorRole.USER]
+        if len(turn_starts) > self.keep_recent_turns:
+            split = turn_starts[-self.keep_recent_turns] if self.keep_recent_turns else len(conversation)
+        else:
+            split = 0
+        older, recent = conversation[:split], conversation[split:]
+
+        compacted = [self._compact_message(m) for m in older if not _is_tool_message(m)]
+        compacted = [m for m in compacted if m.content]
+
+        budget_chars = self.max_tokens * CHARS_PER_TOKEN
+        used_chars = sum(_message_chars(m) for m in system + recent)
+        kept: list[ChatMessageContent] = []
+        for message in reversed(compacted):
+            used_chars += _message_chars(message)
+            if used_chars > budget_chars:
+                break
+            kept.append(message)
+        kept.reverse()
+
+        messages[:] = system + kept + recent
+
+    def _compact_message(self, message: ChatMessageContent) -> ChatMessageContent:
+        content = message.content or ""
+        if len(content) > self.compacted_message_chars:
+            content = content[: self.compacted_message_chars].rstrip() + " [...]"
+        return ChatMessageContent(role=message.role, content=content, name=message.name)
+
+    def memory_footprint(self) -> dict[str, int]:
+        """Approximate size of all stored histories."""
+        message_count = 0
+        chars = 0
+        for chat_history, _ in self._histories.values():
+            message_count += len(chat_history.messages)
+            chars += sum(_message_chars(m) for m in chat_history.messages)
+        return {
+            "contexts": len(self._histories),
+            "messages": message_count,
+            "chars": chars,
+            "estimated_tokens": chars // CHARS_PER_TOKEN,
+        }
+
+    def _evict_expired(self) -> None:
+        # Entries are kept in access order, so expired ones are at the front
+        deadline = time.monotonic() - self.ttl_seconds
+        while self._histories:
+            context_id, (_, last_access) = next(iter(self._histories.items()))
+            if last_access >= deadline:
+                break
+            del self._histories[context_id]
+            logger.info(f"Evicted expired ChatHistory for context ID: {context_id}")
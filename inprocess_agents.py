@@ -0,0 +1,121 @@
+import importlib.util
+import logging
+import os
+import sys
+from collections.abc import AsyncGenerator
+from types import ModuleType
+from typing import Any
+from urllib.parse import urlsplit
+
+from a2a.server.request_handlers import JSONRPCHandler
+from a2a.types import (
+    AgentCard,
+    CancelTaskRequest,
+    CancelTaskResponse,
+    GetTaskRequest,
+    GetTaskResponse,
+    SendMessageRequest,
+    SendMessageResponse,
+    SendStreamingMessageRequest,
+    SendStreamingMessageResponse,
+)
+
+logger = logging.getLogger(__name__)
+
+# Agent modules that stay shared with the coordinator instead of being loaded again;
+# tracing configures the process-wide tracer provider
+SHARED_MODULES = frozenset({"tracing"})
+
+
+def load_agent_module(name: str, directory: str) -> ModuleType:
+    """Import an agent's ``__main__.py`` from its project directory as ``{name}_agent``.
+
+    The agent projects use flat imports and share module names (agent, scheduler,
+    metrics, ...) with each other and with the coordinator. Each one is imported with its
+    own directory first on sys.path, and its modules are taken out of sys.modules again
+    afterwards; the loaded agent keeps its own references to them.
+    """
+    local = {file[:-3] for file in os.listdir(directory) if file.endswith(".py")}
+    local -= SHARED_MODULES | {"__main__"}
+    saved = {module: sys.modules.pop(module) for module in local if module in sys.modules}
+    sys.path.insert(0, directory)
+    try:
+        spec = importlib.util.spec_from_file_location(f"{name}_agent", os.path.join(directory, "__main__.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+        for module_name in local:
+            sys.modules.pop(module_name, None)
+        sys.modules.update(saved)
+    return module
+
+
+class InProcessA2AClient:
+    """Stand-in for A2AClient that calls an agent's request handler in this event loop.
+
+    Requests and responses stay typed objects, so a call costs no HTTP, JSON-RPC framing
+    or JSON (de)serialization. ``http_kwargs`` is accepted for compatibility and ignored.
+    """
+
+    def __init__(self, agent_card: AgentCard, request_handler: Any):
+        self._handler = JSONRPCHandler(agent_card, request_handler)
+
+    async def send_message(
+        self, request: SendMessageRequest, *, http_kwargs: dict[str, Any] | None = None
+    ) -> SendMessageResponse:
+        return await self._handler.on_message_send(request)
+
+    async def send_message_streaming(
+        self, request: SendStreamingMessageRequest, *, http_kwargs: dict[str, Any] | None = None
+    ) -> AsyncGenerator[SendStreamingMessageResponse]:
+        async for response in self._handler.on_message_send_stream(request):
+            yield response
+
+    async def get_task(
+        self, request: GetTaskRequest, *, http_kwargs: dict[str, Any] | None = None
+    ) -> GetTaskResponse:
+        return await self._handler.on_get_task(request)
+
+    async def cancel_task(
+        self, request: CancelTaskRequest, *, http_kwargs: dict[str, Any] | None = None
+    ) -> CancelTaskResponse:
+        return await self._handler.on_cancel_task(request)
+
+
+class InProcessAgentConnection:
+    """Hosts an agent in the coordinator's process behind the RemoteAgentConnection interface.
+
+    The agent is built by its own ``create_request_handler``, with a task store in its
+    project directory and the admission limits from MAX_IN_FLIGHT and MAX_QUEUE_DEPTH.
+    Its metrics go to a registry of its own (``metrics_registry``).
+    """
+
+    card_is_stale = False
+
+    def __init__(self, name: str, base_url: str, directory: str):
+        self.name = name
+        self.base_url = base_url
+        self.module = load_agent_module(name, directory)
+        self._push_client = self.module.create_push_client()
+        request_handler, self.task_store, self.scheduler = self.module.create_request_handler(
+            os.path.join(directory, "tasks.db"),
+            task_retention=float(os.getenv("TASK_RETENTION_SECONDS", str(7 * 24 * 3600))),
+            max_in_flight=int(os.getenv("MAX_IN_FLIGHT", "8")),
+            max_queue=int(os.getenv("MAX_QUEUE_DEPTH", "32")),
+            push_client=self._push_client,
+        )
+        self.metrics_registry = self.module.REGISTRY
+        self._card = self.module.get_agent_card("localhost", urlsplit(base_url).port)
+        self._client = InProcessA2AClient(self._card, request_handler)
+        logger.info(f"Hosting agent '{name}' in process from {directory}")
+
+    async def refresh_card(self) -> AgentCard:
+        return self._card
+
+    async def get_client(self) -> InProcessA2AClient:
+        return self._client
+
+    async def aclose(self) -> None:
+        await self.task_store.close()
+        await self._push_client.aclose()
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from a2a.types import GetTaskRequest, JSONRPCErrorResponse, Task, TaskQueryParams, TaskState
+
+logger = logging.getLogger(__name__)
+
+# States after which an agent does no more work on a task until it is sent another message
+FINAL_STATES = frozenset({
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+    TaskState.input_required,
+})
+
+
+class PendingTasks:
+    """Remote tasks submitted without waiting, resumed when their push notification arrives.
+
+    A waiting call holds a future instead of an HTTP connection, so the number of pending
+    generations is bounded by memory rather than by connections or request timeouts.
+    Agents post the finished task to ``url``, which carries a token the webhook checks.
+    A notification that is lost (or that arrives before the caller waits) is covered by
+    polling the agent with tasks/get every ``poll_interval`` seconds.
+    """
+
+    def __init__(self, callback_url: str, poll_interval: float = 30.0, timeout: float = 3600.0):
+        self.token = secrets.token_urlsafe(24)
+        self.url = f"{callback_url.rstrip('/')}/a2a/notifications?token={self.token}"
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._waiters: dict[str, asyncio.Future[Task]] = {}
+        # Final tasks notified before their caller started waiting
+        self._early: OrderedDict[str, Task] = OrderedDict()
+        self._max_early = 1000
+        self.notified = 0
+        self.polled = 0
+
+    def __len__(self) -> int:
+        return len(self._waiters)
+
+    def check_token(self, token: str) -> bool:
+        return secrets.compare_digest(token, self.token)
+
+    def notify(self, task: Task) -> None:
+        """Resume the caller waiting for ``task``, if the task reached a final state."""
+        if task.status.state not in FINAL_STATES:
+            return
+        waiter = self._waiters.get(task.id)
+        if waiter is None:
+            self._early[task.id] = task
+            while len(self._early) > self._max_early:
+                self._early.popitem(last=False)
+            return
+        if not waiter.done():
+            self.notified += 1
+            waiter.set_result(task)
+
+    async def wait(self, client, task: Task) -> Task:
+        """The submitted ``task`` once it reached a final state, as notified or polled from ``client``."""
+        if task.status.state in FINAL_STATES:
+            return task
+        early = self._early.pop(task.id, None)
+        if early is not None:
+            self.notified += 1
+            return early
+        waiter = self._waiters[task.id] = asyncio.get_running_loop().create_future()
+        deadline = time.monotonic() + self.timeout
+        try:
+            while True:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(waiter), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                current = await self._poll(client, task.id)
+                if current is not None and current.status.state in FINAL_STATES:
+                    self.polled += 1
+                    return current
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Task {task.id} did not finish within {self.timeout:.0f}s")
+        finally:
+            del self._waiters[task.id]
+
+    async def _poll(self, client, task_id: str) -> Task | None:
+        try:
+            response = await client.get_task(
+                GetTaskRequest(id=str(uuid4()), params=TaskQueryParams(id=task_id))
+            )
+        except Exception as e:
+            logger.warning(f"Polling task {task_id} failed: {e}")
+            return None
+        if isinstance(response.root, JSONRPCErrorResponse):
+            logger.warning(f"Polling task {task_id} failed: {response.root.error.message}")
+            return None
+        return response.root.result
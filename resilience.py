@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from typing import Generic, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an agent whose circuit breaker is open."""
+
+    def __init__(self, agent: str, retry_in: float):
+        super().__init__(f"The {agent} agent is unavailable after repeated failures; retry in {retry_in:.0f}s")
+        self.agent = agent
+        self.retry_in = retry_in
+
+
+class AgentRejectedError(Exception):
+    """An agent rejected a call without running it (admission queue full)."""
+
+    def __init__(self, agent: str, retry_after: float | None):
+        super().__init__(f"The {agent} agent is busy")
+        self.retry_after = retry_after
+
+
+class LatencyTracker:
+    """Recent latencies of one kind of call, for percentile-based hedge delays and timeouts."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """The ``q`` quantile (0-1) of the recent samples, or None while there are too few."""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Fails calls fast while an agent keeps failing.
+
+    Closed, it counts consecutive failures; ``failure_threshold`` of them open it. Open,
+    every call fails at once for ``reset_seconds``. It then lets a single trial call
+    through (half-open), which closes it on success and opens it again on failure.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go ahead."""
+        if self.state == "closed":
+            return
+        remaining = self._opened_at + self.reset_seconds - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return
+        raise CircuitOpenError(self.name, max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info(f"Circuit breaker for '{self.name}' closed")
+        self.state = "closed"
+        self.failures = 0
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker for '{self.name}' opened after {self.failures} failures")
+                self.opened += 1
+            self.state = "open"
+            self._opened_at = time.monotonic()
+        self._trial_running = False
+
+    def record_abandoned(self) -> None:
+        """The call ended without a verdict (e.g. it was canceled); let another trial through."""
+        self._trial_running = False
+
+
+class AgentCallPolicy:
+    """Hedging, retry and circuit-breaking settings and state for calls to one agent.
+
+    The hedge delay and the time budget adapt to the agent's observed time to first
+    progress: a hedge is sent once a call is slower than ``hedge_quantile`` of recent
+    calls, and a call fails once it takes ``budget_factor`` times the ``budget_quantile``.
+    Until enough calls were seen, nothing is hedged and the budget is ``max_budget``.
+    Hedges are limited to ``max_hedge_ratio`` of calls, so a slow agent is not sent
+    twice the load.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        attempts: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 10.0,
+        hedge_quantile: float = 0.95,
+        max_hedge_ratio: float = 0.1,
+        budget_quantile: float = 0.99,
+        budget_factor: float = 3.0,
+        min_budget: float = 5.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.attempts = attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.hedge_quantile = hedge_quantile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.budget_quantile = budget_quantile
+        self.budget_factor = budget_factor
+        self.min_budget = min_budget
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_seconds)
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.retries = 0
+
+    def hedge_delay(self) -> float | None:
+        """Seconds without progress after which a hedge may be sent, or None to not hedge now."""
+        if self.hedges >= self.max_hedge_ratio * max(self.calls, 1):
+            return None
+        return self.latency.percentile(self.hedge_quantile)
+
+    def budget(self, max_budget: float) -> float:
+        """Seconds a call may go without progress before it is abandoned."""
+        observed = self.latency.percentile(self.budget_quantile)
+        if observed is None:
+            return max_budget
+        return min(max(observed * self.budget_factor, self.min_budget), max_budget)
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff before retry ``attempt`` (1-based), at least ``retry_after``."""
+        delay = random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1)))
+        if retry_after is not None:
+            # spread retries over a second so rejected callers do not come back together
+            delay = max(delay, retry_after + random.uniform(0, 1.0))
+        return delay
+
+    def stats(self) -> dict:
+        return {
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_seconds": self.latency.percentile(self.hedge_quantile),
+            "p50_seconds": self.latency.percentile(0.5),
+        }
+
+
+class _Attempt(Generic[T]):
+    __slots__ = ("index", "task", "buffer", "done")
+
+    def __init__(self, index: int):
+        self.index = index
+        self.task: asyncio.Task | None = None
+        self.buffer: list[T] = []
+        self.done = False
+
+
+async def hedged(
+    start: Callable[[int], AsyncIterator[T]],
+    is_progress: Callable[[T], bool],
+    hedge_delay: float | None,
+    budget: float,
+    on_hedge: Callable[[], None] | None = None,
+    on_win: Callable[[int], None] | None = None,
+) -> AsyncIterator[T]:
+    """Yield the items of ``start(0)``, racing it against ``start(1)`` if it is slow.
+
+    Items are held back until an attempt makes progress (an item for which
+    ``is_progress`` is true, or its end). That attempt wins: its held-back and further
+    items are yielded and the other attempt is canceled. A second attempt is started
+    when the first made no progress within ``hedge_delay`` seconds (None: never).
+    TimeoutError is raised when no attempt made progress within ``budget`` seconds. An
+    attempt that fails before any progress is dropped, or its error raised when it was
+    the last one running.
+    """
+    events: asyncio.Queue[tuple[_Attempt[T], str, object]] = asyncio.Queue()
+
+    async def run(attempt: _Attempt[T]) -> None:
+        try:
+            async for item in start(attempt.index):
+                events.put_nowait((attempt, "item", item))
+            events.put_nowait((attempt, "end", None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            events.put_nowait((attempt, "error", e))
+
+    def launch(index: int) -> _Attempt[T]:
+        attempt = _Attempt(index)
+        attempt.task = asyncio.create_task(run(attempt))
+        return attempt
+
+    attempts = [launch(0)]
+    winner: _Attempt[T] | None = None
+    started = time.monotonic()
+    try:
+        while True:
+            if winner is None:
+                elapsed = time.monotonic() - started
+                if elapsed >= budget:
+                    raise TimeoutError(f"No progress within {budget:.1f}s")
+                wait = budget - elapsed
+                if hedge_delay is not None and len(attempts) == 1:
+                    if elapsed >= hedge_delay:
+                        if on_hedge:
+                            on_hedge()
+                        attempts.append(launch(1))
+                        continue
+                    wait = min(wait, hedge_delay - elapsed)
+                try:
+                    attempt, kind, value = await asyncio.wait_for(events.get(), wait)
+                except asyncio.TimeoutError:
+                    continue
+            else:
+                attempt, kind, value = await events.get()
+                if attempt is not winner:
+                    continue
+
+            if kind == "error":
+                attempt.done = True
+                if winner is attempt or all(other.done for other in attempts):
+                    raise value
+                continue
+            if winner is None and (kind == "end" or is_progress(value)):
+                winner = attempt
+                if on_win:
+                    on_win(winner.index)
+                for other in attempts:
+                    if other is not winner:
+                        other.task.cancel()
+                for item in winner.buffer:
+                    yield item
+                winner.buffer = []
+            if kind == "end":
+                return
+            if winner is None:
+                attempt.buffer.append(value)
+            else:
+                yield value
+    finally:
+        for attempt in attempts:
+            attempt.task.cancel()
+        await asyncio.gather(*(attempt.task for attempt in attempts), return_exceptions=True)
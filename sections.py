@@ -0,0 +1,151 @@
+import re
+from dataclasses import dataclass
+
+HEADER_PATTERN = re.compile(r'^#{1,6}[ \t]+(.+?)[ \t#]*$', re.MULTILINE)
+# Opening or closing line of a fenced code block, whose lines are never headers
+FENCE_PATTERN = re.compile(r'^ {0,3}(`{3,}|~{3,})')
+
+
+@dataclass
+class Section:
+    """A slice of an article, reviewed on its own in long-document mode."""
+    title: str
+    text: str
+
+    @property
+    def words(self) -> int:
+        return len(self.text.split())
+
+
+def find_headers(text: str) -> list[re.Match]:
+    """The Markdown header lines of ``text``, skipping lines in fenced code blocks."""
+    headers = []
+    fence = None
+    position = 0
+    for line in text.splitlines(keepends=True):
+        match = HEADER_PATTERN.match(text, position) if fence is None else None
+        if match:
+            headers.append(match)
+        else:
+            fence = _fence(line, fence)
+        position += len(line)
+    return headers
+
+
+def article_title(text: str) -> str:
+    """The first Markdown header of an article, or its first non-empty line."""
+    headers = find_headers(text)
+    if headers:
+        return headers[0].group(1).strip()
+    return next((line.strip() for line in text.splitlines() if line.strip()), 'Untitled')
+
+
+def split_sections(text: str, max_words: int = 1200, min_words: int = 150) -> list[Section]:
+    """Split an article at its Markdown headers into reviewable sections.
+
+    Sections shorter than ``min_words`` are merged into the one before them (or after,
+    for the first) so short subsections do not each cost a model call, and sections
+    longer than ``max_words`` are split at paragraph boundaries.
+    """
+    headers = find_headers(text)
+    sections = []
+    if not headers or headers[0].start() > 0:
+        preface = text[:headers[0].start() if headers else len(text)]
+        if preface.strip():
+            sections.append(Section('Introduction', preface.strip()))
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        sections.append(Section(header.group(1).strip(), text[header.start():end].strip()))
+
+    merged: list[Section] = []
+    for section in sections:
+        if merged and (section.words < min_words or merged[-1].words < min_words):
+            merged[-1] = Section(merged[-1].title, f'{merged[-1].text}\n\n{section.text}')
+        else:
+            merged.append(section)
+
+    result = []
+    for section in merged:
+        result.extend(_split_long(section, max_words))
+    return result
+
+
+class SectionStream:
+    """Splits an article into sections while it is being streamed.
+
+    :meth:`feed` takes the text as it arrives and returns the sections it completed: a
+    section is complete once the next header line has arrived. A section shorter than
+    ``min_words`` is joined to the one after it. :meth:`finish` returns the last section.
+    """
+
+    def __init__(self, min_words: int = 150):
+        self.min_words = min_words
+        # Text of the current section, and the start of its first line not checked for a header
+        self._buffer = ''
+        self._scanned = 0
+        # Marker of the fenced code block the checked lines end in, if any
+        self._fence: str | None = None
+
+    def feed(self, text: str) -> list[Section]:
+        self._buffer += text
+        sections = []
+        while True:
+            end = self._buffer.find('\n', self._scanned)
+            if end < 0:
+                return sections
+            start, self._scanned = self._scanned, end + 1
+            if self._fence is not None or not HEADER_PATTERN.match(self._buffer, start, end):
+                self._fence = _fence(self._buffer[start:end], self._fence)
+                continue
+            if start == 0:
+                continue
+            section = self._section(self._buffer[:start])
+            if section.words >= self.min_words:
+                sections.append(section)
+                self._buffer = self._buffer[start:]
+                self._scanned = end + 1 - start
+
+    def finish(self) -> list[Section]:
+        section = self._section(self._buffer)
+        self._buffer = ''
+        self._scanned = 0
+        self._fence = None
+        return [section] if section.text else []
+
+    def _section(self, text: str) -> Section:
+        match = HEADER_PATTERN.match(text)
+        return Section(match.group(1).strip() if match else 'Introduction', text.strip())
+
+
+def _fence(line: str, fence: str | None) -> str | None:
+    """The code fence open after ``line``, given the one open before it."""
+    match = FENCE_PATTERN.match(line)
+    if not match:
+        return fence
+    marker = match.group(1)
+    if fence is None:
+        return marker
+    # A fence is closed by a bare line of at least as many of the same character
+    if marker[0] == fence[0] and len(marker) >= len(fence) and not line[match.end():].strip():
+        return None
+    return fence
+
+
+def _split_long(section: Section, max_words: int) -> list[Section]:
+    if section.words <= max_words:
+        return [section]
+    parts: list[list[str]] = [[]]
+    words = 0
+    for paragraph in section.text.split('\n\n'):
+        paragraph_words = len(paragraph.split())
+        if parts[-1] and words + paragraph_words > max_words:
+            parts.append([])
+            words = 0
+        parts[-1].append(paragraph)
+        words += paragraph_words
+    if len(parts) == 1:
+        return [section]
+    return [
+        Section(f'{section.title} (part {i} of {len(parts)})', '\n\n'.join(paragraphs))
+        for i, paragraphs in enumerate(parts, 1)
+    ]
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Callable, Hashable
+from contextlib import aclosing
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a flight in subscriber queues
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class _Flight:
+    """One shared stream and the queues of the callers attached to it."""
+
+    def __init__(self):
+        self.history: list[Any] = []
+        self.subscribers: set[asyncio.Queue] = set()
+        self.task: asyncio.Task | None = None
+
+
+class SingleFlight:
+    """Coalesces concurrent async streams that share a key.
+
+    The first caller for a key starts the stream in a background task; callers arriving
+    while it is in flight attach to it and receive every item from the start. The
+    stream is cancelled once all of its subscribers have gone away.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def stream(
+        self, key: Hashable, factory: Callable[[], AsyncIterator[Any]]
+    ) -> AsyncIterator[Any]:
+        """Yield the items of ``factory()``, sharing one run among concurrent callers."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, factory))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(f'Attached to in-flight request ({len(flight.subscribers)} other subscribers)')
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in flight.history:
+            queue.put_nowait(item)
+        flight.subscribers.add(queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.error
+                yield item
+        finally:
+            flight.subscribers.discard(queue)
+            if not flight.subscribers and not flight.task.done():
+                # last subscriber left; nobody needs the result any more
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    async def _run(
+        self, key: Hashable, flight: _Flight, factory: Callable[[], AsyncIterator[Any]]
+    ) -> None:
+        end: Any = _DONE
+        try:
+            async with aclosing(factory()) as items:
+                async for item in items:
+                    flight.history.append(item)
+                    for queue in flight.subscribers:
+                        queue.put_nowait(item)
+        except asyncio.CancelledError:
+            end = _Failure(asyncio.CancelledError())
+            raise
+        except Exception as e:
+            end = _Failure(e)
+        finally:
+            self._forget(key, flight)
+            for queue in flight.subscribers:
+                queue.put_nowait(end)
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -19,13 +19,41 @@ echo "================================"
 # Get the script's directory
 SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 
-# Start critic agent
-echo "Starting Critic Agent on port 8001..."
-(cd "$SCRIPT_DIR/critic" && uv run python __main__.py) &
+if [ "${USE_AGENT_HOST:-0}" = "1" ]; then
+    # Serve the agents in agent_host.json from one process
+    echo "Starting Agent Host..."
+    (cd "$SCRIPT_DIR" && uv run python agent_host.py) &
+else
+    # CRITIC_REPLICAS / WRITER_REPLICAS start several replicas of an agent on ports 10 apart
+    # (critic 8001, 8011, ...; writer 8002, 8012, ...); the coordinator routes calls over all of them
 
-# Start writer agent
-echo "Starting Writer Agent on port 8002..."
-(cd "$SCRIPT_DIR/writer" && uv run python __main__.py) &
+    # Start critic agent (unless the coordinator hosts it with CRITIC_TRANSPORT=inprocess)
+    if [ "${CRITIC_TRANSPORT:-http}" != "inprocess" ]; then
+        critic_urls=""
+        for ((i = 0; i < ${CRITIC_REPLICAS:-1}; i++)); do
+            port=$((8001 + 10 * i))
+            echo "Starting Critic Agent on port $port..."
+            (cd "$SCRIPT_DIR/critic" && uv run python __main__.py --port "$port") &
+            critic_urls="${critic_urls:+$critic_urls,}http://localhost:$port"
+        done
+        export CRITIC_URLS="${CRITIC_URLS:-$critic_urls}"
+        # The replicas run in one directory and share its task store
+        export CRITIC_SHARED_TASK_STORE="${CRITIC_SHARED_TASK_STORE:-1}"
+    fi
+
+    # Start writer agent (unless the coordinator hosts it with WRITER_TRANSPORT=inprocess)
+    if [ "${WRITER_TRANSPORT:-http}" != "inprocess" ]; then
+        writer_urls=""
+        for ((i = 0; i < ${WRITER_REPLICAS:-1}; i++)); do
+            port=$((8002 + 10 * i))
+            echo "Starting Writer Agent on port $port..."
+            (cd "$SCRIPT_DIR/writer" && uv run python __main__.py --port "$port") &
+            writer_urls="${writer_urls:+$writer_urls,}http://localhost:$port"
+        done
+        export WRITER_URLS="${WRITER_URLS:-$writer_urls}"
+        export WRITER_SHARED_TASK_STORE="${WRITER_SHARED_TASK_STORE:-1}"
+    fi
+fi
 
 # Give the remote agents a moment to start
 sleep 2
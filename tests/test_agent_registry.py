@@ -0,0 +1,56 @@
+import asyncio
+
+import httpx
+import pytest
+
+from agent_registry import RemoteAgentConnection, RemoteAgentRegistry, ReplicaPool
+from resilience import AgentRejectedError
+
+
+def pool(count: int) -> ReplicaPool:
+    replicas = [
+        RemoteAgentConnection("writer", f"http://writer-{i}", 300, 5, httpx.Limits())
+        for i in range(count)
+    ]
+    return ReplicaPool("writer", replicas, max_failures=2)
+
+
+async def call(replicas: ReplicaPool, error: Exception | None = None, exclude=()) -> str:
+    async with replicas.lease(exclude=exclude) as replica:
+        if error:
+            raise error
+        return replica.base_url
+
+
+def test_calls_go_to_the_least_outstanding_replica():
+    replicas = pool(2)
+    replicas.replicas[0].outstanding = 1
+    assert asyncio.run(call(replicas)) == "http://writer-1"
+    assert replicas.replicas[1].outstanding == 0
+
+
+def test_failed_calls_eject_a_replica_but_rejections_do_not():
+    replicas = pool(2)
+    first = ["http://writer-1"]
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(AgentRejectedError):
+                await call(replicas, AgentRejectedError("writer", 1), first)
+        assert replicas.replicas[0].consecutive_failures == 0
+        for _ in range(2):
+            with pytest.raises(ConnectionError):
+                await call(replicas, ConnectionError("down"), first)
+
+    asyncio.run(main())
+    assert replicas.available() == 1
+    assert replicas.ejections == 1
+
+
+def test_sessions_are_kept_unless_calls_may_reach_another_replica():
+    urls = {name: ["http://a", "http://b"] for name in ("spread", "sticky", "shared", "inprocess")}
+    urls["single"] = ["http://a"]
+    registry = RemoteAgentRegistry(
+        urls, in_process={"inprocess": "."}, sticky=["sticky"], shared_task_store=["shared"]
+    )
+    assert [name for name in urls if registry.keeps_sessions(name)] == ["sticky", "shared", "inprocess", "single"]
@@ -0,0 +1,47 @@
+from article_edits import SectionEdit, SectionEdits, apply_edits, split_at_headers
+
+ARTICLE = "Lead paragraph.\n\n## Tea\n\nGreen and black.\n\n## Coffee\n\nArabica.\n"
+
+
+def edits(*items: SectionEdit) -> SectionEdits:
+    return SectionEdits(message="Tightened", edits=list(items))
+
+
+def test_split_at_headers_round_trips():
+    sections = split_at_headers(ARTICLE)
+    assert [section.title for section in sections] == ["", "Tea", "Coffee"]
+    assert "".join(section.text for section in sections) == ARTICLE
+
+
+def test_replace_matches_header_loosely():
+    revised = apply_edits(ARTICLE, edits(SectionEdit(section="## tea ", text="## Tea\n\nOolong too.")))
+    assert revised.article == "Lead paragraph.\n\n## Tea\n\nOolong too.\n\n## Coffee\n\nArabica.\n"
+    assert revised.changed_lines == (1, 1)
+    assert revised.summary == "Tightened"
+
+
+def test_insert_after_last_section_keeps_separators():
+    revised = apply_edits(
+        ARTICLE, edits(SectionEdit(action="insert_after", section="Coffee", text="## Cocoa\n\nRich."))
+    )
+    assert revised.article == ARTICLE.rstrip("\n") + "\n\n## Cocoa\n\nRich.\n"
+
+
+def test_delete_and_introduction():
+    revised = apply_edits(
+        ARTICLE,
+        edits(
+            SectionEdit(action="delete", section="Tea"),
+            SectionEdit(section="Introduction", text="New lead."),
+        ),
+    )
+    assert revised.article == "New lead.\n\n## Coffee\n\nArabica.\n"
+    assert len(revised.applied) == 2
+
+
+def test_unknown_section_is_skipped():
+    revised = apply_edits(ARTICLE, edits(SectionEdit(section="Juice", text="## Juice\n\nOrange.")), revision=2)
+    assert revised.article == ARTICLE
+    assert [edit.section for edit in revised.skipped] == ["Juice"]
+    assert revised.diff == ""
+    assert revised.to_dict(include_text=False)["skipped"] == 1
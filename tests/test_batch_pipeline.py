@@ -0,0 +1,68 @@
+import asyncio
+
+from a2a.types import TaskState
+
+from batch_pipeline import BatchPipeline
+
+
+async def drain(job) -> None:
+    async for _ in job.results():
+        pass
+
+
+def test_cancel_keeps_drafts_waiting_between_stages():
+    release = asyncio.Event()
+
+    async def call_agent(agent_name, prompt, context_id, metadata=None):
+        if agent_name == "critic" or "slow" in prompt:
+            await release.wait()
+        text = "Needs work" if agent_name == "critic" else f"Article: {prompt[:40]}"
+        return text, TaskState.input_required if agent_name == "critic" else TaskState.completed, "ctx"
+
+    async def main():
+        pipeline = BatchPipeline(call_agent, writer_concurrency=1, critic_concurrency=1, revision="rewrite")
+        await pipeline.start()
+        job = pipeline.submit(["tea", "coffee", "slow cocoa", "juice"])
+        await asyncio.sleep(0.05)
+        # tea is being reviewed, coffee waits for the critic, cocoa is being written, juice waits
+        assert [item.status for item in job.items] == ["reviewing", "queued", "writing", "queued"]
+        await pipeline.cancel(job.id)
+        release.set()
+        await asyncio.wait_for(drain(job), 1)
+        await pipeline.close()
+        return job
+
+    job = asyncio.run(main())
+    tea, coffee, cocoa, juice = job.items
+    assert (tea.status, tea.review) == ("done", "Needs work")
+    assert coffee.status == "done" and coffee.article.startswith("Article:") and coffee.error is None
+    assert cocoa.status == "done" and cocoa.article
+    assert (juice.status, juice.error) == ("failed", "Canceled")
+    assert job.to_dict()["status"] == "canceled"
+
+
+def run_rewrite(writer_keeps_session: bool) -> list[str]:
+    prompts = []
+
+    async def call_agent(agent_name, prompt, context_id, metadata=None):
+        if agent_name == "critic":
+            verdict = TaskState.completed if len(prompts) > 1 else TaskState.input_required
+            return "Add an example", verdict, context_id
+        prompts.append(prompt)
+        return "Tea is a drink.", TaskState.completed, context_id or "ctx"
+
+    async def main():
+        pipeline = BatchPipeline(call_agent, revision="rewrite", writer_keeps_session=writer_keeps_session)
+        await pipeline.start()
+        await asyncio.wait_for(drain(pipeline.submit(["tea"])), 1)
+        await pipeline.close()
+
+    asyncio.run(main())
+    return prompts
+
+
+def test_rewrite_sends_the_article_only_when_the_writer_may_lack_the_session():
+    _, with_session = run_rewrite(writer_keeps_session=True)
+    _, without_session = run_rewrite(writer_keeps_session=False)
+    assert "Add an example" in with_session and "Tea is a drink." not in with_session
+    assert "Add an example" in without_session and "Tea is a drink." in without_session
@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+from a2a.types import Artifact, Part, Task, TaskState, TaskStatus, TextPart
+
+os.environ.setdefault("LLM_BACKEND", "mock")
+
+from agent_registry import RemoteAgentRegistry  # noqa: E402
+from artifact_store import ArtifactStore  # noqa: E402
+from blogging_agent import BlogWritingTools  # noqa: E402
+
+
+def tools_with_fake_agent(calls: list) -> BlogWritingTools:
+    tools = BlogWritingTools(RemoteAgentRegistry({"writer": ["http://writer"]}), ArtifactStore())
+
+    async def remote_events(agent_name, parts, context_id, idempotent=False, metadata=None):
+        calls.append(context_id)
+        await asyncio.sleep(0.01)
+        yield Task(
+            id=f"task-{len(calls)}",
+            contextId=context_id,
+            status=TaskStatus(state=TaskState.completed),
+            artifacts=[Artifact(artifactId=f"a{len(calls)}", parts=[Part(root=TextPart(text="Article"))])],
+        )
+
+    tools._remote_events = remote_events
+    return tools
+
+
+def test_calls_without_a_context_keep_their_own_conversations():
+    calls = []
+    tools = tools_with_fake_agent(calls)
+
+    async def main():
+        return await asyncio.gather(tools._call("writer", "Write about tea"), tools._call("writer", "Write about tea"))
+
+    first, second = asyncio.run(main())
+    assert first.text == second.text == "Article"
+    assert first.context_id != second.context_id
+    assert sorted(calls) == sorted([first.context_id, second.context_id])
+
+
+def test_identical_calls_in_one_context_are_coalesced():
+    calls = []
+    tools = tools_with_fake_agent(calls)
+
+    async def main():
+        return await asyncio.gather(
+            tools._call("writer", "Revise", context_id="ctx"), tools._call("writer", "Revise", context_id="ctx")
+        )
+
+    first, second = asyncio.run(main())
+    assert first.context_id == second.context_id == "ctx"
+    assert calls == ["ctx"]
+
+
+def test_open_circuit_fails_the_call_at_once():
+    tools = BlogWritingTools(RemoteAgentRegistry({"writer": ["http://writer"]}), ArtifactStore())
+    policy = tools.policies["writer"]
+    for _ in range(policy.breaker.failure_threshold):
+        policy.breaker.record_failure()
+
+    reply = asyncio.run(tools._call("writer", "Write about tea"))
+    assert reply.state == TaskState.failed
+    assert "unavailable" in reply.text
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from resilience import AgentCallPolicy, CircuitBreaker, CircuitOpenError, hedged
+
+
+async def collect(items) -> list:
+    return [item async for item in items]
+
+
+def attempts(*scripts):
+    """A ``start`` for hedged(): attempt i sleeps and yields as scripted in ``scripts[i]``."""
+    started = []
+
+    async def start(index: int):
+        started.append(index)
+        for delay, item in scripts[index]:
+            await asyncio.sleep(delay)
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    return start, started
+
+
+def test_fast_call_is_not_hedged():
+    start, started = attempts([(0, "a"), (0, "b")], [(0, "x")])
+    items = asyncio.run(collect(hedged(start, lambda item: True, hedge_delay=0.5, budget=5)))
+    assert items == ["a", "b"]
+    assert started == [0]
+
+
+def test_slow_call_is_hedged_and_the_hedge_wins():
+    wins = []
+    start, started = attempts([(1.0, "slow")], [(0, "fast"), (0, "done")])
+    items = asyncio.run(
+        collect(hedged(start, lambda item: True, hedge_delay=0.05, budget=5, on_win=wins.append))
+    )
+    assert items == ["fast", "done"]
+    assert started == [0, 1]
+    assert wins == [1]
+
+
+def test_items_before_progress_are_held_back_then_replayed():
+    start, _ = attempts([(0, "queued"), (0.01, "text")])
+    items = asyncio.run(collect(hedged(start, lambda item: item != "queued", hedge_delay=None, budget=5)))
+    assert items == ["queued", "text"]
+
+
+def test_no_progress_within_budget_times_out():
+    start, _ = attempts([(0, "queued"), (1.0, "text")])
+    with pytest.raises(TimeoutError):
+        asyncio.run(collect(hedged(start, lambda item: item != "queued", hedge_delay=None, budget=0.05)))
+
+
+def test_failed_attempt_leaves_the_other_running():
+    start, _ = attempts([(0.1, ConnectionError("down"))], [(0.2, "ok")])
+    items = asyncio.run(collect(hedged(start, lambda item: True, hedge_delay=0.01, budget=5)))
+    assert items == ["ok"]
+
+
+def test_last_failed_attempt_raises():
+    start, _ = attempts([(0, ConnectionError("down"))])
+    with pytest.raises(ConnectionError):
+        asyncio.run(collect(hedged(start, lambda item: True, hedge_delay=None, budget=5)))
+
+
+def test_breaker_opens_after_consecutive_failures_and_recovers():
+    breaker = CircuitBreaker("writer", failure_threshold=2, reset_seconds=0.05)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    asyncio.run(asyncio.sleep(0.06))
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        # only one trial call at a time
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.opened == 1
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = CircuitBreaker("critic", failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_budget_follows_observed_latency():
+    policy = AgentCallPolicy("writer", budget_factor=3, min_budget=1)
+    assert policy.budget(60) == 60
+    assert policy.hedge_delay() is None
+    for _ in range(20):
+        policy.latency.observe(2.0)
+    assert policy.budget(60) == 6.0
+    assert policy.budget(4) == 4
+    assert policy.hedge_delay() == 2.0
@@ -0,0 +1,44 @@
+from article_edits import split_at_headers
+from sections import SectionStream, article_title, split_sections
+
+FENCED = (
+    "# Title\n\nIntro.\n\n"
+    "## Setup\n\n```bash\n# install deps\npip install blog\n```\n\n"
+    "## Usage\n\nRun it.\n"
+)
+
+
+def test_headers_in_code_blocks_do_not_split():
+    assert [section.title for section in split_at_headers(FENCED)] == ["Title", "Setup", "Usage"]
+    assert [section.title for section in split_sections(FENCED, min_words=0)] == ["Title", "Setup", "Usage"]
+
+
+def test_streamed_headers_in_code_blocks_do_not_split():
+    stream = SectionStream(min_words=0)
+    sections = []
+    for i in range(0, len(FENCED), 5):
+        sections.extend(stream.feed(FENCED[i:i + 5]))
+    sections.extend(stream.finish())
+    assert [section.title for section in sections] == ["Title", "Setup", "Usage"]
+    assert "# install deps" in sections[1].text
+
+
+def test_tilde_fence_closes_only_on_its_own_marker():
+    text = "~~~~\n# not a header\n```\n# still code\n~~~~\n# Real\n"
+    assert article_title(text) == "Real"
+
+
+def test_short_sections_are_merged_and_long_ones_split():
+    text = "# A\n\none two\n\n## B\n\n" + "\n\n".join(["word " * 10] * 4) + "\n"
+    sections = split_sections(text, max_words=30, min_words=5)
+    assert [section.title for section in sections] == ["A (part 1 of 2)", "A (part 2 of 2)"]
+    assert sum(section.words for section in sections) == len(text.split())
+
+
+def test_stream_joins_short_sections_to_the_next():
+    stream = SectionStream(min_words=4)
+    assert stream.feed("# Intro\n\nshort\n\n## Body\n\none two three four\n\n") == []
+    sections = stream.feed("## End\n\nfin\n")
+    assert [section.title for section in sections] == ["Intro"]
+    assert "## Body" in sections[0].text
+    assert [section.title for section in stream.finish()] == ["End"]
@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import aclosing
+
+from single_flight import SingleFlight
+
+
+def counting_stream(calls: list, items=("a", "b"), error: Exception | None = None):
+    async def stream():
+        calls.append(1)
+        for item in items:
+            await asyncio.sleep(0.01)
+            yield item
+        if error:
+            raise error
+
+    return stream
+
+
+async def collect(flights: SingleFlight, key, factory) -> list:
+    return [item async for item in flights.stream(key, factory)]
+
+
+def test_concurrent_callers_share_one_run():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        return await asyncio.gather(
+            collect(flights, "k", counting_stream(calls)),
+            collect(flights, "k", counting_stream(calls)),
+            collect(flights, "other", counting_stream(calls)),
+        )
+
+    assert asyncio.run(main()) == [["a", "b"], ["a", "b"], ["a", "b"]]
+    assert len(calls) == 2
+    assert (flights.started, flights.coalesced) == (2, 1)
+    assert len(flights) == 0
+
+
+def test_late_subscriber_gets_items_from_the_start():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        first = asyncio.create_task(collect(flights, "k", counting_stream(calls, items="abc")))
+        await asyncio.sleep(0.015)
+        second = await collect(flights, "k", counting_stream(calls))
+        return await first, second
+
+    assert asyncio.run(main()) == (list("abc"), list("abc"))
+    assert len(calls) == 1
+
+
+def test_errors_reach_every_subscriber():
+    flights = SingleFlight()
+    calls = []
+
+    async def main():
+        return await asyncio.gather(
+            collect(flights, "k", counting_stream(calls, error=ValueError("bad"))),
+            collect(flights, "k", counting_stream(calls)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_run_is_cancelled_when_every_subscriber_leaves():
+    flights = SingleFlight()
+    finished = []
+
+    async def endless():
+        try:
+            while True:
+                await asyncio.sleep(0.01)
+                yield "tick"
+        finally:
+            finished.append(True)
+
+    async def main():
+        async with aclosing(flights.stream("k", endless)) as ticks:
+            async for _ in ticks:
+                break
+        await asyncio.sleep(0.02)
+
+    asyncio.run(main())
+    assert finished == [True]
+    assert len(flights) == 0
@@ -1,13 +1,23 @@
 import logging
+import os
+from contextlib import asynccontextmanager
 
 import click
 import httpx
 from a2a.server.apps import A2AStarletteApplication
-from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore, InMemoryPushNotifier
+from a2a.server.tasks import InMemoryPushNotifier
 from a2a.types import AgentCapabilities, AgentCard, AgentSkill
+from agent import SemanticKernelWriterAgent
 from agent_executor import SemanticKernelWriterAgentExecutor
+from metrics import CONTENT_TYPE, REGISTRY, Callback, Gauge
+from request_handler import AgentRequestHandler
+from scheduler import AdmissionControlledExecutor, AdmissionScheduler
+from sqlite_task_store import SQLiteTaskStore
+from tracing import setup_tracing
 from dotenv import load_dotenv
+from starlette.responses import JSONResponse, Response
+from starlette.applications import Starlette
+from starlette.routing import Route
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,27 +28,173 @@ load_dotenv("../.env")
 @click.command()
 @click.option('--host', default='0.0.0.0')
 @click.option('--port', default=8002)
-def main(host, port):
+@click.option('--workers', default=1, help='Number of uvicorn worker processes sharing the task store.')
+@click.option('--task-db', default='tasks.db', envvar='TASK_DB_PATH', help='SQLite task store path.')
+@click.option(
+    '--task-retention',
+    default=7 * 24 * 3600,
+    envvar='TASK_RETENTION_SECONDS',
+    help='Seconds to keep finished tasks before pruning.',
+)
+@click.option(
+    '--max-in-flight',
+    default=8,
+    envvar='MAX_IN_FLIGHT',
+    help='Concurrent generations per worker process.',
+)
+@click.option(
+    '--max-queue',
+    default=32,
+    envvar='MAX_QUEUE_DEPTH',
+    help='Requests that may wait for a slot before new ones are rejected.',
+)
+def main(host, port, workers, task_db, task_retention, max_in_flight, max_queue):
     """Starts the Semantic Kernel Writer Agent server using A2A."""
-    httpx_client = httpx.AsyncClient()
-    request_handler = DefaultRequestHandler(
-        agent_executor=SemanticKernelWriterAgentExecutor(),
-        task_store=InMemoryTaskStore(),
-        push_notifier=InMemoryPushNotifier(httpx_client),
+    # Worker processes build their own app from these settings
+    os.environ['AGENT_HOST'] = host
+    os.environ['AGENT_PORT'] = str(port)
+    os.environ['TASK_DB_PATH'] = task_db
+    os.environ['TASK_RETENTION_SECONDS'] = str(task_retention)
+    os.environ['MAX_IN_FLIGHT'] = str(max_in_flight)
+    os.environ['MAX_QUEUE_DEPTH'] = str(max_queue)
+
+    import uvicorn
+    if workers > 1:
+        uvicorn.run('__main__:create_app', factory=True, host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(create_app(), host=host, port=port)
+
+
+def create_app():
+    """Builds the A2A Starlette application with a SQLite-backed task store."""
+    host = os.environ['AGENT_HOST']
+    port = int(os.environ['AGENT_PORT'])
+    push_client = create_push_client()
+    collector = setup_tracing('writer')
+    request_handler, task_store, scheduler = create_request_handler(
+        os.environ['TASK_DB_PATH'],
+        task_retention=float(os.environ['TASK_RETENTION_SECONDS']),
+        max_in_flight=int(os.environ['MAX_IN_FLIGHT']),
+        max_queue=int(os.environ['MAX_QUEUE_DEPTH']),
+        push_client=push_client,
     )
+    return build_app(get_agent_card(host, port), request_handler, task_store, scheduler, collector, push_client)
+
+
+def build_app(
+    agent_card: AgentCard,
+    request_handler,
+    task_store,
+    scheduler,
+    collector,
+    push_client: httpx.AsyncClient | None = None,
+) -> Starlette:
+    """The agent's A2A application plus its scheduler stats, metrics and traces routes.
+
+    Its lifespan closes the task store and, when given, the push notification client.
+    """
+    task_count = Gauge('task_store_tasks', 'Tasks in the task store, including pending writes.')
+    server = A2AStarletteApplication(agent_card=agent_card, http_handler=request_handler)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        try:
+            yield
+        finally:
+            await task_store.close()
+            if push_client is not None:
+                await push_client.aclose()
 
-    server = A2AStarletteApplication(
-        agent_card=get_agent_card(host, port), http_handler=request_handler
+    async def scheduler_stats(request):
+        return JSONResponse(scheduler.stats())
+
+    async def metrics(request):
+        task_count.set(await task_store.count())
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+    async def trace_spans(request):
+        trace_id = request.path_params['trace_id']
+        return JSONResponse({'trace_id': trace_id, 'spans': collector.get(trace_id) if collector else []})
+
+    return server.build(
+        lifespan=lifespan,
+        routes=[
+            Route('/scheduler/stats', scheduler_stats),
+            Route('/metrics', metrics),
+            Route('/traces/{trace_id}', trace_spans),
+        ],
+    )
+
+
+def create_request_handler(
+    task_db: str,
+    task_retention: float = 7 * 24 * 3600,
+    max_in_flight: int = 8,
+    max_queue: int = 32,
+    chat_service=None,
+    instructions: str | None = None,
+    push_client: httpx.AsyncClient | None = None,
+) -> tuple[AgentRequestHandler, SQLiteTaskStore, AdmissionScheduler]:
+    """Builds the agent's request handler, its task store and its admission scheduler.
+
+    Also used to host the agent in another process: the coordinator's, or an agent host's,
+    which passes its shared chat service and the instructions of an agent definition.
+    Push notifications are posted with ``push_client``; its owner closes it.
+    """
+    task_store = SQLiteTaskStore(task_db, retention_seconds=task_retention)
+    scheduler = AdmissionScheduler(max_in_flight=max_in_flight, max_queue=max_queue)
+    executor = SemanticKernelWriterAgentExecutor(SemanticKernelWriterAgent(chat_service, instructions), task_store)
+    register_metrics(executor, scheduler)
+    request_handler = AgentRequestHandler(
+        agent_executor=AdmissionControlledExecutor(executor, scheduler),
+        task_store=task_store,
+        push_notifier=InMemoryPushNotifier(push_client or create_push_client()),
+    )
+    return request_handler, task_store, scheduler
+
+
+def create_push_client() -> httpx.AsyncClient:
+    """A pooled client for posting push notifications to the callers' webhooks."""
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(float(os.getenv('PUSH_NOTIFICATION_TIMEOUT', '10'))),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    )
+
+
+def register_metrics(executor, scheduler: AdmissionScheduler) -> None:
+    """Expose the counters and sizes the agent and scheduler keep anyway, read at scrape time."""
+    agent = executor.agent
+    Callback(
+        'response_cache_requests_total',
+        'Response cache lookups by result.',
+        lambda: {'hit': agent.cache.hits, 'miss': agent.cache.misses},
+        ['result'],
+        type='counter',
+    )
+    Callback('response_cache_entries', 'Responses held in memory by the cache.', lambda: agent.cache.stats()['entries'])
+    Callback('agent_sessions', 'Conversation sessions held by the agent.', lambda: len(agent.sessions))
+    Callback(
+        'agent_generations_total',
+        'Generations started, and requests that attached to one already running.',
+        lambda: {'started': agent.flights.started, 'coalesced': agent.flights.coalesced},
+        ['kind'],
+        type='counter',
+    )
+    Callback('scheduler_in_flight', 'Requests holding a generation slot.', lambda: scheduler.in_flight)
+    Callback('scheduler_queue_depth', 'Requests waiting for a slot.', lambda: scheduler.queue_depth)
+    Callback(
+        'scheduler_requests_total',
+        'Requests admitted or rejected by admission control.',
+        lambda: {'admitted': scheduler.admitted, 'rejected': scheduler.rejected},
+        ['result'],
+        type='counter',
     )
-    
-    import uvicorn
-    uvicorn.run(server.build(), host=host, port=port)
 
 
 def get_agent_card(host: str, port: int):
     """Returns the Agent Card for the Semantic Kernel Writer Agent."""
     
-    capabilities = AgentCapabilities(streaming=True)
+    capabilities = AgentCapabilities(streaming=True, pushNotifications=True)
     
     skill_write_blog = AgentSkill(
         id='write_blog',
@@ -55,6 +211,18 @@ def get_agent_card(host: str, port: int):
         ],
     )
 
+    skill_revise_sections = AgentSkill(
+        id='revise_sections',
+        name='Revise Sections',
+        description=(
+            'Revises an article based on editorial feedback and returns only the section-level '
+            'edits, as JSON: {"message": summary, "edits": [{"action": "replace" | "insert_after" | '
+            '"delete", "section": header text, "text": new Markdown}]}. Send the article and the '
+            'feedback with "skill": "revise_sections" in the message metadata.'
+        ),
+        tags=['revise', 'edit', 'blog', 'patch'],
+    )
+
     agent_card = AgentCard(
         name='SK Writer Agent',
         description=(
@@ -66,7 +234,7 @@ def get_agent_card(host: str, port: int):
         defaultInputModes=['text'],
         defaultOutputModes=['text'],
         capabilities=capabilities,
-        skills=[skill_write_blog],
+        skills=[skill_write_blog, skill_revise_sections],
     )
 
     return agent_card
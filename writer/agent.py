@@ -1,23 +1,31 @@
+import io
 import logging
 import os
-from typing import TYPE_CHECKING, Any, Literal
+import time
+from contextlib import aclosing
+from typing import Any, Literal
 from collections.abc import AsyncIterable
 
 from dotenv import load_dotenv
+from opentelemetry import trace
+from opentelemetry.trace import Status, StatusCode
 from pydantic import BaseModel
-from semantic_kernel.agents import ChatCompletionAgent
+from semantic_kernel.agents import ChatCompletionAgent, ChatHistoryAgentThread
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
 from semantic_kernel.connectors.ai.open_ai import (
     AzureChatCompletion,
     OpenAIChatPromptExecutionSettings,
 )
-from semantic_kernel.contents import (
-    StreamingChatMessageContent,
-    StreamingTextContent,
-)
+from semantic_kernel.contents import StreamingTextContent
 from semantic_kernel.functions import KernelArguments
 
-if TYPE_CHECKING:
-    from semantic_kernel.contents import ChatMessageContent
+from metrics import Histogram
+from mock_chat_completion import MockChatCompletion
+from response_cache import ResponseCache, cache_key
+from session_store import Session, SessionStore
+from single_flight import SingleFlight
+from structured_stream import StructuredStreamParser
+from tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +36,33 @@ load_dotenv("../.env")
 deployment_name = os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')
 endpoint = os.getenv('AZURE_OPENAI_ENDPOINT')
 api_key = os.getenv('AZURE_OPENAI_API_KEY')
+llm_backend = os.getenv('LLM_BACKEND', 'azure')
 service_id = "writer_service"
 
+# Response cache limits; set WRITER_CACHE_DIR to keep responses across restarts
+cache_max_entries = int(os.getenv('WRITER_CACHE_MAX_ENTRIES', '256'))
+cache_ttl_seconds = float(os.getenv('WRITER_CACHE_TTL_SECONDS', '3600'))
+cache_dir = os.getenv('WRITER_CACHE_DIR') or None
+
+# Per-context conversation limits
+session_max = int(os.getenv('WRITER_SESSION_MAX', '500'))
+session_ttl_seconds = float(os.getenv('WRITER_SESSION_TTL_SECONDS', '3600'))
+session_max_messages = int(os.getenv('WRITER_SESSION_MAX_MESSAGES', '20'))
+
+# Size of the chunks a cached response is replayed in
+REPLAY_CHUNK_CHARS = 256
+
+FIRST_TOKEN_SECONDS = Histogram(
+    'agent_time_to_first_token_seconds', 'Time from sending a turn to the model until its first text delta.'
+)
+GENERATION_SECONDS = Histogram('agent_generation_seconds', 'Duration of streamed model turns.')
+# Streamed chunks are counted as tokens; the OpenAI stream sends about one token per chunk
+TOKENS_PER_SECOND = Histogram(
+    'agent_tokens_per_second',
+    'Streaming rate of model turns after the first token.',
+    buckets=(5, 10, 20, 40, 60, 80, 120, 160, 240, 320),
+)
+
 
 class ResponseFormat(BaseModel):
     """Response format for the writer agent."""
@@ -37,35 +70,73 @@ class ResponseFormat(BaseModel):
     message: str
 
 
+class SectionEdit(BaseModel):
+    """One change to an article, addressed by the title of a section's header."""
+    action: Literal['replace', 'insert_after', 'delete'] = 'replace'
+    section: str
+    text: str = ''
+
+
+class RevisionFormat(BaseModel):
+    """Response format for section-level revisions (the revise_sections skill)."""
+    status: Literal['input_required', 'completed', 'error'] = 'input_required'
+    message: str
+    edits: list[SectionEdit] = []
+
+
+# Default instructions; an agent host may give an agent definition its own
+INSTRUCTIONS = (
+    'You are a professional blog writer. You create engaging, well-structured blog articles '
+    'on various topics. You are open to feedback and willing to revise your work to improve '
+    'quality. When given a topic, write a comprehensive article with a clear introduction, '
+    'body, and conclusion.\n\n'
+    'Structure your articles as follows:\n'
+    '1. Engaging title\n'
+    '2. Introduction that hooks the reader\n'
+    '3. Well-organized body with clear sections\n'
+    '4. Compelling conclusion with key takeaways\n'
+    '5. Proper formatting with headers and paragraphs\n\n'
+    'Always write in a clear, engaging, and informative style.'
+)
+
+# Added to the instructions for revisions returned as section edits
+REVISION_INSTRUCTIONS = (
+    'When asked to revise an article as section edits, do not return the whole article. Return '
+    'only the changes in edits, each naming a section by the text of its header (without the #s; '
+    '"Introduction" for any text before the first header):\n'
+    '- "replace": the section\'s new Markdown in text, its header line included\n'
+    '- "insert_after": a new section, header line included, to add after the named one\n'
+    '- "delete": remove the section\n'
+    'Leave sections that need no change out. Summarise the changes in one sentence in message and '
+    'set status to "completed", or ask your question in message and set status to "input_required".'
+)
+
+
 class SemanticKernelWriterAgent:
     """Semantic Kernel-based agent for writing blog articles."""
     
-    def __init__(self):
-        # Configure Azure OpenAI service
-        chat_service = AzureChatCompletion(
-            service_id=service_id,
-            deployment_name=deployment_name,
-            endpoint=endpoint,
-            api_key=api_key,
-        )
+    def __init__(
+        self,
+        chat_service: ChatCompletionClientBase | None = None,
+        instructions: str | None = None,
+    ):
+        # Configure Azure OpenAI service, or the offline mock for local runs and benchmarks;
+        # an agent host passes one service shared by all of its agents
+        if chat_service is None and llm_backend == 'mock':
+            chat_service = MockChatCompletion.from_env(service_id)
+        elif chat_service is None:
+            chat_service = AzureChatCompletion(
+                service_id=service_id,
+                deployment_name=deployment_name,
+                endpoint=endpoint,
+                api_key=api_key,
+            )
         
         # Create the writer agent
         self.agent = ChatCompletionAgent(
             service=chat_service,
             name='BlogWriterAgent',
-            instructions=(
-                'You are a professional blog writer. You create engaging, well-structured blog articles '
-                'on various topics. You are open to feedback and willing to revise your work to improve '
-                'quality. When given a topic, write a comprehensive article with a clear introduction, '
-                'body, and conclusion.\n\n'
-                'Structure your articles as follows:\n'
-                '1. Engaging title\n'
-                '2. Introduction that hooks the reader\n'
-                '3. Well-organized body with clear sections\n'
-                '4. Compelling conclusion with key takeaways\n'
-                '5. Proper formatting with headers and paragraphs\n\n'
-                'Always write in a clear, engaging, and informative style.'
-            ),
+            instructions=instructions or INSTRUCTIONS,
             arguments=KernelArguments(
                 settings=OpenAIChatPromptExecutionSettings(
                     response_format=ResponseFormat,
@@ -73,44 +144,287 @@ class SemanticKernelWriterAgent:
             ),
         )
         
-        # Store session data
-        self.sessions: dict[str, Any] = {}
+        # Revises an article given in the request as section edits, without a session
+        self.revision_agent = ChatCompletionAgent(
+            service=chat_service,
+            name='BlogRevisionAgent',
+            instructions=f'{instructions or INSTRUCTIONS}\n\n{REVISION_INSTRUCTIONS}',
+            arguments=KernelArguments(
+                settings=OpenAIChatPromptExecutionSettings(
+                    response_format=RevisionFormat,
+                )
+            ),
+        )
+        
+        # Conversation history per A2A context, so follow-ups only send what is new
+        self.sessions = SessionStore(
+            max_sessions=session_max,
+            ttl_seconds=session_ttl_seconds,
+            max_messages=session_max_messages,
+        )
+        
+        # Completed responses keyed by prompt, instructions and deployment
+        self.cache = ResponseCache(
+            max_entries=cache_max_entries,
+            ttl_seconds=cache_ttl_seconds,
+            disk_dir=cache_dir,
+        )
+        
+        # Identical concurrent first turns attach to one generation
+        self.flights = SingleFlight()
     
     async def invoke(self, user_input: str, session_id: str) -> dict[str, Any]:
         """Handle synchronous writing requests."""
-        # Get agent response
-        response = await self.agent.get_response(messages=user_input)
-        return self._get_agent_response(response.message)
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            # Only a first turn is content-addressable; later turns depend on the history
+            key = self.fingerprint(user_input) if session.is_empty else None
+            cached = await self.cache.get(key) if key else None
+            if cached:
+                self._remember(session, user_input, cached)
+                return cached
+            
+            # Get agent response; the thread records the exchange in the session
+            mark = len(session.history.messages)
+            try:
+                response = await self.agent.get_response(messages=user_input, thread=self._thread(session))
+            except BaseException:
+                del session.history.messages[mark:]
+                raise
+            result = self._get_agent_response(response.message.content)
+            if key:
+                await self._cache_result(key, result)
+            self.sessions.trim(session)
+            return result
     
     async def stream(
         self,
         user_input: str,
         session_id: str,
     ) -> AsyncIterable[dict[str, Any]]:
-        """Handle streaming writing requests."""
-        chunks: list[StreamingChatMessageContent] = []
+        """Handle streaming writing requests.
+        
+        Yields a working notice, then every text delta as it arrives (marked with
+        ``'delta': True``), and finally the structured response. Turns in one context
+        share a conversation history. First turns are served from the response cache
+        when possible, and identical concurrent ones share a single generation.
+        """
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            if not session.is_empty:
+                # closed explicitly so an abandoned turn is rolled back before the lock is released
+                async with aclosing(self._generate(user_input, session)) as items:
+                    async for item in items:
+                        yield item
+                self.sessions.trim(session)
+                return
+            
+            key = self.fingerprint(user_input)
+            cached = await self.cache.get(key)
+            if cached:
+                logger.info(f'Replaying cached response for {session_id}')
+                trace.get_current_span().add_event('response_cache_hit')
+                self._remember(session, user_input, cached)
+                async for item in self._replay(cached):
+                    yield item
+                return
+            
+            result = None
+            async for item in self.flights.stream(key, lambda: self._generate(user_input, session, key)):
+                result = item
+                yield item
+            if result and not result.get('delta') and session.is_empty:
+                # another context's generation answered this turn; keep this history in step
+                self._remember(session, user_input, result)
+    
+    async def revise_sections(self, user_input: str) -> AsyncIterable[dict[str, Any]]:
+        """Revise the article in ``user_input`` as section edits (the revise_sections skill).
+        
+        The request carries the article and the feedback, so no session is used. The
+        completed result's content is the edits and summary as JSON; the caller applies
+        them. Results are cached by request.
+        """
+        key = cache_key(user_input, self.revision_agent.instructions, f'{llm_backend}:{deployment_name}')
+        cached = await self.cache.get(key)
+        if cached:
+            trace.get_current_span().add_event('response_cache_hit')
+            yield cached
+            return
+        yield {
+            'is_task_complete': False,
+            'require_user_input': False,
+            'content': 'Revising the article...',
+        }
+        with tracer.start_as_current_span('writer.revise_sections'):
+            response = await self.revision_agent.get_response(messages=user_input)
+        try:
+            revision = RevisionFormat.model_validate_json(str(response.message.content))
+        except ValueError as e:
+            logger.error(f'Error parsing revision: {e}')
+            revision = RevisionFormat(status='error', message='Unable to revise the article. Please try again.')
+        if revision.status == 'completed':
+            result = {
+                'is_task_complete': True,
+                'require_user_input': False,
+                'content': revision.model_dump_json(include={'message', 'edits'}),
+            }
+        else:
+            result = {'is_task_complete': False, 'require_user_input': True, 'content': revision.message}
+        await self._cache_result(key, result)
+        yield result
+    
+    async def _generate(
+        self,
+        user_input: str,
+        session: Session,
+        key: str | None = None,
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Stream one model turn on the session's history.
+
+        The model streams a ResponseFormat JSON object; the deltas yielded are the decoded
+        text of its ``message`` as it grows, not the raw JSON.
+        """
+        # The raw text is kept for the fallback parse of a reply that is not a JSON object
+        buffer = io.StringIO()
+        parser = StructuredStreamParser('message')
         text_started = False
+        mark = len(session.history.messages)
+        started = time.perf_counter()
+        first_token_at = started
+        tokens = 0
+        # not made current: the generator may be closed from another context
+        span = tracer.start_span('agent.generate', attributes={'agent.history_messages': mark})
         
-        async for chunk in self.agent.invoke_stream(messages=user_input):
-            if any(isinstance(i, StreamingTextContent) for i in chunk.items):
+        try:
+            async for chunk in self.agent.invoke_stream(messages=user_input, thread=self._thread(session)):
+                if not any(isinstance(i, StreamingTextContent) for i in chunk.items):
+                    continue
+                text = chunk.message.content
+                if not text:
+                    continue
+                tokens += 1
                 if not text_started:
+                    first_token_at = time.perf_counter()
+                    FIRST_TOKEN_SECONDS.observe(first_token_at - started)
+                    span.add_event('first_token')
                     yield {
                         'is_task_complete': False,
                         'require_user_input': False,
                         'content': 'Writing your blog article...',
                     }
                     text_started = True
-                chunks.append(chunk.message)
+                buffer.write(text)
+                status_known = 'status' in parser.values
+                message_text = parser.feed(text)
+                if not status_known and 'status' in parser.values:
+                    span.add_event('status', {'agent.status': str(parser.values['status'])})
+                if message_text:
+                    yield {
+                        'is_task_complete': False,
+                        'require_user_input': False,
+                        'content': message_text,
+                        'delta': True,
+                    }
+        except BaseException as e:
+            # an abandoned or failed turn must not leave a dangling user message
+            del session.history.messages[mark:]
+            span.set_attribute('agent.tokens', tokens)
+            span.set_status(Status(StatusCode.ERROR, repr(e)))
+            span.end()
+            raise
+        
+        span.set_attribute('agent.tokens', tokens)
+        if not text_started:
+            span.end()
+            return
+        finished = time.perf_counter()
+        GENERATION_SECONDS.observe(finished - started)
+        if finished > first_token_at:
+            TOKENS_PER_SECOND.observe(tokens / (finished - first_token_at))
+        with tracer.start_as_current_span('agent.parse_response', context=trace.set_span_in_context(span)):
+            result = self._get_agent_response(buffer.getvalue(), parser.values if parser.complete else None)
+        span.end()
+        if key:
+            await self._cache_result(key, result)
+        yield result
+    
+    def known_tasks(self, session_id: str) -> set[str]:
+        """Ids of the context's tasks the session here already accounts for."""
+        session = self.sessions.peek(session_id)
+        return set(session.task_ids) if session else set()
+    
+    async def restore_session(
+        self,
+        session_id: str,
+        task_id: str,
+        turns: list[tuple[str, str, dict[str, Any]]],
+        other_tasks: set[str] = frozenset(),
+    ) -> None:
+        """Bring a session up to date before the turn of task ``task_id``.
         
-        if chunks:
-            yield self._get_agent_response(sum(chunks[1:], chunks[0]))
+        ``turns`` are the context's turns missing from the session, oldest first, as
+        (task id, user input, result), read from the task store the worker processes
+        share: another worker answered them, or the session expired here. They are
+        appended to the history. ``other_tasks`` are finished tasks of the context that
+        are not turns of the conversation, remembered so they are not read again.
+        """
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            missing = [turn for turn in turns if turn[0] not in session.task_ids]
+            if missing:
+                logger.info(f'Restoring {len(missing)} turns of session {session_id} from the task store')
+                for _, user_input, result in missing:
+                    self._remember(session, user_input, result)
+                self.sessions.trim(session)
+            session.task_ids |= {turn_id for turn_id, _, _ in missing} | other_tasks | {task_id}
+    
+    def fingerprint(self, user_input: str) -> str:
+        """Content address of a first-turn request, shared by the response cache and request coalescing."""
+        return cache_key(user_input, self.agent.instructions, f'{llm_backend}:{deployment_name}')
+    
+    def _thread(self, session: Session) -> ChatHistoryAgentThread:
+        return ChatHistoryAgentThread(chat_history=session.history)
     
-    def _get_agent_response(self, message: 'ChatMessageContent') -> dict[str, Any]:
-        """Extract structured response from agent's message."""
+    def _remember(self, session: Session, user_input: str, result: dict[str, Any]) -> None:
+        """Record an exchange that was answered without running the model on this session."""
+        status = 'completed' if result['is_task_complete'] else 'input_required'
+        session.history.add_user_message(user_input)
+        session.history.add_assistant_message(
+            ResponseFormat(status=status, message=result['content']).model_dump_json()
+        )
+    
+    async def _cache_result(self, key: str, result: dict[str, Any]) -> None:
+        # Only completed responses are reused; follow-up questions and errors are not
+        if result['is_task_complete']:
+            await self.cache.put(key, result)
+    
+    async def _replay(self, cached: dict[str, Any]) -> AsyncIterable[dict[str, Any]]:
+        """Replay a cached response as working notice, deltas and final response."""
+        yield {
+            'is_task_complete': False,
+            'require_user_input': False,
+            'content': 'Writing your blog article...',
+        }
+        content = cached['content']
+        for start in range(0, len(content), REPLAY_CHUNK_CHARS):
+            yield {
+                'is_task_complete': False,
+                'require_user_input': False,
+                'content': content[start:start + REPLAY_CHUNK_CHARS],
+                'delta': True,
+            }
+        yield cached
+    
+    def _get_agent_response(self, content: str, parsed: dict[str, Any] | None = None) -> dict[str, Any]:
+        """Extract structured response from agent's message content.
+
+        ``parsed`` is the object already decoded while streaming, validated without parsing ``content`` again.
+        """
         try:
-            structured_response = ResponseFormat.model_validate_json(
-                message.content
-            )
+            if parsed is not None:
+                structured_response = ResponseFormat.model_validate(parsed)
+            else:
+                structured_response = ResponseFormat.model_validate_json(content)
             
             response_map = {
                 'input_required': {
@@ -0,0 +1,238 @@
+import bisect
+import math
+import time
+from collections.abc import Callable, Iterable, Iterator
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds, from a fast cache hit to a long generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class Registry:
+    """Metrics exposed together on one ``/metrics`` endpoint, in registration order."""
+
+    def __init__(self):
+        self._metrics: dict[str, '_Metric'] = {}
+
+    def register(self, metric: '_Metric') -> None:
+        # A later registration under the same name replaces the earlier one, so an app
+        # factory can register its callbacks again without failing
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    """Base of the metric types.
+
+    Values live in one child per label combination. Look children up once with
+    :meth:`labels` and keep them, so recording on the hot path is a plain attribute
+    update with no allocation. Updates are not locked; every service records from a
+    single event loop thread.
+    """
+    type = 'untyped'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        registry: Registry = REGISTRY,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._label_texts: dict[tuple[str, ...], str] = {}
+        if not self.labelnames and not isinstance(self, Callback):
+            # unlabelled metrics are exported as zero before their first update
+            self.labels()
+        registry.register(self)
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}, got {values}')
+            child = self._children[values] = self._new_child()
+            self._label_texts[values] = _label_text(self.labelnames, values)
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            labels = self._label_texts[values]
+            yield f'{self.name}{{{labels}}} {_format(child.value)}' if labels else f'{self.name} {_format(child.value)}'
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class _Timer:
+    __slots__ = ('child', 'started')
+
+    def __init__(self, child: '_HistogramChild'):
+        self.child = child
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.child.observe(time.perf_counter() - self.started)
+
+
+class _HistogramChild:
+    __slots__ = ('upper_bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # per-bucket counts; the last one is +Inf. Made cumulative when rendered
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the duration of its block."""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+        registry: Registry = REGISTRY,
+    ):
+        self.upper_bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            labels = self._label_texts[values]
+            prefix = f'{labels},' if labels else ''
+            cumulative = 0
+            for bound, count in zip((*self.upper_bounds, math.inf), child.counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{prefix}le="{_format(bound)}"}} {cumulative}'
+            suffix = f'{{{labels}}}' if labels else ''
+            yield f'{self.name}_sum{suffix} {_format(child.sum)}'
+            yield f'{self.name}_count{suffix} {child.count}'
+
+
+class Callback(_Metric):
+    """A gauge or counter read from ``function`` when metrics are scraped.
+
+    ``function`` returns a number, or for labelled metrics a dict from a label value
+    (or tuple of values) to a number. Suits sizes and counters other objects keep anyway.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], float | dict],
+        labelnames: Iterable[str] = (),
+        type: str = 'gauge',
+        registry: Registry = REGISTRY,
+    ):
+        self.function = function
+        self.type = type
+        super().__init__(name, documentation, labelnames, registry)
+
+    def samples(self) -> Iterator[str]:
+        value = self.function()
+        if not isinstance(value, dict):
+            yield f'{self.name} {_format(value)}'
+            return
+        for values, number in value.items():
+            values = values if isinstance(values, tuple) else (values,)
+            yield f'{self.name}{{{_label_text(self.labelnames, tuple(map(str, values)))}}} {_format(number)}'
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import typing
+from collections.abc import AsyncGenerator
+from typing import Any
+from uuid import uuid4
+
+from pydantic import BaseModel
+from semantic_kernel.connectors.ai.chat_completion_client_base import ChatCompletionClientBase
+from semantic_kernel.connectors.ai.function_calling_utils import (
+    update_settings_from_function_call_configuration,
+)
+from semantic_kernel.connectors.ai.open_ai import OpenAIChatPromptExecutionSettings
+from semantic_kernel.contents import (
+    AuthorRole,
+    ChatHistory,
+    ChatMessageContent,
+    FunctionCallContent,
+    FunctionResultContent,
+    StreamingChatMessageContent,
+)
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    'agents collaborate over the protocol to draft review and refine articles with clear structure '
+    'engaging introductions practical examples and concise conclusions for curious readers'
+).split()
+
+
+class MockChatCompletion(ChatCompletionClientBase):
+    """Offline stand-in for AzureChatCompletion used for local runs and benchmarks.
+
+    Replies are generated text of ``response_tokens`` words, delivered after
+    ``ttft_seconds`` at ``tokens_per_second``. When the request has a pydantic
+    ``response_format`` the reply is that model as JSON, with ``status`` set to
+    ``structured_status``. With ``section_words`` set, the text is a Markdown article
+    with a header every that many words. ``tool_script`` is a list of ``{"name", "arguments"}`` tool
+    calls made in order, one per model round trip, before the final text reply;
+    argument values may reference ``{user}`` (last user message) and ``{last_result}``
+    (last tool result).
+    """
+
+    SUPPORTS_FUNCTION_CALLING: typing.ClassVar[bool] = True
+
+    ttft_seconds: float = 0.3
+    tokens_per_second: float = 50.0
+    response_tokens: int = 400
+    structured_status: str = 'completed'
+    section_words: int = 0
+    tool_script: list[dict[str, Any]] = []
+
+    @classmethod
+    def from_env(
+        cls, service_id: str, default_tool_script: list[dict[str, Any]] | None = None
+    ) -> 'MockChatCompletion':
+        """Build a mock service from the ``MOCK_LLM_*`` environment variables."""
+        script = os.getenv('MOCK_LLM_TOOL_SCRIPT')
+        return cls(
+            service_id=service_id,
+            ai_model_id='mock',
+            ttft_seconds=float(os.getenv('MOCK_LLM_TTFT_MS', '300')) / 1000,
+            tokens_per_second=float(os.getenv('MOCK_LLM_TOKENS_PER_SEC', '50')),
+            response_tokens=int(os.getenv('MOCK_LLM_RESPONSE_TOKENS', '400')),
+            structured_status=os.getenv('MOCK_LLM_STATUS', 'completed'),
+            section_words=int(os.getenv('MOCK_LLM_SECTION_WORDS', '0')),
+            tool_script=json.loads(script) if script else default_tool_script or [],
+        )
+
+    def get_prompt_execution_settings_class(self) -> type[OpenAIChatPromptExecutionSettings]:
+        return OpenAIChatPromptExecutionSettings
+
+    def service_url(self) -> str | None:
+        return None
+
+    def _update_function_choice_settings_callback(self):
+        return update_settings_from_function_call_configuration
+
+    def _reset_function_choice_settings(self, settings: OpenAIChatPromptExecutionSettings) -> None:
+        settings.tool_choice = None
+        settings.tools = None
+
+    async def _inner_get_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: OpenAIChatPromptExecutionSettings,
+    ) -> list[ChatMessageContent]:
+        tool_call = self._next_tool_call(chat_history, settings)
+        if tool_call:
+            await asyncio.sleep(self.ttft_seconds)
+            return [ChatMessageContent(role=AuthorRole.ASSISTANT, items=[tool_call], ai_model_id=self.ai_model_id)]
+
+        tokens = self._reply_tokens(settings)
+        await asyncio.sleep(self.ttft_seconds + len(tokens) / self.tokens_per_second)
+        return [ChatMessageContent(role=AuthorRole.ASSISTANT, content=''.join(tokens), ai_model_id=self.ai_model_id)]
+
+    async def _inner_get_streaming_chat_message_contents(
+        self,
+        chat_history: ChatHistory,
+        settings: OpenAIChatPromptExecutionSettings,
+        function_invoke_attempt: int = 0,
+    ) -> AsyncGenerator[list[StreamingChatMessageContent], Any]:
+        tool_call = self._next_tool_call(chat_history, settings)
+        await asyncio.sleep(self.ttft_seconds)
+        if tool_call:
+            yield [
+                StreamingChatMessageContent(
+                    role=AuthorRole.ASSISTANT,
+                    items=[tool_call],
+                    choice_index=0,
+                    ai_model_id=self.ai_model_id,
+                    function_invoke_attempt=function_invoke_attempt,
+                )
+            ]
+            return
+
+        # Pace tokens against the start time so sleep overhead does not accumulate
+        start = time.monotonic()
+        for i, token in enumerate(self._reply_tokens(settings)):
+            delay = start + i / self.tokens_per_second - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield [
+                StreamingChatMessageContent(
+                    role=AuthorRole.ASSISTANT,
+                    content=token,
+                    choice_index=0,
+                    ai_model_id=self.ai_model_id,
+                    function_invoke_attempt=function_invoke_attempt,
+                )
+            ]
+
+    def _reply_tokens(self, settings: OpenAIChatPromptExecutionSettings) -> list[str]:
+        """The reply split into the pieces it is streamed in, roughly one word each."""
+        words = [WORDS[i % len(WORDS)] for i in range(self.response_tokens)]
+        if self.section_words:
+            sections = [
+                ' '.join(words[start:start + self.section_words])
+                for start in range(0, len(words), self.section_words)
+            ]
+            text = '# Mock article\n\n' + '\n\n'.join(
+                f'## Section {i}\n\n{section}' for i, section in enumerate(sections, 1)
+            )
+        else:
+            text = ' '.join(words)
+        response_format = settings.response_format
+        if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+            text = self._structured_reply(response_format, text)
+        return re.findall(r'\S+\s*', text)
+
+    def _structured_reply(self, response_format: type[BaseModel], text: str) -> str:
+        return response_format.model_validate(self._structured_values(response_format, text)).model_dump_json()
+
+    def _structured_values(self, model: type[BaseModel], text: str) -> dict[str, Any]:
+        """Field values for ``model``: the status for literals, one item for lists of models, else the text.
+
+        A model with a ``section`` field is a section edit; it revises the first section of the text.
+        """
+        values: dict[str, Any] = {}
+        for name, field in model.model_fields.items():
+            origin, args = typing.get_origin(field.annotation), typing.get_args(field.annotation)
+            if origin is typing.Literal:
+                values[name] = self.structured_status if self.structured_status in args else args[0]
+            elif origin is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+                values[name] = [self._structured_values(args[0], text)]
+            else:
+                values[name] = text
+        if 'section' in values and 'text' in values:
+            values['section'], values['text'] = self._section_edit(text)
+        return values
+
+    def _section_edit(self, text: str) -> tuple[str, str]:
+        """The header and revised text of the first section of a mock article."""
+        if not self.section_words:
+            # an article without headers is one section, addressed as the introduction
+            return 'Introduction', f'{text} Revised.'
+        # '# Mock article', '## Section 1', its text, ...
+        body = text.split('\n\n')[2]
+        return 'Section 1', f'## Section 1\n\n{body} Revised.'
+
+    def _next_tool_call(
+        self, chat_history: ChatHistory, settings: OpenAIChatPromptExecutionSettings
+    ) -> FunctionCallContent | None:
+        """The next scripted tool call for the current user turn, if any is left."""
+        if not self.tool_script or not settings.tools:
+            return None
+
+        user_text = ''
+        results: list[FunctionResultContent] = []
+        for message in chat_history.messages:
+            if message.role == AuthorRole.USER:
+                user_text = message.content
+                results = []
+            results.extend(item for item in message.items if isinstance(item, FunctionResultContent))
+        if len(results) >= len(self.tool_script):
+            return None
+
+        step = self.tool_script[len(results)]
+        available = {tool['function']['name'] for tool in settings.tools}
+        if step['name'] not in available:
+            logger.warning(f"Scripted tool {step['name']} is not available to the model")
+            return None
+
+        last_result = str(results[-1].result) if results else ''
+        arguments = {
+            key: value.replace('{user}', user_text).replace('{last_result}', last_result)
+            if isinstance(value, str) else value
+            for key, value in step.get('arguments', {}).items()
+        }
+        return FunctionCallContent(
+            id=f'call_{uuid4().hex[:12]}',
+            index=0,
+            name=step['name'],
+            arguments=json.dumps(arguments),
+        )
@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(prompt: str, instructions: str, deployment: str | None) -> str:
+    """Content address of a request: normalized prompt, agent instructions and deployment."""
+    normalized = ' '.join(prompt.split())
+    digest = hashlib.sha256()
+    for part in (normalized, instructions, deployment or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of completed agent responses.
+
+    The memory tier is an LRU of at most ``max_entries`` responses. When ``disk_dir``
+    is set, responses are also written there as gzipped JSON files (at most
+    ``max_disk_entries``) so they survive restarts. Entries expire after ``ttl_seconds``.
+    Disk entries are counted as they are written; once over the limit, the oldest are
+    removed down to 90% of it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 3600.0,
+        disk_dir: str | None = None,
+        max_disk_entries: int = 10000,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        # Files in disk_dir, counted by the first write and recounted by each trim
+        self._disk_entries: int | None = None
+        self._disk_lock = threading.RLock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    async def get(self, key: str) -> dict[str, Any] | None:
+        entry = self._entries.get(key)
+        if entry and time.time() - entry[0] <= self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self._entries.pop(key, None)
+
+        if self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry:
+                self._remember(key, *entry)
+                self.hits += 1
+                return entry[1]
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, response: dict[str, Any]) -> None:
+        created = time.time()
+        self._remember(key, created, response)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, created, response)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+        }
+
+    def _remember(self, key: str, created: float, response: dict[str, Any]) -> None:
+        self._entries[key] = (created, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f'{key}.json.gz')
+
+    def _read_disk(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f'Discarding unreadable cache entry {path}: {e}')
+            self._remove(path)
+            return None
+        if time.time() - data['created'] > self.ttl_seconds:
+            self._remove(path)
+            return None
+        return data['created'], data['response']
+
+    def _write_disk(self, key: str, created: float, response: dict[str, Any]) -> None:
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({'created': created, 'response': response}, f)
+        with self._disk_lock:
+            if self._disk_entries is None:
+                self._disk_entries = len(self._disk_files())
+            if not os.path.exists(path):
+                self._disk_entries += 1
+            os.replace(tmp_path, path)
+            if self._disk_entries > self.max_disk_entries:
+                self._trim_disk()
+
+    def _disk_files(self) -> list[os.DirEntry]:
+        with os.scandir(self.disk_dir) as entries:
+            return [e for e in entries if e.name.endswith('.json.gz')]
+
+    def _trim_disk(self) -> None:
+        # Recount, since other worker processes may write to the same directory
+        files = self._disk_files()
+        self._disk_entries = len(files)
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for entry in files[: len(files) - self.max_disk_entries * 9 // 10]:
+            self._remove(entry.path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._disk_lock:
+            if self._disk_entries:
+                self._disk_entries -= 1
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from a2a.server.agent_execution import AgentExecutor, RequestContext
+from a2a.server.events.event_queue import EventQueue
+from a2a.types import Message, TaskState, TaskStatus, TaskStatusUpdateEvent
+from a2a.utils import new_agent_text_message, new_task
+
+from metrics import Histogram
+from tracing import extract_context, tracer
+
+logger = logging.getLogger(__name__)
+
+QUEUE_WAIT_SECONDS = Histogram('scheduler_queue_wait_seconds', 'Time admitted requests waited for a slot.')
+
+
+class QueueFullError(Exception):
+    """Raised when the wait queue is full; ``retry_after`` is a hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f'Server busy, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class AdmissionScheduler:
+    """Bounded concurrency with a bounded, priority-ordered and per-context fair wait queue.
+
+    At most ``max_in_flight`` holders run at once and at most ``max_queue`` wait for a
+    slot; further requests are rejected immediately. Freed slots go to the highest
+    priority first and, within a priority, round-robin across context ids so one busy
+    conversation cannot starve the others.
+    """
+
+    def __init__(self, max_in_flight: int = 8, max_queue: int = 32, initial_service_seconds: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.admitted = 0
+        self.rejected = 0
+        self._in_flight = 0
+        self._queued = 0
+        # priority -> context id -> waiters; context order is the round-robin ring
+        self._waiting: dict[int, OrderedDict[str, deque[asyncio.Future]]] = {}
+        self._waits: deque[float] = deque(maxlen=1000)
+        # moving average of slot hold time, used for the retry-after hint
+        self._service_seconds = initial_service_seconds
+
+    @property
+    def saturated(self) -> bool:
+        return self._in_flight >= self.max_in_flight or self._queued > 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    @asynccontextmanager
+    async def slot(self, context_id: str, priority: int = 0) -> AsyncIterator[float]:
+        """Hold a slot for the duration of the block; yields the seconds spent waiting."""
+        waited = await self._acquire(context_id, priority)
+        started = time.monotonic()
+        try:
+            yield waited
+        finally:
+            held = time.monotonic() - started
+            self._service_seconds = 0.8 * self._service_seconds + 0.2 * held
+            self._hand_off()
+
+    def retry_after(self) -> int:
+        """Seconds until the queue has likely drained enough to accept a new request."""
+        return max(1, math.ceil(self._service_seconds * (self._queued + 1) / self.max_in_flight))
+
+    def stats(self) -> dict[str, Any]:
+        waits = sorted(self._waits)
+
+        def wait_ms(p: float) -> float:
+            return round(waits[max(0, math.ceil(p * len(waits)) - 1)] * 1000, 1) if waits else 0.0
+
+        return {
+            'in_flight': self._in_flight,
+            'max_in_flight': self.max_in_flight,
+            'queue_depth': self._queued,
+            'max_queue': self.max_queue,
+            'queue_depth_by_priority': {
+                priority: sum(len(waiters) for waiters in contexts.values())
+                for priority, contexts in self._waiting.items()
+            },
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'wait_ms': {'p50': wait_ms(0.5), 'p95': wait_ms(0.95), 'max': wait_ms(1.0)},
+            'retry_after_s': self.retry_after(),
+        }
+
+    async def _acquire(self, context_id: str, priority: int) -> float:
+        if not self.saturated:
+            self._in_flight += 1
+            self._admit(0.0)
+            return 0.0
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+
+        enqueued = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(priority, OrderedDict()).setdefault(context_id, deque()).append(waiter)
+        self._queued += 1
+        try:
+            # _hand_off() passes its slot on by resolving the future
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot arrived together with the cancellation; pass it on
+                self._hand_off()
+            else:
+                self._remove(priority, context_id, waiter)
+            raise
+        waited = time.monotonic() - enqueued
+        self._admit(waited)
+        return waited
+
+    def _admit(self, waited: float) -> None:
+        self.admitted += 1
+        self._waits.append(waited)
+        QUEUE_WAIT_SECONDS.observe(waited)
+
+    def _hand_off(self) -> None:
+        while self._waiting:
+            priority = max(self._waiting)
+            contexts = self._waiting[priority]
+            context_id, waiters = next(iter(contexts.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                contexts.move_to_end(context_id)
+            else:
+                del contexts[context_id]
+            if not contexts:
+                del self._waiting[priority]
+            self._queued -= 1
+            # A waiter canceled in this tick is still queued until its task runs; skip it
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _remove(self, priority: int, context_id: str, waiter: asyncio.Future) -> None:
+        contexts = self._waiting.get(priority, {})
+        waiters = contexts.get(context_id)
+        if waiters is None or waiter not in waiters:
+            # _hand_off() already took it off the queue
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del contexts[context_id]
+        if not contexts:
+            del self._waiting[priority]
+        self._queued -= 1
+
+
+def _priority(message: Message | None) -> int:
+    """Request priority from the message metadata; higher runs first."""
+    try:
+        return int((message.metadata or {}).get('priority', 0))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+
+class AdmissionControlledExecutor(AgentExecutor):
+    """Runs another executor's ``execute`` under an :class:`AdmissionScheduler`.
+
+    Queued tasks get a working status marked ``queued`` in its metadata (repeated every
+    ``heartbeat_seconds`` so streaming clients do not time out) and requests that do not fit in the queue are finished as
+    ``rejected`` with a ``retry_after`` hint in the status metadata.
+    """
+
+    def __init__(self, executor: AgentExecutor, scheduler: AdmissionScheduler, heartbeat_seconds: float = 15.0):
+        self.executor = executor
+        self.scheduler = scheduler
+        self.heartbeat_seconds = heartbeat_seconds
+        # Ids of the tasks waiting for a slot in this process
+        self._waiting: set[str] = set()
+
+    async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        # the request handler put its span's trace context in the message metadata
+        parent = extract_context(context.message.metadata if context.message else None)
+        with tracer.start_as_current_span('executor.execute', context=parent) as span:
+            await self._execute(context, event_queue, span)
+
+    async def _execute(self, context: RequestContext, event_queue: EventQueue, span) -> None:
+        task = context.current_task
+        if not task:
+            if not context.message:
+                return await self.executor.execute(context, event_queue)
+            task = new_task(context.message)
+            await event_queue.enqueue_event(task)
+            context.current_task = task
+        span.set_attribute('a2a.task_id', task.id)
+
+        heartbeat = None
+        if self.scheduler.saturated:
+            heartbeat = asyncio.create_task(self._report_queued(task.id, task.contextId, event_queue))
+        wait = tracer.start_span('scheduler.wait')
+        self._waiting.add(task.id)
+        try:
+            async with self.scheduler.slot(task.contextId, _priority(context.message)) as waited:
+                self._waiting.discard(task.id)
+                wait.end()
+                if heartbeat:
+                    heartbeat.cancel()
+                    logger.info(f'Task {task.id} admitted after waiting {waited:.2f}s')
+                await self.executor.execute(context, event_queue)
+        except QueueFullError as e:
+            logger.warning(f'Rejected task {task.id}: {e}')
+            span.set_attribute('scheduler.rejected', True)
+            await event_queue.enqueue_event(
+                TaskStatusUpdateEvent(
+                    status=TaskStatus(
+                        state=TaskState.rejected,
+                        message=new_agent_text_message(str(e), task.contextId, task.id),
+                    ),
+                    final=True,
+                    contextId=task.contextId,
+                    taskId=task.id,
+                    metadata={'retry_after': e.retry_after},
+                )
+            )
+        finally:
+            self._waiting.discard(task.id)
+            if wait.is_recording():
+                wait.end()
+            if heartbeat:
+                heartbeat.cancel()
+
+    async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
+        if context.task_id not in self._waiting:
+            return await self.executor.cancel(context, event_queue)
+        # cancelling the request handler's producer task then removes the request from the queue
+        await event_queue.enqueue_event(
+            TaskStatusUpdateEvent(
+                status=TaskStatus(state=TaskState.canceled),
+                final=True,
+                contextId=context.context_id,
+                taskId=context.task_id,
+            )
+        )
+
+    async def _report_queued(self, task_id: str, context_id: str, event_queue: EventQueue) -> None:
+        while True:
+            await event_queue.enqueue_event(
+                TaskStatusUpdateEvent(
+                    status=TaskStatus(
+                        state=TaskState.working,
+                        message=new_agent_text_message(
+                            f'Queued, {self.scheduler.queue_depth} requests waiting...',
+                            context_id,
+                            task_id,
+                        ),
+                    ),
+                    final=False,
+                    contextId=context_id,
+                    taskId=task_id,
+                    metadata={'queued': True},
+                )
+            )
+            await asyncio.sleep(self.heartbeat_seconds)
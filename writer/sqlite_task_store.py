@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Collection
+
+from a2a.server.tasks import TaskStore
+from a2a.types import Task, TaskState
+
+logger = logging.getLogger(__name__)
+
+# Tasks in these states are written through immediately and are eligible for pruning
+FINAL_STATES = {
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+    TaskState.input_required,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    context_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_context_id ON tasks (context_id);
+CREATE INDEX IF NOT EXISTS idx_tasks_state_updated_at ON tasks (state, updated_at);
+"""
+
+
+class SQLiteTaskStore(TaskStore):
+    """TaskStore backed by a local SQLite database in WAL mode.
+
+    Tasks are stored as zlib-compressed JSON, indexed by task id and context id.
+    Saves are write-behind: repeated saves of the same task within ``flush_interval``
+    collapse into one row write and all pending tasks are committed in a single
+    transaction. Tasks reaching a final or input-required state are flushed before
+    ``save`` returns, so other worker processes sharing the database see them at once.
+    Final tasks older than ``retention_seconds`` are pruned periodically.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        retention_seconds: float = 7 * 24 * 3600,
+        flush_interval: float = 0.05,
+        batch_size: int = 100,
+        prune_interval: float = 600.0,
+    ):
+        self.db_path = db_path
+        self.retention_seconds = retention_seconds
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.prune_interval = prune_interval
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        # Several uvicorn workers may open and write to the same file
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+
+        self._pending: dict[str, Task] = {}
+        self._flush_lock: asyncio.Lock | None = None
+        self._flusher: asyncio.Task | None = None
+        self._last_prune = time.monotonic()
+
+    async def save(self, task: Task) -> None:
+        """Queues a task for writing; final states are committed before returning."""
+        self._pending[task.id] = task
+        self._ensure_flusher()
+        if task.status.state in FINAL_STATES or len(self._pending) >= self.batch_size:
+            await self.flush()
+
+    async def get(self, task_id: str) -> Task | None:
+        """Retrieves a task by id, preferring not-yet-flushed local state."""
+        task = self._pending.get(task_id)
+        if task:
+            return task
+        row = await asyncio.to_thread(
+            self._fetchone, 'SELECT payload FROM tasks WHERE id = ?', (task_id,)
+        )
+        return _decode(row[0]) if row else None
+
+    async def delete(self, task_id: str) -> None:
+        """Deletes a task by id."""
+        self._pending.pop(task_id, None)
+        await asyncio.to_thread(self._execute, 'DELETE FROM tasks WHERE id = ?', (task_id,))
+
+    async def list_by_context(self, context_id: str, skip: Collection[str] = ()) -> list[Task]:
+        """Returns the tasks of a context, oldest first.
+
+        Tasks whose ids are in ``skip`` are left out without reading their payloads.
+        """
+        await self.flush()
+        payloads = await asyncio.to_thread(self._fetch_context, context_id, skip)
+        return [_decode(payload) for payload in payloads]
+
+    async def flush(self) -> None:
+        """Commits all pending saves in one transaction."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        # Serialize flushes so an older batch can never overwrite a newer one
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            now = time.time()
+            # Snapshot on the event loop; the tasks keep being mutated by the request handler
+            rows = [
+                (task.id, task.contextId, task.status.state.value, now, task.model_dump_json(exclude_none=True))
+                for task in batch.values()
+            ]
+            try:
+                await asyncio.to_thread(self._write_rows, rows)
+            except BaseException:
+                # Keep the batch for the next flush, behind any newer saves of the same tasks
+                self._pending = {**batch, **self._pending}
+                raise
+
+    async def prune(self) -> int:
+        """Deletes final tasks older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        states = [state.value for state in FINAL_STATES]
+        placeholders = ','.join('?' * len(states))
+        deleted = await asyncio.to_thread(
+            self._execute,
+            f'DELETE FROM tasks WHERE state IN ({placeholders}) AND updated_at < ?',
+            (*states, cutoff),
+        )
+        if deleted:
+            logger.info(f'Pruned {deleted} tasks older than {self.retention_seconds}s')
+        return deleted
+
+    async def count(self) -> int:
+        """Number of stored tasks, including pending writes."""
+        await self.flush()
+        row = await asyncio.to_thread(self._fetchone, 'SELECT COUNT(*) FROM tasks', ())
+        return row[0]
+
+    async def close(self) -> None:
+        """Stops the background flusher, writes pending tasks and closes the database."""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        self._conn.close()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_prune > self.prune_interval:
+                    self._last_prune = time.monotonic()
+                    await self.prune()
+            except Exception as e:
+                logger.error(f'Error writing tasks to {self.db_path}: {e}')
+
+    def _write_rows(self, rows: list[tuple]) -> None:
+        encoded = [(*row[:4], zlib.compress(row[4].encode(), 1)) for row in rows]
+        with self._db_lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.executemany(
+                    'INSERT INTO tasks (id, context_id, state, updated_at, payload) VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT(id) DO UPDATE SET context_id = excluded.context_id, state = excluded.state, '
+                    'updated_at = excluded.updated_at, payload = excluded.payload',
+                    encoded,
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def _execute(self, sql: str, params: tuple) -> int:
+        with self._db_lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def _fetchone(self, sql: str, params: tuple):
+        with self._db_lock:
+            return self._conn.execute(sql, params).fetchone()
+
+    def _fetch_context(self, context_id: str, skip: Collection[str]) -> list[bytes]:
+        with self._db_lock:
+            rows = self._conn.execute(
+                'SELECT id FROM tasks WHERE context_id = ? ORDER BY updated_at', (context_id,)
+            ).fetchall()
+            ids = [row[0] for row in rows if row[0] not in skip]
+            if not ids:
+                return []
+            placeholders = ','.join('?' * len(ids))
+            payloads = dict(
+                self._conn.execute(f'SELECT id, payload FROM tasks WHERE id IN ({placeholders})', ids).fetchall()
+            )
+        return [payloads[task_id] for task_id in ids]
+
+
+def _decode(payload: bytes) -> Task:
+    return Task.model_validate_json(zlib.decompress(payload))
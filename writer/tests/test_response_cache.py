@@ -0,0 +1,21 @@
+import asyncio
+import os
+
+from response_cache import ResponseCache
+
+
+def test_disk_is_trimmed_once_over_the_limit(tmp_path):
+    cache = ResponseCache(max_entries=1, disk_dir=str(tmp_path), max_disk_entries=10)
+
+    async def main():
+        for i in range(10):
+            await cache.put(f'key{i}', {'content': str(i)})
+        full = len(os.listdir(tmp_path))
+        # rewriting an entry does not count it twice
+        await cache.put('key9', {'content': '9'})
+        await cache.put('key10', {'content': '10'})
+        return full, len(os.listdir(tmp_path)), await cache.get('key10')
+
+    full, trimmed, latest = asyncio.run(main())
+    assert (full, trimmed) == (10, 9)
+    assert latest == {'content': '10'}
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from a2a.server.agent_execution import AgentExecutor, RequestContext
+from a2a.server.events.event_queue import EventQueue
+from a2a.types import Message, MessageSendParams, Role, TaskState
+
+from scheduler import AdmissionControlledExecutor, AdmissionScheduler, QueueFullError
+
+
+async def hold(scheduler: AdmissionScheduler, context_id: str, order: list, priority: int = 0, seconds: float = 0.01):
+    async with scheduler.slot(context_id, priority):
+        order.append(context_id)
+        await asyncio.sleep(seconds)
+
+
+def test_runs_up_to_max_in_flight_and_rejects_beyond_the_queue():
+    async def main():
+        scheduler = AdmissionScheduler(max_in_flight=1, max_queue=1)
+        order = []
+        running = asyncio.create_task(hold(scheduler, 'a', order, seconds=0.05))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold(scheduler, 'b', order))
+        await asyncio.sleep(0)
+        assert (scheduler.in_flight, scheduler.queue_depth) == (1, 1)
+        with pytest.raises(QueueFullError) as error:
+            await hold(scheduler, 'c', order)
+        assert error.value.retry_after >= 1
+        await asyncio.gather(running, queued)
+        return scheduler, order
+
+    scheduler, order = asyncio.run(main())
+    assert order == ['a', 'b']
+    assert (scheduler.admitted, scheduler.rejected, scheduler.in_flight) == (2, 1, 0)
+
+
+def test_freed_slots_go_by_priority_then_round_robin_across_contexts():
+    async def main():
+        scheduler = AdmissionScheduler(max_in_flight=1, max_queue=10)
+        order = []
+        first = asyncio.create_task(hold(scheduler, 'first', order, seconds=0.02))
+        await asyncio.sleep(0)
+        waiters = []
+        for context_id, priority in [('a', 0), ('a', 0), ('b', 0), ('urgent', 1)]:
+            waiters.append(asyncio.create_task(hold(scheduler, context_id, order, priority)))
+            await asyncio.sleep(0)
+        await asyncio.gather(first, *waiters)
+        return order
+
+    assert asyncio.run(main()) == ['first', 'urgent', 'a', 'b', 'a']
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        scheduler = AdmissionScheduler(max_in_flight=1, max_queue=5)
+        order = []
+        running = asyncio.create_task(hold(scheduler, 'a', order, seconds=0.02))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold(scheduler, 'b', order))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.queue_depth == 0
+        await running
+        return scheduler, order
+
+    scheduler, order = asyncio.run(main())
+    assert order == ['a']
+    assert scheduler.in_flight == 0
+
+
+def test_waiter_cancelled_as_a_slot_is_freed():
+    async def main():
+        scheduler = AdmissionScheduler(max_in_flight=1, max_queue=5)
+        order = []
+        release = asyncio.Event()
+
+        async def hold_until_released():
+            async with scheduler.slot('a'):
+                await release.wait()
+
+        running = asyncio.create_task(hold_until_released())
+        await asyncio.sleep(0)
+        first = asyncio.create_task(hold(scheduler, 'b', order))
+        second = asyncio.create_task(hold(scheduler, 'c', order))
+        await asyncio.sleep(0)
+        # the slot is freed in the same tick the first waiter is canceled
+        release.set()
+        first.cancel()
+        await asyncio.wait_for(asyncio.gather(running, first, second, return_exceptions=True), 1)
+        return scheduler, order, first
+
+    scheduler, order, first = asyncio.run(main())
+    assert first.cancelled()
+    assert order == ['c']
+    assert (scheduler.in_flight, scheduler.queue_depth) == (0, 0)
+
+
+class RecordingExecutor(AgentExecutor):
+    def __init__(self):
+        self.canceled = []
+
+    async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
+        await asyncio.sleep(1)
+
+    async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
+        self.canceled.append(context.task_id)
+
+
+def test_queued_task_is_canceled_by_the_scheduler():
+    async def main():
+        inner = RecordingExecutor()
+        executor = AdmissionControlledExecutor(inner, AdmissionScheduler(max_in_flight=1), heartbeat_seconds=60)
+        messages = [Message(role=Role.user, parts=[], messageId=str(i), contextId='ctx') for i in range(2)]
+        contexts = [RequestContext(MessageSendParams(message=message)) for message in messages]
+        runs = [asyncio.create_task(executor.execute(context, EventQueue())) for context in contexts]
+        await asyncio.sleep(0.01)
+        running, queued = (context.current_task for context in contexts)
+
+        queue = EventQueue()
+        await executor.cancel(RequestContext(task_id=queued.id, context_id='ctx', task=queued), queue)
+        event = await queue.dequeue_event(no_wait=True)
+        await executor.cancel(RequestContext(task_id=running.id, context_id='ctx', task=running), EventQueue())
+        for run in runs:
+            run.cancel()
+        await asyncio.gather(*runs, return_exceptions=True)
+        return inner.canceled, running.id, event
+
+    canceled, running_id, event = asyncio.run(main())
+    assert canceled == [running_id]
+    assert event.status.state == TaskState.canceled and event.final
@@ -0,0 +1,107 @@
+import asyncio
+import sqlite3
+
+from a2a.types import Task, TaskState, TaskStatus
+
+from sqlite_task_store import SQLiteTaskStore
+
+
+def task(task_id: str, state: TaskState, context_id: str = 'ctx') -> Task:
+    return Task(id=task_id, contextId=context_id, status=TaskStatus(state=state))
+
+
+def test_tasks_survive_reopening(tmp_path):
+    path = str(tmp_path / 'tasks.db')
+
+    async def write():
+        store = SQLiteTaskStore(path)
+        await store.save(task('t1', TaskState.working))
+        await store.save(task('t2', TaskState.completed, 'other'))
+        await store.close()
+
+    async def read():
+        store = SQLiteTaskStore(path)
+        try:
+            return await store.get('t1'), await store.get('t2'), await store.get('missing')
+        finally:
+            await store.close()
+
+    asyncio.run(write())
+    first, second, missing = asyncio.run(read())
+    assert first.status.state == TaskState.working
+    assert second.contextId == 'other'
+    assert missing is None
+
+
+def test_final_states_are_written_through(tmp_path):
+    path = str(tmp_path / 'tasks.db')
+
+    async def main():
+        store = SQLiteTaskStore(path, flush_interval=60)
+        other = SQLiteTaskStore(path)
+        try:
+            await store.save(task('t1', TaskState.working))
+            # pending in the writer's process only
+            assert await other.get('t1') is None
+            await store.save(task('t1', TaskState.completed))
+            return await other.get('t1')
+        finally:
+            await store.close()
+            await other.close()
+
+    assert asyncio.run(main()).status.state == TaskState.completed
+
+
+def test_list_prune_and_delete(tmp_path):
+    async def main():
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'), retention_seconds=0)
+        try:
+            await store.save(task('t1', TaskState.completed))
+            await store.save(task('t2', TaskState.working))
+            listed = [item.id for item in await store.list_by_context('ctx')]
+            pruned = await store.prune()
+            await store.delete('t2')
+            return listed, pruned, await store.count()
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == (['t1', 't2'], 1, 0)
+
+
+def test_listing_skips_known_tasks(tmp_path):
+    async def main():
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'))
+        try:
+            for task_id in ('t1', 't2', 't3'):
+                await store.save(task(task_id, TaskState.completed))
+            await store.save(task('t4', TaskState.completed, 'other'))
+            return [item.id for item in await store.list_by_context('ctx', skip={'t1', 't3'})]
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == ['t2']
+
+
+def test_failed_flush_keeps_the_batch(tmp_path):
+    async def main():
+        store = SQLiteTaskStore(str(tmp_path / 'tasks.db'), flush_interval=60)
+        write_rows = store._write_rows
+
+        def fail_once(rows):
+            store._write_rows = write_rows
+            raise sqlite3.OperationalError('database is locked')
+
+        store._write_rows = fail_once
+        try:
+            await store.save(task('t1', TaskState.working))
+            try:
+                await store.save(task('t2', TaskState.completed))
+            except sqlite3.OperationalError:
+                pass
+            else:
+                raise AssertionError('the failed write was not reported')
+            return await store.count()
+        finally:
+            await store.close()
+
+    assert asyncio.run(main()) == 2
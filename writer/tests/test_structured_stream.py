@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from structured_stream import StructuredStreamParser
+
+REPLY = {'status': 'completed', 'message': 'Tea — "green" & black\n\U0001F375 done', 'score': [1, {'a': None}]}
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 1000])
+def test_streams_the_decoded_message_in_any_chunking(size):
+    text = json.dumps(REPLY)
+    parser = StructuredStreamParser()
+    deltas = [parser.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    assert ''.join(deltas) == REPLY['message']
+    assert parser.complete
+    assert parser.values == REPLY
+
+
+def test_escapes_split_across_chunks():
+    text = json.dumps({'message': '\U0001F375\n'}, ensure_ascii=True)
+    parser = StructuredStreamParser()
+    assert ''.join(parser.feed(char) for char in text) == '\U0001F375\n'
+
+
+def test_fields_before_the_message_are_known_early():
+    parser = StructuredStreamParser()
+    parser.feed('{"status": "input_required", "message": "Which aud')
+    assert parser.values == {'status': 'input_required'}
+    assert not parser.complete
+
+
+def test_text_that_is_not_an_object_fails():
+    parser = StructuredStreamParser()
+    assert parser.feed('Sure! Here is your article') == ''
+    assert parser.error
+    assert not parser.complete
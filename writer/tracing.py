@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from opentelemetry import trace
+from opentelemetry.context import Context
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+logger = logging.getLogger(__name__)
+
+# Spans of this project; before setup_tracing() (or with TRACING=off) they cost next to nothing
+tracer = trace.get_tracer('blog-agents')
+
+# The A2A SDK opens a span for every queued event; muted unless TRACE_A2A_SDK is set
+A2A_SDK_SCOPE = 'a2a-python-sdk'
+
+_propagator = TraceContextTextMapPropagator()
+
+# Set by setup_tracing() when tracing is enabled
+collector: 'TraceCollector | None' = None
+
+
+def span_dict(span: ReadableSpan) -> dict[str, Any]:
+    """A finished span as plain JSON-serialisable data; times are nanoseconds since the epoch."""
+    context = span.get_span_context()
+    return {
+        'trace_id': format(context.trace_id, '032x'),
+        'span_id': format(context.span_id, '016x'),
+        'parent_id': format(span.parent.span_id, '016x') if span.parent else None,
+        'name': span.name,
+        'service': span.resource.attributes.get('service.name'),
+        'start': span.start_time,
+        'end': span.end_time,
+        'duration_ms': round((span.end_time - span.start_time) / 1e6, 3),
+        'status': span.status.status_code.name,
+        'attributes': dict(span.attributes or {}),
+        'events': [
+            {'name': event.name, 'time': event.timestamp, 'attributes': dict(event.attributes or {})}
+            for event in span.events
+        ],
+    }
+
+
+class TraceCollector(SpanExporter):
+    """Keeps the spans of the most recent ``max_traces`` traces in memory, grouped by trace id.
+
+    Spans are exported from whichever thread ends them, so access is locked.
+    """
+
+    def __init__(self, max_traces: int = 200):
+        self.max_traces = max_traces
+        self._traces: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        records = [span_dict(span) for span in spans]
+        with self._lock:
+            for record in records:
+                self._traces.setdefault(record['trace_id'], []).append(record)
+                self._traces.move_to_end(record['trace_id'])
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        return SpanExportResult.SUCCESS
+
+    def get(self, trace_id: str) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._traces.get(trace_id, ()))
+
+    def recent(self, limit: int = 50) -> list[dict[str, Any]]:
+        """Summaries of the most recently active traces, newest first."""
+        with self._lock:
+            traces = list(self._traces.items())[-limit:]
+        summaries = []
+        for trace_id, spans in reversed(traces):
+            start = min(span['start'] for span in spans)
+            end = max(span['end'] for span in spans)
+            root = min(spans, key=lambda span: span['start'])
+            summaries.append({
+                'trace_id': trace_id,
+                'root': root['name'],
+                'spans': len(spans),
+                'duration_ms': round((end - start) / 1e6, 3),
+            })
+        return summaries
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+class JsonLinesExporter(SpanExporter):
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = ''.join(json.dumps(span_dict(span), default=str) + '\n' for span in spans)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class _ScopedTracerProvider(TracerProvider):
+    """A tracer provider handing out no-op tracers to the instrumentation scopes in ``muted``.
+
+    A no-op span keeps its parent's context, so spans below it still join the trace.
+    """
+
+    def __init__(self, muted: Sequence[str] = (), **kwargs):
+        super().__init__(**kwargs)
+        self.muted = frozenset(muted)
+
+    def get_tracer(self, instrumenting_module_name: str, *args, **kwargs) -> trace.Tracer:
+        if instrumenting_module_name in self.muted:
+            return trace.NoOpTracer()
+        return super().get_tracer(instrumenting_module_name, *args, **kwargs)
+
+
+def setup_tracing(service_name: str) -> TraceCollector | None:
+    """Record spans of this process in an in-memory collector, and in TRACE_EXPORT_FILE if set.
+
+    Returns the collector, or None when TRACING is off. Calling it again returns the
+    existing collector, so app factories can call it unconditionally.
+    """
+    global collector
+    if os.getenv('TRACING', 'on').lower() in ('0', 'off', 'false', 'no'):
+        return None
+    if collector is not None:
+        return collector
+
+    muted = () if os.getenv('TRACE_A2A_SDK') else (A2A_SDK_SCOPE,)
+    provider = _ScopedTracerProvider(muted, resource=Resource.create({'service.name': service_name}))
+    collector = TraceCollector(int(os.getenv('TRACE_MAX_TRACES', '200')))
+    provider.add_span_processor(SimpleSpanProcessor(collector))
+    export_file = os.getenv('TRACE_EXPORT_FILE')
+    if export_file:
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesExporter(export_file)))
+        logger.info(f'Writing spans to {export_file}')
+    trace.set_tracer_provider(provider)
+    return collector
+
+
+def inject_context(metadata: Mapping[str, Any] | None, span: trace.Span | None = None) -> dict[str, Any]:
+    """A copy of ``metadata`` carrying the W3C trace context of ``span`` (default: the current span)."""
+    carrier = dict(metadata or {})
+    _propagator.inject(carrier, context=trace.set_span_in_context(span) if span is not None else None)
+    return carrier
+
+
+def extract_context(metadata: Mapping[str, Any] | None) -> Context:
+    """The trace context carried in message metadata, for use as a span parent."""
+    return _propagator.extract(metadata or {})
+
+
+def trace_id_of(span: trace.Span) -> str | None:
+    context = span.get_span_context()
+    return format(context.trace_id, '032x') if context.is_valid else None
+
+
+def waterfall_text(spans: list[dict[str, Any]], width: int = 40) -> str:
+    """Render spans as an indented text waterfall: offset and duration in ms, a bar, and the name."""
+    if not spans:
+        return ''
+    spans = sorted(spans, key=lambda span: span['start'])
+    start = spans[0]['start']
+    total = max(max(span['end'] for span in spans) - start, 1)
+    ids = {span['span_id'] for span in spans}
+    children: dict[str | None, list[dict[str, Any]]] = {}
+    for span in spans:
+        parent = span['parent_id'] if span['parent_id'] in ids else None
+        children.setdefault(parent, []).append(span)
+
+    lines = [f'{"start ms":>9} {"dur ms":>9}  {"":{width}}  span']
+
+    def render(span: dict[str, Any], depth: int) -> None:
+        left = int((span['start'] - start) / total * width)
+        length = max(1, int((span['end'] - span['start']) / total * width))
+        bar = (' ' * left + '#' * length)[:width]
+        lines.append(
+            f'{(span["start"] - start) / 1e6:9.1f} {span["duration_ms"]:9.1f}  {bar:{width}}  '
+            f'{"  " * depth}{span["name"]} [{span["service"]}]'
+        )
+        for child in children.get(span['span_id'], ()):
+            render(child, depth + 1)
+
+    for root in children.get(None, ()):
+        render(root, 0)
+    return '\n'.join(lines) + '\n'